@@ -1,13 +1,46 @@
-
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from config import LOG_LEVEL
 from routes.analysis import router as analysis_router
+from services.warmup import get_warmup
+from utils.engine_pool import get_engine_pool, shutdown_engine_pool
+from utils.eval_cache import get_eval_cache
+from utils.metrics import ServerTimingMiddleware
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Aquecimento em segundo plano: o servidor já aceita conexões enquanto aberturas e motores sobem
+    warmup = asyncio.create_task(get_warmup().run(get_engine_pool()))
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        try:
+            await warmup
+        except asyncio.CancelledError:
+            pass
+        await shutdown_engine_pool()
+        # Avaliações ainda pendentes do lote vão para o SQLite antes de sair
+        get_eval_cache().flush()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Tempos por etapa de cada requisição no cabeçalho Server-Timing
+app.add_middleware(ServerTimingMiddleware)
 
 @app.get("/api/health")
 def health():
+    # Processo vivo (liveness); para saber se já atende rápido, use /api/ready
     return {"status": "ok"}
 
-app.include_router(analysis_router, prefix="/api")
+@app.get("/api/ready")
+def ready():
+    status = get_warmup().status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
 
+app.include_router(analysis_router, prefix="/api")
@@ -0,0 +1,82 @@
+"""
+Benchmark da busca de aberturas por FEN: varredura linear antiga vs índice por posição.
+
+Mede o custo por partida do que a rota de análise faz: classify_move_by_fen em
+cada lance + detect_opening_info_by_fen no final.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_opening_lookup
+"""
+import io
+import time
+
+import chess.pgn
+
+from utils import fen_openings
+from utils.fen_openings import load_fen_openings, normalize_fen, classify_move_by_fen, detect_opening_info_by_fen
+
+# Ruy Lopez fechada que sai da teoria no meio-jogo (60 lances)
+REFERENCE_PGN = (
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O "
+    "9. h3 Nb8 10. d4 Nbd7 11. Nbd2 Bb7 12. Bc2 Re8 13. Nf1 Bf8 14. Ng3 g6 15. a4 c5 "
+    "16. d5 c4 17. Bg5 h6 18. Be3 Nc5 19. Qd2 h5 20. Bg5 Bg7 21. Ra3 Qc7 22. Rea1 Rab8 "
+    "23. axb5 axb5 24. Ra7 Ra8 25. Rxa8 Rxa8 26. Rxa8+ Bxa8 27. Qe3 Nfd7 28. Nf1 f6 "
+    "29. Bh6 Bxh6 30. Qxh6 Qb6 *"
+)
+ROUNDS = 20
+
+
+def _game_fens():
+    game = chess.pgn.read_game(io.StringIO(REFERENCE_PGN))
+    board = game.board()
+    fens = []
+    for move in game.mainline_moves():
+        board.push(move)
+        fens.append(board.fen())
+    return fens
+
+
+def _legacy_get_opening_by_fen(fen):
+    # Implementação anterior: varre todas as entradas normalizando uma a uma
+    fen_map = load_fen_openings()
+    if fen in fen_map:
+        return fen_map[fen]
+    normalized_fen = normalize_fen(fen)
+    for stored_fen, opening in fen_map.items():
+        if normalize_fen(stored_fen) == normalized_fen:
+            return opening
+    return None
+
+
+def _per_game(fens):
+    for i, fen in enumerate(fens):
+        classify_move_by_fen(fen, i // 2 + 1)
+    detect_opening_info_by_fen(fens[-1], fens)
+
+
+def _timed(fens):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        _per_game(fens)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main():
+    fens = _game_fens()
+    load_fen_openings()
+
+    indexed = _timed(fens)
+    original = fen_openings.get_opening_by_fen
+    fen_openings.get_opening_by_fen = _legacy_get_opening_by_fen
+    try:
+        legacy = _timed(fens)
+    finally:
+        fen_openings.get_opening_by_fen = original
+
+    print(f"Partida de referência: {len(fens)} lances, {len(load_fen_openings())} posições no banco")
+    print(f"Varredura linear: {legacy * 1000:8.2f} ms/partida")
+    print(f"Índice por posição: {indexed * 1000:8.2f} ms/partida ({legacy / indexed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark da análise paralela de UMA partida: tempo de parede por número de motores.
+
+Também confere que o resultado é idêntico para qualquer número de motores.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_parallel --depth 16 --workers 1 2 4
+    python -m benchmarks.bench_parallel --engine /usr/local/bin/stockfish
+"""
+import argparse
+import asyncio
+import io
+import time
+
+import chess.pgn
+
+from config import STOCKFISH_PATH
+from services.evaluation import search_positions_parallel
+from utils.engine_pool import EnginePool
+from utils.eval_cache import EvalCache
+from utils.uci import UciEngine
+from benchmarks.bench_opening_lookup import REFERENCE_PGN
+
+
+def _game_fens():
+    game = chess.pgn.read_game(io.StringIO(REFERENCE_PGN))
+    board = game.board()
+    fens = [board.fen()]
+    for move in game.mainline_moves():
+        board.push(move)
+        fens.append(board.fen())
+    return fens
+
+
+async def run(args):
+    fens = _game_fens()
+    pool = EnginePool(size=max(args.workers), factory=lambda: UciEngine(args.engine, parameters={"Threads": 1, "Hash": 16}))
+    await pool.start()
+    try:
+        baseline_time = reference = None
+        print(f"{len(fens)} posições, profundidade {args.depth}")
+        for workers in args.workers:
+            # Cache vazio a cada rodada para medir só o motor
+            start = time.perf_counter()
+            results = await search_positions_parallel(fens, pool, workers, depth=args.depth, cache=EvalCache(db_path=None))
+            elapsed = time.perf_counter() - start
+            evals = [(lines[0]["eval_cp"], lines[0]["eval_mate"], lines[0]["move"]) for lines in results]
+            if reference is None:
+                baseline_time, reference = elapsed, evals
+            same = "idêntico" if evals == reference else "DIFERENTE"
+            print(f"workers={workers:2d}: {elapsed:7.2f}s  speedup {baseline_time / elapsed:4.2f}x  resultado {same}")
+    finally:
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default=STOCKFISH_PATH)
+    parser.add_argument("--depth", type=int, default=14)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
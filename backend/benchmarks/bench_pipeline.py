@@ -0,0 +1,117 @@
+"""
+Benchmark do custo em Python da análise por lance (sem o motor).
+
+O motor é substituído por respostas pré-calculadas em memória, então o tempo
+medido é só o do pipeline: parsing do PGN, plano de buscas, cache de avaliações,
+classificação e aberturas. Usa uma partida longa (lances aleatórios com semente fixa)
+e a partida de referência.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --plies 300 --rounds 10
+"""
+import argparse
+import asyncio
+import io
+import random
+import time
+from contextlib import asynccontextmanager
+
+import chess
+import chess.pgn
+
+from services.analysis import analyze_states, game_states
+from utils import eval_cache
+from utils.eval_cache import EvalCache
+from benchmarks.bench_opening_lookup import REFERENCE_PGN
+
+
+def random_game_pgn(plies, seed=1):
+    """
+    PGN de uma partida com lances aleatórios (reprodutível pela semente).
+    """
+    rng = random.Random(seed)
+    board = chess.Board()
+    game = chess.pgn.Game()
+    node = game
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        node = node.add_variation(move)
+        board.push(move)
+    return str(game)
+
+
+class InstantEngine:
+    """
+    Responde analyse() com linhas pré-calculadas para as posições da partida.
+    """
+
+    def __init__(self, pgn, multipv=1):
+        game = chess.pgn.read_game(io.StringIO(pgn))
+        board = game.board()
+        self._lines = {}
+        self._store(board, 0, multipv)
+        for index, move in enumerate(game.mainline_moves(), start=1):
+            board.push(move)
+            self._store(board, index, multipv)
+
+    def _store(self, board, index, multipv):
+        lines = []
+        for rank, move in enumerate(list(board.legal_moves)[:multipv], start=1):
+            lines.append({"depth": 10, "seldepth": 12, "multipv": rank, "eval_cp": (index * 37) % 400 - 200,
+                          "eval_mate": None, "bound": None, "nodes": 1000, "pv": [move.uci()], "move": move.uci()})
+        if not lines:
+            lines = [{"depth": 0, "multipv": 1, "eval_cp": 0, "eval_mate": None, "bound": None, "pv": [], "move": None}]
+        self._lines[board.fen()] = self._lines[index] = lines
+
+    async def analyse(self, fen, depth=None, multipv=1, moves=None, **limits):
+        # Sessão de partida: a posição é identificada pelo número de lances
+        return self._lines[len(moves)] if moves is not None else self._lines[fen]
+
+
+class InstantPool:
+    size = 1
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        yield self._engine
+
+
+async def _analyze(pgn, pool):
+    start_fen, states = game_states(chess.pgn.read_game(io.StringIO(pgn)))
+    await analyze_states(states, start_fen, pool, depth=10)
+    return len(states)
+
+
+def _per_ply_us(pgn, rounds):
+    pool = InstantPool(InstantEngine(pgn))
+    best = None
+    for _ in range(rounds):
+        # Cache de avaliações vazio a cada rodada: a consulta/gravação faz parte do custo
+        eval_cache._eval_cache = EvalCache(db_path=None)
+        start = time.perf_counter()
+        plies = asyncio.run(_analyze(pgn, pool))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return plies, best / plies * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plies", type=int, default=200, help="Tamanho da partida longa")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, pgn in (("referência", REFERENCE_PGN), ("longa", random_game_pgn(args.plies))):
+        plies, per_ply = _per_ply_us(pgn, args.rounds)
+        print(f"Partida {name:10s}: {plies:4d} lances, {per_ply:8.1f} µs/lance")
+
+
+if __name__ == "__main__":
+    main()
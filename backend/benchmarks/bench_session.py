@@ -0,0 +1,76 @@
+"""
+Benchmark da sessão de partida: nós buscados e tempo de parede de UMA partida
+com o hash limpo a cada lance (FEN avulsa + ucinewgame) contra a sessão que
+mantém o hash (position ... moves ...), em ordem e do último lance para o primeiro.
+
+Também mostra em quantas posições o melhor lance coincide com a busca limpa.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_session --depth 16
+    python -m benchmarks.bench_session --engine /usr/local/bin/stockfish --hash 64
+"""
+import argparse
+import asyncio
+import io
+import time
+
+import chess.pgn
+
+from config import STOCKFISH_PATH
+from services.evaluation import search_positions_async, search_game_session
+from utils.eval_cache import EvalCache
+from utils.uci import UciEngine
+from benchmarks.bench_opening_lookup import REFERENCE_PGN
+
+
+def _game():
+    game = chess.pgn.read_game(io.StringIO(REFERENCE_PGN))
+    board = game.board()
+    fens, moves = [board.fen()], []
+    for move in game.mainline_moves():
+        moves.append(move.uci())
+        board.push(move)
+        fens.append(board.fen())
+    return fens, moves
+
+
+async def run(args):
+    fens, moves = _game()
+    engine = await UciEngine(args.engine, parameters={"Threads": 1, "Hash": args.hash}).start()
+    modes = [
+        ("reset por lance", lambda cache: search_positions_async(fens, engine, depth=args.depth, cache=cache, reset_between=True)),
+        ("sessão em ordem", lambda cache: search_game_session(fens, moves, engine, depth=args.depth, cache=cache, reverse=False)),
+        ("sessão reversa", lambda cache: search_game_session(fens, moves, engine, depth=args.depth, cache=cache, reverse=True)),
+    ]
+    try:
+        print(f"{len(fens)} posições, profundidade {args.depth}, hash {args.hash} MB")
+        baseline = None
+        for name, search in modes:
+            # Motor e cache limpos a cada modo para medir só a busca
+            await engine.reset()
+            start = time.perf_counter()
+            results = await search(EvalCache(db_path=None))
+            elapsed = time.perf_counter() - start
+            nodes = sum(lines[0].get("nodes", 0) for lines in results if lines)
+            best = [lines[0]["move"] if lines else None for lines in results]
+            if baseline is None:
+                baseline = (elapsed, nodes, best)
+            same = sum(a == b for a, b in zip(best, baseline[2]))
+            print(f"{name:16s}: {elapsed:7.2f}s ({baseline[0] / elapsed:4.2f}x)  "
+                  f"{nodes:12d} nós ({nodes / max(baseline[1], 1):5.1%})  "
+                  f"melhor lance igual em {same}/{len(best)}")
+    finally:
+        await engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default=STOCKFISH_PATH)
+    parser.add_argument("--depth", type=int, default=14)
+    parser.add_argument("--hash", type=int, default=16, help="Hash do motor em MB")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
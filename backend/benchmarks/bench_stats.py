@@ -0,0 +1,56 @@
+"""
+Benchmark das estatísticas da partida (services/game_stats.py).
+
+Compara calcular as estatísticas partida por partida com calcular um lote inteiro
+numa única chamada de compute_stats. As avaliações são sintéticas (semente fixa).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_stats
+    python -m benchmarks.bench_stats --games 5000 --plies 80
+"""
+import argparse
+import random
+import time
+
+from services.game_stats import compute_stats
+
+LABELS = ("Livro", "Melhor", "Excelente", "Bom", "Imprecisão", "Erro", "Capivarada")
+
+
+def synthetic_series(plies, rng):
+    cp = [None] * 8 + [rng.randint(-600, 600) for _ in range(plies - 7)]
+    return {
+        "white_first": True,
+        "cp": cp,
+        "mate": [None] * (plies + 1),
+        "san": ["e4"] * plies,
+        "classification": [rng.choice(LABELS) for _ in range(plies)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--plies", type=int, default=80)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    series = [synthetic_series(args.plies, rng) for _ in range(args.games)]
+
+    start = time.perf_counter()
+    for s in series:
+        compute_stats([s])
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compute_stats(series)
+    batched = time.perf_counter() - start
+
+    total = args.games * args.plies
+    print(f"{args.games} partidas de {args.plies} lances")
+    print(f"Uma por vez: {one_by_one * 1000:8.1f} ms ({one_by_one / total * 1e6:6.2f} µs/lance)")
+    print(f"Em lote:     {batched * 1000:8.1f} ms ({batched / total * 1e6:6.2f} µs/lance)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark do OpeningTrie: tempo de construção, memória e busca com o conjunto
+completo de aberturas do Lichess (os TSVs de backend/tsv/).
+
+Compara a representação atual (utils/trie.py: nós com __slots__, lances
+internados, folhas sem dict próprio) com a antiga, de um objeto Python com
+`__dict__` e um dict `children` por nó, reproduzida aqui como LegacyOpeningTrie. A memória é a alocada pela árvore
+(tracemalloc), sem contar as linhas dos TSVs.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_trie
+    python -m benchmarks.bench_trie --rounds 10
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from utils.opening_db import _read_tsv_rows
+from utils.trie import OpeningTrie
+from benchmarks.suite import _reference_game
+
+
+class LegacyOpeningTrie:
+    """
+    A representação anterior: um objeto por nó, com dict de filhos por SAN.
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.opening_data = None
+
+    def insert(self, moves_sequence, eco_code, opening_name):
+        node = self
+        for move in moves_sequence.split():
+            if move.endswith('.') or move.isdigit():
+                continue
+            if move not in node.children:
+                node.children[move] = LegacyOpeningTrie()
+            node = node.children[move]
+        node.opening_data = (eco_code, opening_name)
+
+    def search(self, moves_sequence):
+        node = self
+        last_found = None
+        for move in moves_sequence:
+            if move not in node.children:
+                break
+            node = node.children[move]
+            if node.opening_data:
+                last_found = node.opening_data
+        return last_found
+
+
+def _build(factory, rows):
+    trie = factory()
+    for eco_code, opening_name, moves in rows:
+        trie.insert(moves, eco_code, opening_name)
+    return trie
+
+
+def measure(name, factory, rows, prefixes, rounds):
+    build_times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _build(factory, rows)
+        build_times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    trie = _build(factory, rows)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    repeat = 200
+    search_times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for prefix in prefixes:
+                trie.search(prefix)
+        search_times.append(time.perf_counter() - start)
+    search_us = min(search_times) / (repeat * len(prefixes)) * 1e6
+    print(f"{name:22s} construção {min(build_times) * 1000:8.1f} ms   memória {memory / 1024:8.0f} KiB   "
+          f"busca {search_us:6.2f} µs")
+    return trie
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = list(_read_tsv_rows())
+    _, sans = _reference_game()
+    prefixes = [sans[:i] for i in range(1, len(sans) + 1)]
+    print(f"{len(rows)} aberturas")
+
+    legacy = measure("antes (dict por nó)", LegacyOpeningTrie, rows, prefixes, args.rounds)
+    slots = measure("__slots__ + internados", OpeningTrie, rows, prefixes, args.rounds)
+    measure("idem + UCI", lambda: OpeningTrie(with_uci=True), rows, prefixes, max(1, args.rounds // 2))
+    assert all(legacy.search(p) == slots.search(p) for p in prefixes)
+    print(f"{slots.get_stats()['total_nodes']} nós")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Motor UCI falso e determinístico, para medir o lado Python sem o Stockfish.
+
+Fala o suficiente do protocolo para o UciEngine (uci, isready, setoption,
+ucinewgame, position, go, stop, quit). Cada lance recebe uma avaliação fixa
+derivada de um hash da posição e do lance, com um ruído que diminui com a
+profundidade (as iterações variam como numa busca real). Os nós de cada
+iteração crescem 1,6x por profundidade; com FAKE_ENGINE_NPS > 0 o motor
+"pensa" nós/NPS segundos, senão responde na hora. `go` respeita depth,
+movetime e nodes, e `stop` interrompe a busca entre duas iterações.
+
+Uso:
+    UciEngine("benchmarks/fake_engine.py")        # executável (a partir de backend/)
+    FAKE_ENGINE_NPS=2000000 python benchmarks/fake_engine.py
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import chess
+
+NODES_BASE = 1000
+NODES_GROWTH = 1.6
+DEFAULT_NPS = float(os.environ.get("FAKE_ENGINE_NPS", "0"))
+
+
+def _hash(text, modulo):
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16) % modulo
+
+
+def base_score(fen, move):
+    return _hash(fen + move, 200) - 100
+
+
+def move_score(fen, move, depth):
+    """
+    Avaliação (cp, ponto de vista de quem joga) do lance na iteração `depth`.
+    """
+    return base_score(fen, move) + (_hash(f"{fen}{move}{depth}", 81) - 40) // depth
+
+
+class FakeEngine:
+    def __init__(self, out=sys.stdout, nps=DEFAULT_NPS):
+        self.out = out
+        self.nps = nps
+        self.board = chess.Board()
+        self.multipv = 1
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._search = None
+
+    def send(self, line):
+        with self._lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def _wait_search(self):
+        if self._search is not None:
+            self._search.join()
+            self._search = None
+
+    def handle(self, line):
+        """
+        Returns:
+            bool: False em `quit`
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == "uci":
+            self.send("id name FakeEngine")
+            self.send("id author chessify benchmarks")
+            self.send("option name MultiPV type spin default 1 min 1 max 500")
+            self.send("option name Threads type spin default 1 min 1 max 1024")
+            self.send("option name Hash type spin default 16 min 1 max 33554432")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption" and "name" in tokens and "value" in tokens:
+            name = " ".join(tokens[tokens.index("name") + 1:tokens.index("value")])
+            if name == "MultiPV":
+                self.multipv = int(tokens[tokens.index("value") + 1])
+        elif command == "ucinewgame":
+            self._wait_search()
+        elif command == "position":
+            self._wait_search()
+            self._set_position(tokens)
+        elif command == "go":
+            self._wait_search()
+            self._stop.clear()
+            self._search = threading.Thread(target=self._go, args=(self.board.copy(), tokens), daemon=True)
+            self._search.start()
+        elif command == "stop":
+            self._stop.set()
+            self._wait_search()
+        elif command == "quit":
+            self._stop.set()
+            self._wait_search()
+            return False
+        return True
+
+    def _set_position(self, tokens):
+        moves_at = tokens.index("moves") if "moves" in tokens else len(tokens)
+        if tokens[1] == "startpos":
+            self.board = chess.Board()
+        else:
+            self.board = chess.Board(" ".join(tokens[2:moves_at]))
+        for move in tokens[moves_at + 1:]:
+            self.board.push_uci(move)
+
+    def _go(self, board, tokens):
+        def arg(name, default=None):
+            return int(tokens[tokens.index(name) + 1]) if name in tokens else default
+
+        depth, movetime, max_nodes = arg("depth", 10), arg("movetime"), arg("nodes")
+        moves = list(board.legal_moves)
+        if not moves:
+            self.send(f"info depth 0 score {'mate 0' if board.is_check() else 'cp 0'}")
+            self.send("bestmove (none)")
+            return
+        fen = board.fen()
+        ranked = sorted(moves, key=lambda m: -base_score(fen, m.uci()))
+        start = time.perf_counter()
+        nodes = 0
+        for current in range(1, depth + 1):
+            iteration = int(NODES_BASE * NODES_GROWTH ** current)
+            cost = iteration / self.nps if self.nps else 0.0
+            elapsed = time.perf_counter() - start
+            if current > 1:
+                if self._stop.is_set():
+                    break
+                if movetime is not None and (elapsed + cost) * 1000 > movetime:
+                    break
+                if max_nodes is not None and nodes + iteration > max_nodes:
+                    break
+            # Espera interrompível: `stop` encerra a iteração em andamento
+            if cost and self._stop.wait(cost) and current > 1:
+                break
+            nodes += iteration
+            elapsed_ms = max(int((time.perf_counter() - start) * 1000), 1)
+            for index, move in enumerate(ranked[:self.multipv], start=1):
+                self.send(f"info depth {current} seldepth {current + 2} multipv {index} "
+                          f"score cp {move_score(fen, move.uci(), current)} nodes {nodes} "
+                          f"nps {nodes * 1000 // elapsed_ms} hashfull {min(nodes // 10000, 1000)} "
+                          f"time {elapsed_ms} pv {move.uci()}")
+        self.send(f"bestmove {ranked[0].uci()}")
+
+
+def main():
+    engine = FakeEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Teste de carga de POST /api/analyze: várias análises simultâneas, como em produção.
+
+Reproduz um conjunto de partidas (um PGN com várias partidas ou partidas aleatórias
+geradas) com profundidades sorteadas entre as de --depths, por vários clientes
+(X-Client-Id), e relata vazão, latência p50/p95/p99, taxa de erro e, a cada
+--interval segundos, processos de motor vivos, motores ocupados e fila de admissão.
+
+Chegadas:
+    --rate R          chegadas de Poisson a R req/s (carga aberta), no máximo
+                      --concurrency em andamento
+    --rate 0          --concurrency clientes enviando uma requisição após a outra
+
+Alvo:
+    (padrão)          a aplicação no mesmo processo, via ASGI (com o lifespan)
+    --uvicorn         sobe um uvicorn local (app:app) numa porta livre
+    --url URL         um servidor já em execução
+
+--stub usa o motor falso de benchmarks/fake_engine.py (sem Stockfish, roda offline);
+--stub-nps controla quanto ele "pensa" (nós por segundo simulados). No modo --url, o
+servidor precisa ter sido iniciado com STOCKFISH_PATH apontando para o motor falso.
+
+Uso (a partir de backend/):
+    python -m benchmarks.loadtest --stub --requests 200 --rate 5 --depths 8 12 16
+    python -m benchmarks.loadtest --stub --uvicorn --rate 0 --concurrency 8 --duration 60
+    python -m benchmarks.loadtest --url http://localhost:8000 --pgn partidas.pgn --output carga.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_engine.py")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(values, p):
+    """
+    Percentil por posto mais próximo (valores já ordenados).
+    """
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def _latency_summary(latencies):
+    values = sorted(latencies)
+    return {f"p{p}_ms": round(_percentile(values, p) * 1000, 1) if values else None for p in (50, 95, 99)}
+
+
+def load_corpus(path=None, games=100, seed=1):
+    """
+    Lista de PGNs: as partidas do arquivo ou `games` partidas aleatórias de 20 a 120 lances.
+    """
+    # Importados aqui: a config lê STOCKFISH_PATH (--stub) na importação
+    from services.analysis import read_games
+    from benchmarks.bench_pipeline import random_game_pgn
+
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [str(game) for game in read_games(f.read())]
+    rng = random.Random(seed)
+    return [random_game_pgn(rng.randint(20, 120), seed=seed * 100000 + i) for i in range(games)]
+
+
+def engine_processes(parent=None, pattern=None):
+    """
+    Processos de motor vivos, lidos de /proc: filhos de `parent` ou cuja linha de
+    comando casa com `pattern`. None fora do Linux.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    count = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            if parent is not None:
+                with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+                    # Campo 4 (ppid), depois do nome entre parênteses
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == parent:
+                        count += 1
+            else:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    if pattern.search(f.read().replace(b"\0", b" ").decode(errors="replace")):
+                        count += 1
+        except (OSError, IndexError, ValueError):
+            continue
+    return count
+
+
+def _gauges(text, names):
+    values = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] in names:
+            values[parts[0]] = float(parts[1])
+    return values
+
+
+class LoadTest:
+    def __init__(self, client, corpus, depths, clients, seed=1, count_engines=None):
+        """
+        Args:
+            client (httpx.AsyncClient): Cliente apontado para a API
+            corpus (list): PGNs a reproduzir (em ciclo)
+            depths (list): Profundidades sorteadas por requisição
+            clients (int): Número de clientes distintos (X-Client-Id)
+            count_engines (callable): Conta os processos de motor vivos
+        """
+        self.client = client
+        self.corpus = corpus
+        self.depths = depths
+        self.clients = clients
+        self.rng = random.Random(seed)
+        self.count_engines = count_engines or (lambda: None)
+        self.results = []  # (fim em s desde o início, latência em s, status, profundidade)
+        self.in_flight = 0
+        self.timeline = []
+        self._games = itertools.cycle(corpus)
+        self._sent = 0
+        self.started = None
+
+    def _next_request(self):
+        self._sent += 1
+        payload = {"pgn": next(self._games), "depth": self.rng.choice(self.depths)}
+        headers = {"X-Client-Id": f"loadtest-{self._sent % self.clients}"}
+        return payload, headers
+
+    async def _send(self, payload, headers):
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.post("/api/analyze", json=payload, headers=headers)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        end = time.perf_counter()
+        self.results.append((end - self.started, end - start, status, payload["depth"]))
+
+    def _done(self, requests, deadline):
+        if requests is not None and self._sent >= requests:
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    async def _open_loop(self, rate, concurrency, requests, deadline):
+        slots = asyncio.Semaphore(concurrency)
+        tasks = set()
+
+        async def send(payload, headers):
+            try:
+                await self._send(payload, headers)
+            finally:
+                slots.release()
+
+        while not self._done(requests, deadline):
+            # Com todas as vagas ocupadas, a próxima chegada espera (o atraso entra na latência seguinte)
+            await slots.acquire()
+            task = asyncio.create_task(send(*self._next_request()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            await asyncio.sleep(self.rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    async def _closed_loop(self, concurrency, requests, deadline):
+        async def worker():
+            while not self._done(requests, deadline):
+                await self._send(*self._next_request())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def _sample(self, interval):
+        """
+        Uma linha da linha do tempo a cada `interval` segundos.
+        """
+        last = 0
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter() - self.started
+            window = self.results[last:]
+            last = len(self.results)
+            row = {
+                "t": round(now, 1),
+                "completed": len(self.results),
+                "throughput": round(len(window) / interval, 2),
+                "errors": sum(1 for r in window if r[2] != 200),
+                "in_flight": self.in_flight,
+                "engines": self.count_engines(),
+                **_latency_summary([r[1] for r in window if r[2] == 200]),
+            }
+            try:
+                text = (await self.client.get("/api/metrics")).text
+                gauges = _gauges(text, ("chessify_pool_size", "chessify_pool_idle", "chessify_scheduler_running", "chessify_scheduler_queued"))
+                row["engines_busy"] = int(gauges["chessify_pool_size"] - gauges["chessify_pool_idle"])
+                row["running"] = int(gauges["chessify_scheduler_running"])
+                row["queued"] = int(gauges["chessify_scheduler_queued"])
+            except (httpx.HTTPError, KeyError):
+                pass
+            self.timeline.append(row)
+            print("  ".join(f"{key}={value}" for key, value in row.items()), flush=True)
+
+    async def run(self, rate, concurrency, requests=None, duration=None, interval=5.0):
+        self.started = time.perf_counter()
+        deadline = self.started + duration if duration else None
+        sampler = asyncio.create_task(self._sample(interval))
+        try:
+            if rate:
+                await self._open_loop(rate, concurrency, requests, deadline)
+            else:
+                await self._closed_loop(concurrency, requests, deadline)
+        finally:
+            sampler.cancel()
+            try:
+                await sampler
+            except asyncio.CancelledError:
+                pass
+        return self.summary(time.perf_counter() - self.started)
+
+    def summary(self, elapsed):
+        statuses = {}
+        for _, _, status, _ in self.results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        ok = [r for r in self.results if r[2] == 200]
+        by_depth = {}
+        for depth in sorted(set(r[3] for r in ok)):
+            latencies = [r[1] for r in ok if r[3] == depth]
+            by_depth[str(depth)] = {"requests": len(latencies), **_latency_summary(latencies)}
+        total = len(self.results)
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "ok": len(ok),
+            "throughput": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round((total - len(ok)) / total, 4) if total else 0.0,
+            "statuses": statuses,
+            **_latency_summary([r[1] for r in ok]),
+            "by_depth": by_depth,
+        }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client, process, timeout=120):
+    # O servidor aceita conexões antes do aquecimento: espera /api/ready
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"uvicorn terminou com código {process.returncode}")
+        try:
+            if (await client.get("/api/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"servidor não ficou pronto em {timeout}s")
+
+
+async def run(args):
+    corpus = load_corpus(args.pgn, args.games, args.seed)
+    timeout = httpx.Timeout(args.timeout)
+    process = None
+    lifespan = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+        pattern = re.compile(args.engine_pattern)
+        count_engines = lambda: engine_processes(pattern=pattern)
+    elif args.uvicorn:
+        port = _free_port()
+        process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                                   cwd=BACKEND_DIR, env=os.environ.copy())
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=timeout)
+        count_engines = lambda: engine_processes(parent=process.pid)
+    else:
+        from app import app
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+        count_engines = lambda: engine_processes(parent=os.getpid())
+    try:
+        await _wait_ready(client, process)
+        print(f"{len(corpus)} partidas, profundidades {args.depths}, "
+              f"{'%s req/s' % args.rate if args.rate else 'carga fechada'}, concorrência {args.concurrency}", flush=True)
+        test = LoadTest(client, corpus, args.depths, args.clients, seed=args.seed, count_engines=count_engines)
+        summary = await test.run(args.rate, args.concurrency, args.requests, args.duration, args.interval)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        report = {"config": {key: value for key, value in vars(args).items() if key != "output"},
+                  "summary": summary, "timeline": test.timeline}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if summary["ok"] else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Servidor já em execução (ex.: http://localhost:8000)")
+    target.add_argument("--uvicorn", action="store_true", help="Sobe um uvicorn local para o teste")
+    parser.add_argument("--stub", action="store_true", help="Usa o motor falso (benchmarks/fake_engine.py)")
+    parser.add_argument("--stub-nps", type=float, default=20_000_000, help="Nós por segundo simulados pelo motor falso")
+    parser.add_argument("--engine-pattern", default="stockfish|fake_engine", help="Regex dos processos de motor (modo --url)")
+    parser.add_argument("--pgn", help="Arquivo PGN com as partidas a reproduzir")
+    parser.add_argument("--games", type=int, default=100, help="Partidas aleatórias geradas, sem --pgn")
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 12, 15])
+    parser.add_argument("--rate", type=float, default=2.0, help="Chegadas por segundo (0 = carga fechada)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=4, help="Clientes distintos (X-Client-Id)")
+    parser.add_argument("--requests", type=int, default=None, help="Total de requisições (padrão: 100 sem --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Duração do teste em segundos")
+    parser.add_argument("--interval", type=float, default=5.0, help="Intervalo da linha do tempo em segundos")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Tempo limite de cada requisição")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Grava resumo e linha do tempo em JSON")
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 100
+    if args.stub:
+        # Herdado pelo uvicorn (--uvicorn) e lido pela config (no mesmo processo)
+        os.environ["STOCKFISH_PATH"] = FAKE_ENGINE
+        os.environ["FAKE_ENGINE_NPS"] = str(args.stub_nps)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
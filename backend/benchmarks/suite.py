@@ -0,0 +1,244 @@
+"""
+Suíte de benchmarks do backend, com resultado em JSON para comparar commits.
+
+Mede:
+    - partida a frio de load_fen_openings (TSVs) e load_lichess_openings (banco/trie)
+    - get_opening_by_fen e OpeningTrie.search por lance
+    - classify_move por chamada
+    - análise completa (analyze_states) de partidas curta, média e longa
+
+A análise usa o motor falso de benchmarks/fake_engine.py (só o custo do Python);
+com --engine, usa um motor de verdade (ex.: o Stockfish instalado).
+
+Uso (a partir de backend/):
+    python -m benchmarks.suite --output resultados.json
+    python -m benchmarks.suite --engine /usr/local/bin/stockfish --depth 12
+    python -m benchmarks.suite --compare base.json
+    python -m benchmarks.suite --only classify analyze
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import chess.pgn
+
+from services.analysis import analyze_states, game_states
+from services.evaluation import classify_move
+from utils import eval_cache, fen_openings, opening_db, openings
+from utils.engine_pool import EnginePool
+from utils.eval_cache import EvalCache
+from utils.opening_db import _read_tsv_rows
+from utils.trie import OpeningTrie
+from utils.uci import UciEngine
+from benchmarks.bench_opening_lookup import REFERENCE_PGN
+from benchmarks.bench_pipeline import random_game_pgn
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_engine.py")
+
+# Partidas de referência da análise completa
+GAMES = {
+    "short": "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O *",
+    "medium": REFERENCE_PGN,
+    "long": random_game_pgn(200, seed=7),
+}
+
+
+def _best_of(run, rounds):
+    """
+    Menor tempo (s) de `rounds` execuções: o menos afetado por ruído da máquina.
+    """
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def _result(value, unit, **extra):
+    return {"value": round(value, 3), "unit": unit, **extra}
+
+
+def _reference_game():
+    game = chess.pgn.read_game(io.StringIO(REFERENCE_PGN))
+    board = game.board()
+    fens, sans = [], []
+    for move in game.mainline_moves():
+        sans.append(board.san(move))
+        board.push(move)
+        fens.append(board.fen())
+    return fens, sans
+
+
+def bench_cold_start(rounds):
+    def fen_map():
+        fen_openings._fen_to_opening = None
+        fen_openings.load_fen_openings()
+
+    def trie():
+        openings._opening_trie = None
+        opening_db._opening_db = None
+        openings.load_lichess_openings()
+
+    fen_best, fen_median = _best_of(fen_map, rounds)
+    trie_best, trie_median = _best_of(trie, rounds)
+    return {
+        "cold_start.load_fen_openings": _result(fen_best * 1000, "ms", median=round(fen_median * 1000, 3)),
+        "cold_start.load_lichess_openings": _result(trie_best * 1000, "ms", median=round(trie_median * 1000, 3)),
+    }
+
+
+def bench_opening_lookup(rounds):
+    fens, sans = _reference_game()
+    fen_openings.get_opening_by_fen(fens[0])  # banco já aberto: mede só a consulta
+    prefixes = [sans[:i] for i in range(1, len(sans) + 1)]
+    memory_trie = OpeningTrie()
+    for eco_code, opening_name, moves in _read_tsv_rows():
+        memory_trie.insert(moves, eco_code, opening_name)
+    mapped_trie = openings.load_lichess_openings()
+    repeat = 20
+
+    def by_fen():
+        for _ in range(repeat):
+            for fen in fens:
+                fen_openings.get_opening_by_fen(fen)
+
+    def search(trie):
+        def run():
+            for _ in range(repeat):
+                for prefix in prefixes:
+                    trie.search(prefix)
+        return run
+
+    calls = repeat * len(fens)
+    results = {}
+    for name, run in (("get_opening_by_fen", by_fen),
+                      ("opening_trie.search", search(memory_trie)),
+                      ("mapped_trie.search", search(mapped_trie))):
+        best, median = _best_of(run, rounds)
+        results[f"opening_lookup.{name}"] = _result(best / calls * 1e6, "us/call", median=round(median / calls * 1e6, 3))
+    return results
+
+
+def bench_classify(rounds):
+    fens, sans = _reference_game()
+    cases = []
+    for i, (fen, san) in enumerate(zip(fens, sans)):
+        delta = (i * 37) % 400 - 200
+        best = san if i % 3 == 0 else sans[i - 1]
+        cases.append((delta, san, best, fen, fens[i - 1] if i else None, i // 2 + 1, i < 10))
+
+    def run():
+        for delta, san, best, fen, prev_fen, number, in_book in cases:
+            classify_move(delta, san, best, fen, eval_best=delta, eval_played=0, prev_fen=prev_fen,
+                          move_number=number, in_book=in_book, sacrifice=False, piece_count=20)
+
+    best, median = _best_of(run, rounds * 10)
+    return {"classify_move": _result(best / len(cases) * 1e6, "us/call", median=round(median / len(cases) * 1e6, 3))}
+
+
+async def _analyze_games(engine, depth, rounds):
+    pool = EnginePool(size=1, factory=lambda: UciEngine(engine, parameters={"Threads": 1, "Hash": 16}))
+    await pool.start()
+    results = {}
+    try:
+        for name, pgn in GAMES.items():
+            times = []
+            for _ in range(rounds):
+                # Caches vazios: a busca de cada posição faz parte do custo medido
+                eval_cache._eval_cache = EvalCache(db_path=None)
+                start = time.perf_counter()
+                start_fen, states = game_states(chess.pgn.read_game(io.StringIO(pgn)))
+                await analyze_states(states, start_fen, pool, depth=depth)
+                times.append(time.perf_counter() - start)
+            plies = len(states)
+            best = min(times)
+            results[f"analyze.{name}"] = _result(best * 1000, "ms", plies=plies, depth=depth,
+                                                  per_ply_us=round(best / plies * 1e6, 1),
+                                                  median=round(statistics.median(times) * 1000, 3))
+    finally:
+        await pool.close()
+    return results
+
+
+def bench_analyze(rounds, engine, depth):
+    return asyncio.run(_analyze_games(engine, depth, rounds))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Linhas com a variação de cada medida em relação a um JSON anterior (tempo: menor é melhor).
+    """
+    lines = []
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old["value"]:
+            continue
+        change = (result["value"] - old["value"]) / old["value"] * 100
+        lines.append(f"{name:40s} {old['value']:12.3f} -> {result['value']:12.3f} {result['unit']:8s} {change:+7.1f}%")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default=FAKE_ENGINE, help="Motor UCI da análise completa (padrão: motor falso)")
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=["cold_start", "opening_lookup", "classify", "analyze"])
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    benches = {
+        "cold_start": lambda: bench_cold_start(args.rounds),
+        "opening_lookup": lambda: bench_opening_lookup(args.rounds),
+        "classify": lambda: bench_classify(args.rounds),
+        "analyze": lambda: bench_analyze(args.rounds, args.engine, args.depth),
+    }
+    results = {}
+    for name in args.only or benches:
+        results.update(benches[name]())
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "engine": "fake" if args.engine == FAKE_ENGINE else args.engine,
+            "depth": args.depth,
+            "rounds": args.rounds,
+        },
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"{name:40s} {result['value']:12.3f} {result['unit']}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nComparação com {args.compare} (commit {baseline.get('meta', {}).get('commit')}):")
+        print("\n".join(compare(results, baseline)))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,91 @@
 """
 Configurações globais do projeto.
 """
+import json
 import os
+import shutil
 
-STOCKFISH_PATH = os.path.join(os.path.dirname(__file__), "stockfish", "stockfish-windows-x86-64-avx2.exe")
+BASE_DIR = os.path.dirname(__file__)
+
+# Código-fonte do Stockfish e motor provisionado (python -m utils.engine_provision build)
+STOCKFISH_SOURCE_DIR = os.path.join(BASE_DIR, "stockfish")
+ENGINE_DIR = os.environ.get("ENGINE_DIR", os.path.join(BASE_DIR, "data", "engine"))
+ENGINE_CALIBRATION_PATH = os.path.join(ENGINE_DIR, "calibration.json")
+
+
+def _default_stockfish_path():
+    # Ordem: motor provisionado, executável do Windows incluído no repo, stockfish do PATH
+    provisioned = os.path.join(ENGINE_DIR, "stockfish.exe" if os.name == "nt" else "stockfish")
+    if os.path.exists(provisioned):
+        return provisioned
+    if os.name == "nt":
+        return os.path.join(STOCKFISH_SOURCE_DIR, "stockfish-windows-x86-64-avx2.exe")
+    return shutil.which("stockfish") or provisioned
+
+
+def _load_calibration():
+    try:
+        with open(ENGINE_CALIBRATION_PATH, encoding="utf-8") as f:
+            return json.load(f).get("recommended", {})
+    except (OSError, ValueError):
+        return {}
+
+
+STOCKFISH_PATH = os.environ.get("STOCKFISH_PATH") or _default_stockfish_path()
 DEFAULT_DEPTH = 15
+
+# Pool de motores: processos Stockfish iniciados no startup e reutilizados entre requisições.
+# Sem variável de ambiente, tamanho/Threads/Hash vêm da calibração do provisionamento.
+_CALIBRATION = _load_calibration()
+ENGINE_POOL_SIZE = int(os.environ.get("ENGINE_POOL_SIZE", _CALIBRATION.get("pool_size", 2)))
+ENGINE_ACQUIRE_TIMEOUT = float(os.environ.get("ENGINE_ACQUIRE_TIMEOUT", "30"))
+# Threads/Hash fixos por motor: com Threads=1 a busca de cada posição é determinística.
+# A calibração nunca muda Threads (núcleos extras viram motores); ENGINE_THREADS > 1 troca
+# o determinismo (análise paralela igual à sequencial, cache reproduzível) por buscas mais rápidas
+ENGINE_THREADS = int(os.environ.get("ENGINE_THREADS", "1"))
+ENGINE_HASH_MB = int(os.environ.get("ENGINE_HASH_MB", _CALIBRATION.get("hash_mb", 16)))
+# Busca curta feita por cada motor no aquecimento (carrega a rede NNUE antes da 1ª requisição)
+WARMUP_DEPTH = int(os.environ.get("WARMUP_DEPTH", "10"))
+# Etapa do aquecimento que falha é refeita após um intervalo que dobra a cada tentativa
+WARMUP_RETRY_DELAY = float(os.environ.get("WARMUP_RETRY_DELAY", "1"))
+WARMUP_RETRY_MAX_DELAY = float(os.environ.get("WARMUP_RETRY_MAX_DELAY", "30"))
+
+# Número padrão de motores usados em paralelo na análise de UMA partida
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "1"))
+# Sessão de partida (um motor, hash preservado entre os lances): busca do último lance para o primeiro
+GAME_SESSION_REVERSE = os.environ.get("GAME_SESSION_REVERSE", "1") == "1"
+
+# Fila de admissão das análises (custo de uma partida = lances x profundidade)
+SCHEDULER_MAX_QUEUE = int(os.environ.get("SCHEDULER_MAX_QUEUE", "32"))
+SCHEDULER_MAX_QUEUE_COST = int(os.environ.get("SCHEDULER_MAX_QUEUE_COST", "40000"))
+
+# Etapa anterior à busca: opcionalmente dispensa o motor em posições de livro (os lances de
+# livro ficam sem avaliação, por isso vem desligado) e reutiliza a PV anterior quando o lance
+# jogado é o melhor lance (avaliação com um lance a menos de profundidade)
+ELIDE_BOOK_SEARCH = os.environ.get("ELIDE_BOOK_SEARCH", "0") == "1"
+ELIDE_REUSE_PV = os.environ.get("ELIDE_REUSE_PV", "0") == "1"
+
+# Modo com orçamento (budget_ms/budget_nodes): profundidade da passada rasa e critérios
+# para aprofundar um lance (perto de um limite de classificação ou avaliação instável)
+BUDGET_SHALLOW_DEPTH = int(os.environ.get("BUDGET_SHALLOW_DEPTH", "8"))
+BUDGET_THRESHOLD_MARGIN_CP = int(os.environ.get("BUDGET_THRESHOLD_MARGIN_CP", "15"))
+BUDGET_SWING_CP = int(os.environ.get("BUDGET_SWING_CP", "40"))
+
+# Cache de avaliações (hash Zobrist -> linhas do motor); EVAL_CACHE_DB ativa o nível em disco (SQLite)
+EVAL_CACHE_SIZE = int(os.environ.get("EVAL_CACHE_SIZE", "200000"))
+EVAL_CACHE_DB = os.environ.get("EVAL_CACHE_DB") or None
+# Gravações no SQLite acumuladas antes de um commit (um executemany por lote)
+EVAL_CACHE_DB_BATCH = int(os.environ.get("EVAL_CACHE_DB_BATCH", "256"))
+
+# Cache de análises completas (por conteúdo da partida), com reaproveitamento de prefixos
+GAME_CACHE_SIZE = int(os.environ.get("GAME_CACHE_SIZE", "1000"))
+
+# Banco de aberturas compilado a partir de tsv/ (reconstruído automaticamente quando os TSVs mudam)
+OPENING_DB_PATH = os.environ.get("OPENING_DB_PATH", os.path.join(BASE_DIR, "data", "openings.bin"))
+
+# Livros Polyglot (.bin) consultados em ordem de prioridade, separados por os.pathsep; os ausentes são ignorados
+POLYGLOT_BOOKS = [path for path in os.environ.get("POLYGLOT_BOOKS", os.path.join(BASE_DIR, "Cerebellum3Merge.bin")).split(os.pathsep) if path]
+POLYGLOT_CACHE_SIZE = int(os.environ.get("POLYGLOT_CACHE_SIZE", "4096"))
+
+# Nível do logging da aplicação (DEBUG mostra cada busca do motor; INFO, um resumo por requisição)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "WARNING").upper()
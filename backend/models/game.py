@@ -1,17 +1,35 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Literal
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, Optional, List, Literal
 
 class AnalyzeRequest(BaseModel):
     pgn: Optional[str] = None
     fen: Optional[str] = None
     source: Optional[Literal["pgn", "fen", "lichess", "chess.com"]] = None
     depth: Optional[int] = Field(default=15, ge=1, le=30)
+    multipv: Optional[int] = Field(default=1, ge=1, le=5)
+    workers: Optional[int] = Field(default=None, ge=1, le=16)
+    # Orçamento por partida: com um deles, `depth` vira a profundidade máxima
+    budget_ms: Optional[int] = Field(default=None, ge=50, le=600000)
+    budget_nodes: Optional[int] = Field(default=None, ge=1000)
+
+class StreamAnalyzeRequest(AnalyzeRequest):
+    # Passada rápida em toda a partida antes da análise completa
+    refine: bool = False
+    quick_depth: Optional[int] = Field(default=8, ge=1, le=30)
+
+class MoveAlternative(BaseModel):
+    san: str
+    uci: str
+    eval_cp: Optional[int] = None
+    eval_mate: Optional[int] = None
+    pv: List[str] = []
 
 class Move(BaseModel):
     ply: int
     san: str
     from_: str = Field(..., alias="from")
     to: str
+    uci: Optional[str] = None
     fen: str
     eval_cp: Optional[int] = None
     eval_mate: Optional[int] = None
@@ -19,10 +37,55 @@ class Move(BaseModel):
     delta_cp: Optional[int] = None
     classification: str
     missed_win: Optional[bool] = None
+    depth: Optional[int] = None
+    alternatives: Optional[List[MoveAlternative]] = None
+
+class SearchStats(BaseModel):
+    # Posições enviadas ao motor (ou servidas pelo cache) e posições resolvidas sem busca
+    searched: int = 0
+    skipped: int = 0
+    terminal: int = 0
+    forced: int = 0
+    book: int = 0
+    pv_reused: int = 0
+    # Posições dispensadas porque os lances vieram de uma análise em cache do prefixo
+    reused: int = 0
+
+class BudgetStats(BaseModel):
+    budget_ms: Optional[int] = None
+    budget_nodes: Optional[int] = None
+    spent_ms: int = 0
+    spent_nodes: int = 0
+    # Posições buscadas de novo na profundidade máxima
+    deepened: int = 0
+
+class SideStats(BaseModel):
+    moves: int = 0
+    # Perda média de centipawns e precisão (0-100); None sem lances avaliados
+    acpl: Optional[float] = None
+    accuracy: Optional[float] = None
+    classifications: Dict[str, int] = {}
+
+class CriticalMoment(BaseModel):
+    ply: int
+    san: str
+    # Probabilidade de vitória das brancas antes e depois do lance
+    win_before: float
+    win_after: float
+
+class GameStats(BaseModel):
+    white: SideStats
+    black: SideStats
+    # Probabilidade de vitória das brancas (0-100) em cada posição, a partir da inicial
+    win_probability: List[Optional[float]]
+    critical_moments: List[CriticalMoment] = []
 
 class Summary(BaseModel):
     winner: Optional[Literal["white", "black", "draw"]] = None
     avg_depth: int
+    search: Optional[SearchStats] = None
+    budget: Optional[BudgetStats] = None
+    stats: Optional[GameStats] = None
 
 class OpeningInfo(BaseModel):
     eco: str
@@ -32,3 +95,20 @@ class AnalyzeResponse(BaseModel):
     opening: Optional[OpeningInfo] = None
     moves: List[Move]
     summary: Summary
+
+class BatchGame(BaseModel):
+    # Uma partida do lote: profundidade/MultiPV próprios ou os do lote. Orçamento e
+    # workers não se aplicam (cada partida do lote usa um motor), então são recusados
+    model_config = ConfigDict(extra="forbid")
+
+    pgn: Optional[str] = None
+    fen: Optional[str] = None
+    source: Optional[Literal["pgn", "fen", "lichess", "chess.com"]] = None
+    depth: Optional[int] = Field(default=None, ge=1, le=30)
+    multipv: Optional[int] = Field(default=None, ge=1, le=5)
+
+class BatchAnalyzeRequest(BaseModel):
+    pgn: Optional[str] = None
+    games: Optional[List[BatchGame]] = None
+    depth: Optional[int] = Field(default=15, ge=1, le=30)
+    multipv: Optional[int] = Field(default=1, ge=1, le=5)
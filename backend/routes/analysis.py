@@ -1,102 +1,197 @@
-from fastapi import APIRouter, Body, HTTPException
-from models.game import AnalyzeRequest, AnalyzeResponse, Move, Summary, OpeningInfo
-from services.evaluation import evaluate_positions, classify_move, is_missed_win
-from utils.fen_openings import classify_move_by_fen, detect_opening_info_by_fen
-from config import STOCKFISH_PATH
-import chess
-import chess.pgn
-import io
-from utils.stockfish import Engine
+import asyncio
+from functools import partial
+from typing import Optional
+from fastapi import APIRouter, Body, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from models.game import AnalyzeRequest, AnalyzeResponse, BatchAnalyzeRequest, StreamAnalyzeRequest
+from services.analysis import analyze_request_cached, analyze_batch, stream_states, request_states, game_states, read_games, InvalidPosition
+from utils.engine_pool import get_engine_pool, EnginePoolTimeout
+from utils.eval_cache import get_eval_cache
+from utils.game_cache import get_game_cache
+from utils.scheduler import get_scheduler, game_cost, SchedulerSaturated, INTERACTIVE, BATCH
+from utils import metrics
+from pydantic import BaseModel
+import json
 
 router = APIRouter()
 
+# Intervalo entre as verificações de desconexão do cliente durante uma análise
+DISCONNECT_POLL_SECONDS = 0.5
+
+def _client_id(http_request):
+    # Cliente para o rodízio da fila: identificação explícita ou o IP
+    return http_request.headers.get("x-client-id") or (http_request.client.host if http_request.client else "anon")
+
+def _saturated(error):
+    return HTTPException(status_code=429, detail="Muitas análises na fila. Tente novamente em instantes.", headers={"Retry-After": str(error.retry_after)})
+
+async def _until_disconnected(http_request, coro):
+    """
+    Executa a análise, cancelando-a (e liberando os motores) se o cliente desconectar.
+
+    Returns:
+        tuple: (True, resultado) ou (False, None) se o cliente desconectou
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return True, task.result()
+            if await http_request.is_disconnected():
+                return False, None
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+
+@router.get("/cache/stats")
+def cache_stats():
+    return get_eval_cache().stats()
+
+@router.get("/cache/games/stats")
+def game_cache_stats():
+    return get_game_cache().stats()
+
+@router.get("/scheduler/stats")
+def scheduler_stats():
+    return get_scheduler().stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Histogramas de tempo por etapa e das buscas do motor, mais o estado do pool,
+    da fila e dos caches, no formato de exposição do Prometheus.
+    """
+    text = metrics.render([
+        ("chessify_pool", get_engine_pool().stats(), "Pool de motores", ("restarts",)),
+        ("chessify_scheduler", get_scheduler().stats(), "Fila de admissão", ("admitted", "rejected", "cancelled")),
+        ("chessify_eval_cache", get_eval_cache().stats(), "Cache de avaliações", ("hits", "disk_hits", "misses")),
+        ("chessify_game_cache", get_game_cache().stats(), "Cache de análises", ("hits", "prefix_hits", "misses", "evictions")),
+    ])
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
 @router.post("/analyze", response_model=AnalyzeResponse)
-def analyze(request: AnalyzeRequest = Body(...)):
+async def analyze(http_request: Request, request: AnalyzeRequest = Body(...), if_none_match: Optional[str] = Header(default=None)):
     try:
         if not request.pgn and not request.fen:
             raise HTTPException(status_code=400, detail="Você deve informar um PGN ou FEN para análise.")
-        if request.pgn:
-            game = chess.pgn.read_game(io.StringIO(request.pgn))
-            board = game.board()
-            states = []
-            ply = 1
-            for move in game.mainline_moves():
-                san = board.san(move)
-                from_sq = chess.square_name(move.from_square)
-                to_sq = chess.square_name(move.to_square)
-                board.push(move)
-                fen = board.fen()
-                states.append({
-                    "ply": ply,
-                    "san": san,
-                    "from": from_sq,
-                    "to": to_sq,
-                    "fen": fen
-                })
-                ply += 1
-        elif request.fen:
-            states = [{"ply": 1, "san": "", "from": "", "to": "", "fen": request.fen}]
-        else:
-            states = []
-        fens = [s["fen"] for s in states]
-        evals = evaluate_positions(fens, depth=request.depth or 15)
-        engine = Engine(STOCKFISH_PATH)
-        engine.set_depth(request.depth or 15)
-        eco_book = None  # Polyglot removido, abertura será identificada automaticamente
-        moves = []
-        # Sequência de lances para verificar abertura
-        game_moves = []
-        all_fens = []  # Coleta todos os FENs para detecção de abertura
-        
-        for i, s in enumerate(states):
-            e = evals[i] if i < len(evals) else {"eval_cp": None, "eval_mate": None}
-            fen = s["fen"]
-            all_fens.append(fen)  # Coleta o FEN
-            played_move = s["san"]
-            prev_fen = states[i-1]["fen"] if i > 0 else chess.STARTING_FEN
-            best_move_uci = engine.best_move(prev_fen)
-            best_cp = best_mate = None
-            if best_move_uci:
-                engine.make_moves([best_move_uci])
-                best_info = engine.eval_fen(prev_fen)
-                if best_info["type"] == "cp":
-                    best_cp = best_info["value"]
-                else:
-                    best_mate = best_info["value"]
-                board = chess.Board(prev_fen)
-                best_move_san = board.san(chess.Move.from_uci(best_move_uci))
-            else:
-                best_move_san = played_move
-            played_cp = e["eval_cp"]
-            played_mate = e["eval_mate"]
-            missed_win = is_missed_win(best_cp, best_mate, played_cp, played_mate)
-            eval_played = played_cp if played_cp is not None else 0
-            eval_best = best_cp if best_cp is not None else eval_played
-            delta_cp = (eval_best - eval_played) if eval_best is not None and eval_played is not None else 0
-            # Adiciona o lance à sequência ANTES de classificar
-            game_moves.append(played_move)
-            # Passa a sequência completa para verificar se está na linha teórica correta
-            move_number = (i + 1) // 2 + 1 if i % 2 == 0 else (i + 1) // 2 + 1  # Número do movimento para as brancas/pretas
-            classification = "Chance Perdida" if missed_win else classify_move(delta_cp, played_move, best_move_san, fen, eco_book=eco_book, eval_best=eval_best, eval_played=eval_played, prev_fen=prev_fen, eval_mate=played_mate, full_game_moves=game_moves.copy(), move_number=move_number)
-            moves.append(Move(
-                **s,
-                eval_cp=played_cp,
-                eval_mate=played_mate,
-                best_move=best_move_san,
-                delta_cp=delta_cp,
-                classification=classification,
-                missed_win=missed_win
-            ))
-        
-        # Detecta a abertura baseada na posição final e anteriores (resolve transposições)
-        final_fen = states[-1]["fen"] if states else None
-        opening_info = detect_opening_info_by_fen(final_fen, all_fens) if final_fen else None
-        
-        opening = OpeningInfo(eco=opening_info['eco'], name=opening_info['name']) if opening_info else None
-        
-        summary = Summary(winner=None, avg_depth=request.depth or 15)
-        return AnalyzeResponse(opening=opening, moves=moves, summary=summary)
+        admission = partial(get_scheduler().admit, _client_id(http_request), priority=INTERACTIVE)
+        connected, outcome = await _until_disconnected(http_request, analyze_request_cached(request, get_engine_pool(), admission=admission))
+        if not connected:
+            # Ninguém vai ler a resposta
+            return Response(status_code=499)
+        key, result, cached = outcome
+        headers = {}
+        if key is not None:
+            # A chave da partida identifica a análise: o cliente pode revalidar com If-None-Match
+            etag = f'"{key}"'
+            if cached and if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+                return Response(status_code=304, headers={"ETag": etag})
+            headers["ETag"] = etag
+        # Serializada aqui (e não pelo FastAPI) para entrar no Server-Timing
+        with metrics.stage("serialize"):
+            body = result.model_dump_json(by_alias=True)
+        return Response(content=body, media_type="application/json", headers=headers)
     except HTTPException as e:
         raise e
+    except InvalidPosition as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SchedulerSaturated as e:
+        raise _saturated(e)
+    except EnginePoolTimeout:
+        raise HTTPException(status_code=503, detail="Todos os motores de análise estão ocupados. Tente novamente em instantes.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}. Por favor, verifique os dados enviados ou tente novamente mais tarde.")
+
+@router.post("/analyze/batch")
+async def analyze_batch_route(http_request: Request, request: BatchAnalyzeRequest = Body(...)):
+    """
+    Analisa várias partidas (PGN com várias partidas e/ou lista de jogos) e devolve
+    NDJSON: uma linha por partida, na ordem em que cada uma termina.
+    As partidas entram na fila de admissão com prioridade de lote.
+    """
+    if not request.pgn and not request.games:
+        raise HTTPException(status_code=400, detail="Você deve informar um PGN ou uma lista de partidas para análise.")
+    scheduler = get_scheduler()
+    try:
+        scheduler.check(0)
+    except SchedulerSaturated as e:
+        raise _saturated(e)
+    # Lote aceito: suas partidas esperam a vez em vez de serem recusadas
+    admission = partial(scheduler.admit, _client_id(http_request), priority=BATCH, reject=False)
+
+    def games():
+        # FEN/PGN inválido vira o erro dessa partida, sem derrubar o lote
+        if request.pgn:
+            for game in read_games(request.pgn):
+                try:
+                    start_fen, states = game_states(game)
+                except InvalidPosition as e:
+                    yield e
+                    continue
+                yield start_fen, states, None, None
+        for game_request in request.games or []:
+            try:
+                start_fen, states = request_states(game_request)
+            except InvalidPosition as e:
+                yield e
+                continue
+            yield start_fen, states, game_request.depth, game_request.multipv
+
+    async def lines():
+        results = analyze_batch(games(), get_engine_pool(), depth=request.depth or 15, multipv=request.multipv or 1, admission=admission)
+        async for index, result in results:
+            if isinstance(result, InvalidPosition):
+                payload = {"index": index, "status": "error", "detail": str(result)}
+            elif isinstance(result, Exception):
+                payload = {"index": index, "status": "error", "detail": f"Erro interno: {str(result)}"}
+            else:
+                payload = {"index": index, "status": "ok", "result": result.model_dump(mode="json", by_alias=True)}
+            yield json.dumps(payload, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _jsonable(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    return value
+
+@router.post("/analyze/stream")
+async def analyze_stream(http_request: Request, request: StreamAnalyzeRequest = Body(...)):
+    """
+    Análise progressiva via Server-Sent Events: um evento `move` por lance assim que
+    é classificado; com `refine`, eventos `refine` trazem a versão em profundidade
+    completa. Termina com `summary` (abertura e resumo) ou `error`.
+    """
+    if not request.pgn and not request.fen:
+        raise HTTPException(status_code=400, detail="Você deve informar um PGN ou FEN para análise.")
+    try:
+        start_fen, states = request_states(request)
+    except InvalidPosition as e:
+        # Antes de abrir o fluxo: o erro do cliente ainda pode ser um 400
+        raise HTTPException(status_code=400, detail=str(e))
+    depth, quick_depth = request.depth or 15, request.quick_depth or 8
+    cost = game_cost(len(states), depth + (quick_depth if request.refine and quick_depth < depth else 0))
+    scheduler = get_scheduler()
+    try:
+        scheduler.check(cost)
+    except SchedulerSaturated as e:
+        raise _saturated(e)
+    client = _client_id(http_request)
+
+    async def events():
+        try:
+            # Desconexão do cliente cancela o gerador, e com ele a vaga e o motor
+            async with scheduler.admit(client, cost, INTERACTIVE, reject=False):
+                async for event, data in stream_states(states, start_fen, get_engine_pool(), depth=depth, multipv=request.multipv or 1, refine=request.refine, quick_depth=quick_depth):
+                    yield f"event: {event}\ndata: {json.dumps(_jsonable(data), ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'Erro interno: {str(e)}'}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
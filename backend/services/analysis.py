@@ -0,0 +1,429 @@
+"""
+Pipeline de análise de partidas: parsing, busca das posições, classificação dos
+lances e detecção da abertura. Usado pela rota única e pela rota em lote.
+"""
+import asyncio
+import io
+from contextlib import nullcontext
+from functools import partial
+
+import chess
+import chess.pgn
+
+from config import ANALYSIS_WORKERS
+from models.game import AnalyzeResponse, Move, MoveAlternative, Summary, OpeningInfo, SearchStats, BudgetStats, GameStats
+from services.budget import Budget, search_budgeted
+from services.elision import SearchPlan
+from services.game_stats import game_stats
+from services.plies import build_plies, fen_ply
+from services.evaluation import search_positions_async, search_positions_parallel, search_game_session, search_position, score_after_move, classify_move, is_missed_win
+from utils import metrics
+from utils.game_cache import get_game_cache, game_keys
+from utils.scheduler import game_cost
+from utils.opening_walker import OpeningWalker
+
+class InvalidPosition(ValueError):
+    """
+    FEN ou PGN do pedido que não descreve uma posição ou partida analisável (erro do cliente).
+    """
+
+def game_states(game):
+    """
+    Extrai os estados (lance a lance) de uma partida do python-chess, empurrando um
+    único tabuleiro pela partida.
+
+    Returns:
+        tuple: (start_fen, states) — states é uma lista de PlyContext
+
+    Raises:
+        InvalidPosition: PGN sem partida, sem lances legíveis, com lance ilegal ou
+                         com posição inicial ilegal
+    """
+    if game is None:
+        raise InvalidPosition("PGN inválido: nenhuma partida encontrada")
+    if game.errors:
+        # O python-chess para no primeiro lance ilegal: analisar só o começo esconderia o erro
+        raise InvalidPosition(f"PGN inválido: {game.errors[0]}")
+    board = game.board()
+    if not board.is_valid():
+        raise InvalidPosition(f"PGN inválido: posição inicial ilegal: {board.fen()}")
+    start_fen = board.fen()
+    states = build_plies(board, game.mainline_moves())
+    if not states:
+        raise InvalidPosition("PGN inválido: nenhum lance encontrado")
+    return start_fen, states
+
+def request_states(request):
+    """
+    Estados a analisar para um AnalyzeRequest (PGN ou FEN).
+
+    Returns:
+        tuple: (start_fen, states)
+
+    Raises:
+        InvalidPosition: FEN malformada ou ilegal
+    """
+    if request.pgn:
+        return game_states(chess.pgn.read_game(io.StringIO(request.pgn)))
+    if request.fen:
+        try:
+            return chess.STARTING_FEN, [fen_ply(request.fen)]
+        except ValueError as e:
+            raise InvalidPosition(f"FEN inválida: {e}") from e
+    return chess.STARTING_FEN, []
+
+def read_games(pgn_text):
+    """
+    Itera as partidas de um PGN com várias partidas, uma de cada vez.
+    """
+    stream = io.StringIO(pgn_text)
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            return
+        yield game
+
+def _alternatives(board, lines):
+    """
+    Converte as linhas MultiPV da posição anterior em alternativas (SAN + avaliação após o lance).
+    """
+    alternatives = []
+    for line in lines:
+        if not line["move"]:
+            continue
+        pv_board = board.copy(stack=False)
+        pv_san = []
+        for uci in line["pv"]:
+            move = chess.Move.from_uci(uci)
+            pv_san.append(pv_board.san(move))
+            pv_board.push(move)
+        eval_cp, eval_mate = score_after_move(line["eval_cp"], line["eval_mate"])
+        alternatives.append(MoveAlternative(san=pv_san[0], uci=line["move"], eval_cp=eval_cp, eval_mate=eval_mate, pv=pv_san))
+    return alternatives
+
+def game_moves(states):
+    """
+    Lances UCI da partida, ou None se os estados não formam uma sequência de lances
+    (ex.: análise de uma FEN avulsa).
+    """
+    moves = [s.uci for s in states]
+    return moves if all(moves) else None
+
+def plan_game(start_fen, states, multipv, walker, reused=0):
+    """
+    Etapa anterior à busca: uma passada pela teoria (lances de livro) e a decisão de
+    quais posições precisam do motor.
+
+    Returns:
+        tuple: (SearchPlan, lista in_book por lance)
+    """
+    in_book = [walker.push(s.san, s.fen) for s in states]
+    return SearchPlan(start_fen, states, in_book=in_book, multipv=multipv, reused=reused), in_book
+
+async def search_game(plan, pool, depth, multipv, workers):
+    """
+    Busca as posições da partida que o plano não dispensou, num único motor ou
+    dividida entre vários do pool. Com um motor e os lances da partida, usa uma
+    sessão de partida (hash preservado).
+
+    Returns:
+        list: Linhas de todas as posições (buscadas e resolvidas pelo plano)
+    """
+    fens, moves, keys = plan.fens, plan.moves, plan.keys
+    indices = plan.searched_indices()
+    workers = min(workers, pool.size)
+    if workers > 1 and not plan.reuse_pv:
+        found = await search_positions_parallel([fens[i] for i in indices], pool, workers, depth=depth, multipv=multipv, keys=[keys[i] for i in indices])
+        results = [None] * len(fens)
+        for index, lines in zip(indices, found):
+            results[index] = lines
+        return plan.resolve(results)
+    async with pool.acquire() as engine:
+        if plan.reuse_pv:
+            # Reutilizar a PV exige percorrer a partida em ordem
+            search = partial(search_position, engine, fens, depth=depth, multipv=multipv, moves=moves, keys=keys)
+            return [lines async for lines in plan.iter_resolved(search)]
+        if moves is not None:
+            results = await search_game_session(fens, moves, engine, depth=depth, multipv=multipv, indices=indices, keys=keys)
+        else:
+            found = await search_positions_async([fens[i] for i in indices], engine, depth=depth, multipv=multipv, keys=[keys[i] for i in indices])
+            results = [None] * len(fens)
+            for index, lines in zip(indices, found):
+                results[index] = lines
+        return plan.resolve(results)
+
+async def _recording(searches, seen):
+    # Repassa as linhas guardando-as (para as estatísticas do resumo)
+    async for lines in searches:
+        seen.append(lines)
+        yield lines
+
+async def _as_async_iter(items):
+    for item in items:
+        yield item
+
+async def classify_game(states, start_fen, searches, multipv=1, in_book=None):
+    """
+    Classifica os lances à medida que as buscas chegam.
+
+    Args:
+        states (list): PlyContext de game_states/request_states
+        start_fen (str): Posição antes do primeiro lance
+        searches (iterable): Linhas do motor para start_fen e para cada estado, em ordem
+                             (lista ou gerador assíncrono: cada lance sai assim que sua posição é buscada)
+        multipv (int): Alternativas por lance
+        in_book (list): Para cada lance, se está na teoria (padrão: calculado aqui)
+
+    Yields:
+        Move: um por lance
+    """
+    # Uma única busca por posição: a posição i-1 fornece o melhor lance e sua avaliação
+    # para o lance i; a posição i fornece a avaliação do lance jogado.
+    eco_book = None  # Polyglot removido, abertura será identificada automaticamente
+    if in_book is None:
+        walker = OpeningWalker(start_fen)
+        in_book = [walker.push(s.san, s.fen) for s in states]
+    if not hasattr(searches, "__anext__"):
+        searches = _as_async_iter(searches)
+    # Um único tabuleiro acompanha a partida (SAN das alternativas)
+    board = chess.Board(start_fen)
+    prev_fen = start_fen
+    prev_lines = await anext(searches)
+
+    for i, s in enumerate(states):
+        fen = s.fen
+        played_move = s.san
+        current_lines = await anext(searches)
+        played_line = current_lines[0] if current_lines else {"eval_cp": None, "eval_mate": None, "depth": None}
+        best_cp = best_mate = None
+        alternatives = None
+        if prev_lines and prev_lines[0]["move"]:
+            best_cp, best_mate = score_after_move(prev_lines[0]["eval_cp"], prev_lines[0]["eval_mate"])
+            alternatives = _alternatives(board, prev_lines)
+            best_move_san = alternatives[0].san
+        else:
+            best_move_san = played_move
+        played_cp = played_line["eval_cp"]
+        played_mate = played_line["eval_mate"]
+        missed_win = is_missed_win(best_cp, best_mate, played_cp, played_mate)
+        eval_played = played_cp if played_cp is not None else 0
+        eval_best = best_cp if best_cp is not None else eval_played
+        delta_cp = (eval_best - eval_played) if eval_best is not None and eval_played is not None else 0
+        move_number = s.ply // 2 + 1  # Número do movimento para as brancas/pretas
+        classification = "Chance Perdida" if missed_win else classify_move(delta_cp, played_move, best_move_san, fen, eco_book=eco_book, eval_best=eval_best, eval_played=eval_played, prev_fen=prev_fen, eval_mate=played_mate, move_number=move_number, in_book=in_book[i], sacrifice=s.is_sacrifice, piece_count=s.piece_count)
+        yield Move(
+            **s.move_fields(),
+            eval_cp=played_cp,
+            eval_mate=played_mate,
+            best_move=best_move_san,
+            delta_cp=delta_cp,
+            classification=classification,
+            missed_win=missed_win,
+            depth=played_line.get("depth"),
+            alternatives=alternatives if multipv > 1 else None
+        )
+        if s.move is not None:
+            board.push(s.move)
+        else:
+            board = chess.Board(fen)
+        prev_fen, prev_lines = fen, current_lines
+
+def _game_stats(start_fen, states, moves, start_lines):
+    # Estatísticas só fazem sentido para uma partida (não para uma FEN avulsa)
+    if not states or states[0].move is None:
+        return None
+    stats = game_stats(start_fen, moves, start_lines)
+    return GameStats(**stats) if stats is not None else None
+
+def _game_response(moves, walker, depth, plan=None, budget=None, stats=None):
+    # Abertura mais profunda vista pelo walker (inclui transposições)
+    opening_info = walker.opening_info()
+
+    opening = OpeningInfo(eco=opening_info['eco'], name=opening_info['name']) if opening_info else None
+
+    search = SearchStats(**plan.stats()) if plan is not None else None
+    budget_stats = BudgetStats(**budget.stats()) if budget is not None else None
+    summary = Summary(winner=None, avg_depth=depth, search=search, budget=budget_stats, stats=stats)
+    return AnalyzeResponse(opening=opening, moves=moves, summary=summary)
+
+async def analyze_states(states, start_fen, pool, depth=15, multipv=1, workers=ANALYSIS_WORKERS, budget=None, reuse=None):
+    """
+    Analisa uma partida já convertida em estados.
+
+    Args:
+        states (list): Estados de game_states/request_states
+        start_fen (str): Posição antes do primeiro lance
+        pool (EnginePool): Pool de motores
+        depth (int): Profundidade da busca
+        multipv (int): Alternativas por lance
+        workers (int): Motores usados em paralelo nesta partida
+        budget (Budget): Orçamento da partida; `depth` vira a profundidade máxima
+        reuse (list): Moves já classificados dos primeiros lances (prefixo em cache)
+
+    Returns:
+        AnalyzeResponse
+    """
+    reused = list(reuse or [])
+    with metrics.stage("openings"):
+        walker = OpeningWalker(start_fen)
+        plan, in_book = plan_game(start_fen, states, multipv, walker, reused=len(reused))
+    with metrics.stage("search"):
+        if budget is not None:
+            async with pool.acquire() as engine:
+                searches = await search_budgeted(plan, engine, depth, multipv, in_book, budget)
+        else:
+            searches = await search_game(plan, pool, depth, multipv, workers)
+    return await finish_game(states, start_fen, searches, walker, plan, in_book, depth, multipv, budget, reused)
+
+async def finish_game(states, start_fen, searches, walker, plan, in_book, depth=15, multipv=1, budget=None, reused=()):
+    """
+    Etapa posterior à busca: classificação dos lances, estatísticas e resumo.
+    Também usada pela análise em massa (services/archive.py), que busca as posições antes.
+
+    Args:
+        searches (list): Linhas de todas as posições (plan.resolve)
+        walker (OpeningWalker): Walker que já percorreu a partida (plan_game)
+        reused (list): Moves já classificados dos primeiros lances
+
+    Returns:
+        AnalyzeResponse
+    """
+    reused = list(reused)
+    first = len(reused)
+    with metrics.stage("classify"):
+        moves = reused + [move async for move in classify_game(states[first:], plan.fens[first], searches[first:], multipv, in_book[first:])]
+    with metrics.stage("stats"):
+        stats = _game_stats(start_fen, states, moves, searches[0])
+    return _game_response(moves, walker, depth, plan, budget, stats)
+
+async def stream_states(states, start_fen, pool, depth=15, multipv=1, refine=False, quick_depth=8):
+    """
+    Análise progressiva: cada lance é entregue assim que sua posição é buscada.
+    Com `refine`, faz antes uma passada rápida (quick_depth) na partida inteira e
+    depois reenvia cada lance com a profundidade completa.
+
+    Yields:
+        tuple: (evento, dados) — ("move", {stage, move}), ("refine", {stage, move})
+               e, ao final, ("summary", {opening, summary})
+    """
+    stages = [("quick", quick_depth), ("final", depth)] if refine and quick_depth < depth else [("final", depth)]
+    async with pool.acquire() as engine:
+        for index, (stage, stage_depth) in enumerate(stages):
+            event = "refine" if index > 0 else "move"
+            walker = OpeningWalker(start_fen)
+            plan, in_book = plan_game(start_fen, states, multipv, walker)
+            search = partial(search_position, engine, plan.fens, depth=stage_depth, multipv=multipv, moves=plan.moves, keys=plan.keys)
+            classified = []
+            resolved = []
+            async for move in classify_game(states, start_fen, _recording(plan.iter_resolved(search), resolved), multipv, in_book):
+                classified.append(move)
+                yield event, {"stage": stage, "move": move}
+    response = _game_response(classified, walker, depth, plan, stats=_game_stats(start_fen, states, classified, resolved[0] if resolved else None))
+    yield "summary", {"opening": response.opening, "summary": response.summary}
+
+def _admit(admission, plies, depth):
+    # Vaga na fila de admissão (custo = lances x profundidade); sem fila, entra direto
+    return admission(game_cost(len(plies), depth)) if admission is not None else nullcontext()
+
+async def analyze_request(request, pool, admission=None):
+    """
+    Args:
+        admission (callable): Recebe o custo da análise e devolve a vaga na fila
+                              (async context manager); padrão: sem fila
+    """
+    # O relógio do orçamento começa na chegada da requisição (inclui a espera por um motor)
+    budget = Budget(ms=request.budget_ms, nodes=request.budget_nodes) if request.budget_ms or request.budget_nodes else None
+    with metrics.stage("parse"):
+        start_fen, states = request_states(request)
+    depth = request.depth or 15
+    async with _admit(admission, states, depth):
+        return await analyze_states(states, start_fen, pool, depth=depth, multipv=request.multipv or 1, workers=request.workers or ANALYSIS_WORKERS, budget=budget)
+
+async def analyze_request_cached(request, pool, cache=None, admission=None):
+    """
+    analyze_request com o cache de análises completas: a mesma partida (mesma posição
+    inicial, lances, profundidade e MultiPV) volta do cache; uma partida que estende
+    outra já analisada reaproveita a classificação do prefixo e só analisa os lances novos.
+    Só a parte que usa os motores passa pela fila de admissão (`admission`).
+
+    Returns:
+        tuple: (chave da partida ou None, AnalyzeResponse, True se veio inteira do cache)
+    """
+    if request.budget_ms or request.budget_nodes:
+        # O resultado depende do relógio: não é endereçável pelo conteúdo
+        return None, await analyze_request(request, pool, admission), False
+    cache = cache if cache is not None else get_game_cache()
+    with metrics.stage("parse"):
+        start_fen, states = request_states(request)
+    depth, multipv = request.depth or 15, request.multipv or 1
+    moves = game_moves(states)
+    tokens = moves if moves is not None else [s.fen for s in states]
+    keys = game_keys(start_fen, tokens, depth, multipv)
+    cached = cache.get(keys[-1])
+    if cached is not None:
+        return keys[-1], cached, True
+    reuse = None
+    if moves is not None:
+        length, prefix = cache.longest_prefix(keys[:-1])
+        # O último lance do prefixo é refeito: a posição seguinte pode mudar sua avaliação
+        if length > 1:
+            reuse = prefix.moves[:length - 1]
+    async with _admit(admission, states[len(reuse or []):], depth):
+        response = await analyze_states(states, start_fen, pool, depth=depth, multipv=multipv, workers=request.workers or ANALYSIS_WORKERS, reuse=reuse)
+    cache.put(keys[-1], response)
+    return keys[-1], response, False
+
+async def _admitted(admission, states, depth, analyze):
+    async with _admit(admission, states, depth):
+        return await analyze()
+
+async def analyze_batch(games, pool, depth=15, multipv=1, admission=None):
+    """
+    Analisa várias partidas dividindo a capacidade do pool: cada partida ocupa um
+    motor, e há no máximo `pool.size` partidas em andamento (memória limitada,
+    independente do tamanho do lote).
+
+    Args:
+        games (iterable): (start_fen, states, depth, multipv) de cada partida, consumido sob
+                          demanda; depth/multipv None usam os do lote
+                          (ou uma Exception, devolvida como o resultado da partida)
+        depth (int): Profundidade padrão das partidas do lote
+        multipv (int): MultiPV padrão das partidas do lote
+        admission (callable): Vaga na fila de admissão de cada partida (ver analyze_request)
+
+    Yields:
+        tuple: (índice da partida, AnalyzeResponse ou Exception), na ordem em que terminam
+    """
+    games = enumerate(games)
+    running = {}
+
+    def submit_next():
+        for index, game in games:
+            if isinstance(game, Exception):
+                task = asyncio.get_running_loop().create_future()
+                task.set_exception(game)
+            else:
+                start_fen, states, game_depth, game_multipv = game
+                game_depth, game_multipv = game_depth or depth, game_multipv or multipv
+                analyze = partial(analyze_states, states, start_fen, pool, depth=game_depth, multipv=game_multipv, workers=1)
+                # O custo na fila de admissão usa a profundidade da própria partida
+                task = asyncio.ensure_future(_admitted(admission, states, game_depth, analyze))
+            running[task] = index
+            return True
+        return False
+
+    try:
+        for _ in range(pool.size):
+            if not submit_next():
+                break
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = running.pop(task)
+                error = task.exception()
+                yield index, (error if error is not None else task.result())
+                submit_next()
+    finally:
+        # Cliente desconectou/lote abandonado: cancela as partidas em andamento
+        for task in running:
+            task.cancel()
@@ -0,0 +1,389 @@
+"""
+Análise em massa de arquivos PGN (centenas de milhares de partidas), fora do caminho HTTP.
+
+- Índice de offsets: uma passada pelo arquivo grava o offset (em bytes) do início de
+  cada partida em `<pgn>.idx`. Com ele as partidas são lidas uma a uma, sem carregar
+  o arquivo, e dá para dividir o trabalho (--shard K/N) e retomar de qualquer partida.
+  O índice é refeito se o PGN mudar (tamanho ou data de modificação).
+- Posições únicas: as partidas são processadas em blocos. As posições que o plano de
+  busca manda ao motor são reunidas no bloco inteiro, sem repetição, e buscadas uma
+  única vez em todos os motores do pool. O cache de avaliações em disco (SQLite) guarda
+  o resultado entre blocos e entre execuções, então uma posição vista antes não é
+  buscada de novo.
+- Classificação: cada partida passa pela mesma etapa da API (finish_game:
+  classify_move, estatísticas, resumo), lendo as linhas reunidas para o bloco.
+- Saída: uma linha JSON por partida (JSONL), na ordem do arquivo, gravada a cada bloco.
+- Checkpoint: depois de cada bloco, `<saída>.ckpt` registra a próxima partida e o
+  tamanho da saída. Após uma queda, a execução com os mesmos argumentos descarta o
+  que foi gravado depois do último checkpoint e continua dali.
+
+Uso (a partir de backend/):
+    python -m services.archive index partidas.pgn
+    python -m services.archive analyze partidas.pgn --output analises.jsonl --depth 12
+    python -m services.archive analyze partidas.pgn --output parte0.jsonl --shard 0/4
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+import chess.pgn
+
+from config import DEFAULT_DEPTH, EVAL_CACHE_SIZE, ENGINE_POOL_SIZE, STOCKFISH_PATH
+from services.analysis import game_states, plan_game, finish_game
+from services.evaluation import search_positions_parallel
+from utils.engine_pool import EnginePool
+from utils.eval_cache import EvalCache
+from utils.opening_walker import OpeningWalker
+
+INDEX_MAGIC = b"CSZPGNX1"
+# magic, tamanho do PGN, mtime (ns) e número de partidas
+_INDEX_HEADER = struct.Struct("<8sQQQ")
+# Tags copiadas para a saída
+HEADERS = ("Event", "Site", "Date", "Round", "White", "Black", "Result", "WhiteElo", "BlackElo", "ECO")
+
+
+def _write_atomic(path, data):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def scan_offsets(stream):
+    """
+    Offsets do início de cada partida: a primeira linha de tag ("[...") depois do
+    texto dos lances (ou do início do arquivo).
+
+    Args:
+        stream: Arquivo aberto em modo binário
+    """
+    offsets = array("Q")
+    offset = 0
+    in_tags = False
+    for line in stream:
+        stripped = line.lstrip(b"\xef\xbb\xbf \t")
+        if stripped.startswith(b"["):
+            if not in_tags:
+                offsets.append(offset)
+                in_tags = True
+        elif stripped.strip():
+            in_tags = False
+        offset += len(line)
+    return offsets
+
+
+def _pgn_signature(pgn_path):
+    stat = os.stat(pgn_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_index(pgn_path, rebuild=False):
+    """
+    Offsets das partidas do PGN, do índice `<pgn>.idx` (refeito se ausente ou desatualizado).
+
+    Returns:
+        array: offset (bytes) do início de cada partida
+    """
+    index_path = pgn_path + ".idx"
+    size, mtime = _pgn_signature(pgn_path)
+    if not rebuild and os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            header = f.read(_INDEX_HEADER.size)
+            try:
+                magic, indexed_size, indexed_mtime, count = _INDEX_HEADER.unpack(header)
+            except struct.error:
+                magic = None
+            if magic == INDEX_MAGIC and (indexed_size, indexed_mtime) == (size, mtime):
+                offsets = array("Q")
+                offsets.frombytes(f.read(count * offsets.itemsize))
+                if len(offsets) == count:
+                    return offsets
+    with open(pgn_path, "rb", buffering=1 << 20) as f:
+        offsets = scan_offsets(f)
+    try:
+        _write_atomic(index_path, _INDEX_HEADER.pack(INDEX_MAGIC, size, mtime, len(offsets)) + offsets.tobytes())
+    except OSError as e:
+        # Diretório somente-leitura: segue com o índice em memória
+        print(f"Aviso: índice não gravado ({e})", file=sys.stderr)
+    return offsets
+
+
+class PgnArchive:
+    """
+    Acesso aleatório às partidas de um PGN pelo índice de offsets.
+    """
+
+    def __init__(self, pgn_path, rebuild_index=False):
+        self.path = pgn_path
+        self.offsets = load_index(pgn_path, rebuild_index)
+        self.size = os.path.getsize(pgn_path)
+        self._file = open(pgn_path, "rb")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def read_text(self, index):
+        start = self.offsets[index]
+        end = self.offsets[index + 1] if index + 1 < len(self.offsets) else self.size
+        self._file.seek(start)
+        return self._file.read(end - start).decode("utf-8", errors="replace")
+
+    def read_game(self, index):
+        return chess.pgn.read_game(io.StringIO(self.read_text(index)))
+
+    def close(self):
+        self._file.close()
+
+
+def parse_shard(text):
+    """
+    "K/N" -> (K, N), com 0 <= K < N.
+    """
+    try:
+        shard, shards = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("use K/N, ex.: 0/4")
+    if not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError("K deve estar entre 0 e N-1")
+    return shard, shards
+
+
+class CheckpointMismatch(Exception):
+    """O checkpoint não corresponde a esta execução ou à saída em disco."""
+
+
+class Checkpoint:
+    """
+    Progresso de uma execução, gravado de forma atômica em `<saída>.ckpt`.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params  # argumentos que precisam ser iguais para retomar
+        self.next_game = params["shard"]
+        self.output_bytes = 0
+        self.games = 0
+        self.errors = 0
+        self.searched = 0
+        self.deduplicated = 0
+
+    def load(self):
+        """
+        Returns:
+            bool: True se havia um checkpoint desta mesma execução
+
+        Raises:
+            CheckpointMismatch: se o checkpoint é de outra execução (outro PGN, shard,
+                                profundidade...) ou a saída não tem o que ele registra
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("params") != self.params:
+            raise CheckpointMismatch(f"O checkpoint {self.path} é de outra execução: {state.get('params')}")
+        for key in ("next_game", "output_bytes", "games", "errors", "searched", "deduplicated"):
+            setattr(self, key, state[key])
+        return True
+
+    def save(self):
+        state = {"params": self.params, "next_game": self.next_game, "output_bytes": self.output_bytes, "games": self.games,
+                 "errors": self.errors, "searched": self.searched, "deduplicated": self.deduplicated}
+        _write_atomic(self.path, json.dumps(state, indent=2).encode())
+
+
+def _prepare(archive, index, multipv):
+    """
+    Lê e planeja uma partida.
+
+    Returns:
+        dict: dados da partida para a busca e a classificação, ou {"error": ...}
+    """
+    try:
+        game = archive.read_game(index)
+        if game is None:
+            return {"index": index, "error": "partida vazia"}
+        start_fen, states = game_states(game)
+    except ValueError as e:
+        return {"index": index, "error": str(e)}
+    walker = OpeningWalker(start_fen)
+    plan, in_book = plan_game(start_fen, states, multipv, walker)
+    headers = {tag: game.headers[tag] for tag in HEADERS if tag in game.headers}
+    return {"index": index, "headers": headers, "start_fen": start_fen, "states": states,
+            "walker": walker, "plan": plan, "in_book": in_book}
+
+
+async def _search_unique(games, pool, cache, depth, multipv):
+    """
+    Busca, uma única vez, as posições do bloco que ainda não estão no cache.
+
+    O cache de avaliações só serve de leitura prévia e é alimentado pela busca: as
+    linhas do bloco ficam num dict próprio, então uma posição despejada do LRU antes
+    da classificação (bloco com mais posições que EVAL_CACHE_SIZE) não se perde.
+
+    Returns:
+        tuple: (linhas por hash Zobrist, posições buscadas, posições repetidas no bloco ou já no cache)
+    """
+    unique = {}
+    needed = 0
+    for game in games:
+        plan = game.get("plan")
+        if plan is None:
+            continue
+        for index in plan.searched_indices():
+            needed += 1
+            unique.setdefault(plan.keys[index], plan.fens[index])
+    lines_by_key = {}
+    pending = []
+    for key, fen in unique.items():
+        lines = cache.get(key, depth, multipv)
+        if lines is None:
+            pending.append((key, fen))
+        else:
+            lines_by_key[key] = lines
+    if pending:
+        keys = [key for key, _ in pending]
+        results = await search_positions_parallel([fen for _, fen in pending], pool, pool.size, depth=depth,
+                                                  multipv=multipv, cache=cache, keys=keys)
+        lines_by_key.update(zip(keys, results))
+    return lines_by_key, len(pending), needed - len(pending)
+
+
+async def _game_line(game, lines_by_key, depth, multipv):
+    if "error" in game:
+        return {"index": game["index"], "status": "error", "detail": game["error"]}, True
+    plan = game["plan"]
+    results = [None] * len(plan.fens)
+    for index in plan.searched_indices():
+        results[index] = lines_by_key[plan.keys[index]]
+    searches = plan.resolve(results)
+    response = await finish_game(game["states"], game["start_fen"], searches, game["walker"], plan, game["in_book"], depth, multipv)
+    return {"index": game["index"], "status": "ok", "headers": game["headers"],
+            "analysis": json.loads(response.model_dump_json(by_alias=True))}, False
+
+
+async def analyze_archive(archive, output_path, pool, cache, depth=DEFAULT_DEPTH, multipv=1, shard=(0, 1),
+                          chunk=256, limit=None, restart=False, progress=True):
+    """
+    Analisa as partidas do shard, em blocos, gravando a saída e o checkpoint a cada bloco.
+
+    Returns:
+        Checkpoint: progresso final
+    """
+    shard_index, shards = shard
+    params = {"pgn": os.path.abspath(archive.path), "pgn_bytes": archive.size, "games": len(archive),
+              "shard": shard_index, "shards": shards, "depth": depth, "multipv": multipv}
+    checkpoint = Checkpoint(output_path + ".ckpt", params)
+    if restart and os.path.exists(checkpoint.path):
+        os.remove(checkpoint.path)
+    resumed = checkpoint.load()
+    if resumed and (not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint.output_bytes):
+        raise CheckpointMismatch(f"A saída {output_path} não tem as partidas registradas no checkpoint (use --restart)")
+    mode = "r+b" if resumed else "wb"
+    started = time.perf_counter()
+    processed = 0
+    with open(output_path, mode) as out:
+        # Descarta o que foi gravado depois do último checkpoint (bloco interrompido)
+        out.truncate(checkpoint.output_bytes)
+        out.seek(checkpoint.output_bytes)
+        if resumed and progress:
+            print(f"Retomando da partida {checkpoint.next_game} ({checkpoint.games} já analisadas)", file=sys.stderr)
+        while checkpoint.next_game < len(archive) and (limit is None or processed < limit):
+            indices = range(checkpoint.next_game, len(archive), shards)[:chunk]
+            if limit is not None:
+                indices = indices[:limit - processed]
+            games = [_prepare(archive, index, multipv) for index in indices]
+            lines_by_key, searched, deduplicated = await _search_unique(games, pool, cache, depth, multipv)
+            lines = []
+            for game in games:
+                try:
+                    line, failed = await _game_line(game, lines_by_key, depth, multipv)
+                except Exception as e:
+                    line, failed = {"index": game["index"], "status": "error", "detail": f"Erro interno: {e}"}, True
+                lines.append(json.dumps(line, ensure_ascii=False))
+                checkpoint.errors += failed
+            out.write(("\n".join(lines) + "\n").encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            # Avaliações do bloco no disco antes do checkpoint: uma retomada não as busca de novo
+            cache.flush()
+            checkpoint.output_bytes = out.tell()
+            checkpoint.next_game = indices[-1] + shards
+            checkpoint.games += len(games)
+            checkpoint.searched += searched
+            checkpoint.deduplicated += deduplicated
+            checkpoint.save()
+            processed += len(games)
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"{checkpoint.games} partidas ({processed / elapsed:.1f}/s), {checkpoint.searched} posições buscadas, "
+                      f"{checkpoint.deduplicated} reaproveitadas, {checkpoint.errors} erros", file=sys.stderr)
+    return checkpoint
+
+
+async def _run(args):
+    archive = PgnArchive(args.pgn)
+    eval_db = None if args.eval_db == "none" else (args.eval_db or args.output + ".evals.sqlite")
+    cache = EvalCache(max_size=EVAL_CACHE_SIZE, db_path=eval_db)
+    pool = EnginePool(size=args.engines or ENGINE_POOL_SIZE, path=args.engine or STOCKFISH_PATH)
+    await pool.start()
+    try:
+        checkpoint = await analyze_archive(archive, args.output, pool, cache, depth=args.depth, multipv=args.multipv,
+                                           shard=args.shard, chunk=args.chunk, limit=args.limit, restart=args.restart)
+    finally:
+        await pool.close()
+        archive.close()
+        cache.flush()
+    done = checkpoint.next_game >= len(archive)
+    print(f"{'Concluído' if done else 'Interrompido'}: {checkpoint.games} partidas em {args.output}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    index = commands.add_parser("index", help="(Re)constrói o índice de offsets do PGN")
+    index.add_argument("pgn")
+    analyze = commands.add_parser("analyze", help="Analisa as partidas do PGN")
+    analyze.add_argument("pgn")
+    analyze.add_argument("--output", required=True, help="Arquivo JSONL de saída (uma linha por partida)")
+    analyze.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    analyze.add_argument("--multipv", type=int, default=1)
+    analyze.add_argument("--shard", type=parse_shard, default=(0, 1), help="Parte K de N (partidas K, K+N, K+2N...)")
+    analyze.add_argument("--chunk", type=int, default=256, help="Partidas por bloco (posições únicas e checkpoint)")
+    analyze.add_argument("--limit", type=int, default=None, help="Analisa no máximo N partidas nesta execução")
+    analyze.add_argument("--engines", type=int, default=None, help="Motores no pool (padrão: ENGINE_POOL_SIZE)")
+    analyze.add_argument("--engine", default=None, help="Executável UCI (padrão: STOCKFISH_PATH)")
+    analyze.add_argument("--eval-db", default=None, help="SQLite do cache de avaliações (padrão: <saída>.evals.sqlite; 'none' desativa)")
+    analyze.add_argument("--restart", action="store_true", help="Ignora o checkpoint e recomeça do início")
+    args = parser.parse_args(argv)
+
+    if args.command == "index":
+        started = time.perf_counter()
+        offsets = load_index(args.pgn, rebuild=True)
+        print(f"{len(offsets)} partidas indexadas em {time.perf_counter() - started:.1f}s ({args.pgn}.idx)")
+        return 0
+    try:
+        asyncio.run(_run(args))
+    except CheckpointMismatch as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Análise com orçamento de tempo ou de nós por partida.
+
+Em vez de buscar todos os lances na mesma profundidade, faz primeiro uma passada
+rasa em todas as posições e gasta o que sobra do orçamento aprofundando só os
+lances cuja classificação está perto de um limite de classify_move (20/50/100/300 cp)
+ou cuja avaliação oscilou entre as últimas iterações da busca. Cada busca recebe
+`movetime`/`nodes` com o que resta do orçamento, então a partida não passa dele.
+"""
+import time
+
+from config import BUDGET_SHALLOW_DEPTH, BUDGET_THRESHOLD_MARGIN_CP, BUDGET_SWING_CP
+from services.evaluation import DELTA_THRESHOLDS_CP, score_after_move
+from utils.eval_cache import get_eval_cache
+
+
+class Budget:
+    def __init__(self, ms=None, nodes=None):
+        """
+        Args:
+            ms (int): Tempo total da partida em milissegundos (contado a partir daqui)
+            nodes (int): Total de nós da partida
+        """
+        self.ms = ms
+        self.nodes = nodes
+        self.started = time.perf_counter()
+        self.nodes_spent = 0
+        self.deepened = 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def exhausted(self):
+        if self.ms is not None and self.elapsed_ms() >= self.ms:
+            return True
+        return self.nodes is not None and self.nodes_spent >= self.nodes
+
+    def limits(self, share=1):
+        """
+        Limites da próxima busca: o que resta do orçamento dividido por `share` buscas.
+
+        Returns:
+            dict: {'movetime': ms ou None, 'nodes': nós ou None}
+        """
+        share = max(share, 1)
+        movetime = nodes = None
+        if self.ms is not None:
+            movetime = max(int((self.ms - self.elapsed_ms()) / share), 1)
+        if self.nodes is not None:
+            nodes = max((self.nodes - self.nodes_spent) // share, 1)
+        return {"movetime": movetime, "nodes": nodes}
+
+    def charge(self, lines):
+        if lines:
+            self.nodes_spent += lines[0].get("nodes") or 0
+
+    def stats(self):
+        return {
+            "budget_ms": self.ms,
+            "budget_nodes": self.nodes,
+            "spent_ms": int(self.elapsed_ms()),
+            "spent_nodes": self.nodes_spent,
+            "deepened": self.deepened,
+        }
+
+
+def ply_uncertainty(prev_lines, lines):
+    """
+    Quão perto a classificação de um lance está de mudar.
+
+    Args:
+        prev_lines (list): Linhas da posição antes do lance (melhor lance)
+        lines (list): Linhas da posição depois do lance (lance jogado)
+
+    Returns:
+        int: Prioridade (menor = mais incerto) ou None se o lance não precisa ser aprofundado
+    """
+    if not prev_lines or not lines or not prev_lines[0]["move"]:
+        return None
+    best_cp, best_mate = score_after_move(prev_lines[0]["eval_cp"], prev_lines[0]["eval_mate"])
+    played_cp, played_mate = lines[0]["eval_cp"], lines[0]["eval_mate"]
+    swing = max(prev_lines[0].get("swing") or 0, lines[0].get("swing") or 0)
+    distance = None
+    if best_mate is None and played_mate is None and best_cp is not None and played_cp is not None:
+        delta = abs(best_cp - played_cp)
+        distance = min(abs(delta - threshold) for threshold in DELTA_THRESHOLDS_CP)
+    near = distance is not None and distance <= BUDGET_THRESHOLD_MARGIN_CP
+    if not near and swing < BUDGET_SWING_CP:
+        return None
+    return (distance if near else BUDGET_THRESHOLD_MARGIN_CP) - swing
+
+
+async def _limited_search(engine, plan, index, depth, multipv, cache, budget, share=1):
+    fens, moves = plan.fens, plan.moves
+    key = plan.keys[index]
+    lines = cache.get(key, depth, multipv)
+    if lines is not None:
+        return lines
+    limits = budget.limits(share)
+    if moves is not None:
+        lines = await engine.analyse(fens[0], depth=depth, multipv=multipv, moves=moves[:index], **limits)
+    else:
+        lines = await engine.analyse(fens[index], depth=depth, multipv=multipv, **limits)
+    budget.charge(lines)
+    # Uma busca interrompida pelo orçamento vale só a profundidade que alcançou
+    reached = lines[0].get("depth") if lines else None
+    if reached:
+        cache.put(key, min(reached, depth), multipv, lines)
+    return lines
+
+
+async def search_budgeted(plan, engine, depth, multipv, in_book, budget, cache=None):
+    """
+    Busca as posições da partida dentro do orçamento.
+
+    Args:
+        plan (SearchPlan): Posições a buscar (as demais são resolvidas pelo plano)
+        engine (UciEngine): Motor da sessão
+        depth (int): Profundidade máxima (a dos lances aprofundados)
+        in_book (list): Lances de livro (não são aprofundados)
+        budget (Budget): Orçamento da partida
+
+    Returns:
+        list: Linhas de todas as posições
+    """
+    cache = cache if cache is not None else get_eval_cache()
+    fens = plan.fens
+    indices = plan.searched_indices()
+    shallow = min(BUDGET_SHALLOW_DEPTH, depth)
+    results = [None] * len(fens)
+
+    # 1) Passada rasa: cada posição recebe no máximo uma parte igual do que resta
+    for done, index in enumerate(indices):
+        results[index] = await _limited_search(engine, plan, index, shallow, multipv, cache, budget, share=len(indices) - done)
+
+    # 2) Lances incertos, do mais incerto para o menos
+    provisional = plan.resolve(list(results))
+    candidates = []
+    for ply in range(1, len(fens)):
+        if in_book and in_book[ply - 1]:
+            continue
+        priority = ply_uncertainty(provisional[ply - 1], provisional[ply])
+        if priority is not None:
+            candidates.append((priority, ply))
+
+    # 3) Aprofunda as duas posições de cada lance incerto enquanto houver orçamento
+    for _, ply in sorted(candidates):
+        for index in (ply - 1, ply):
+            if budget.exhausted():
+                return plan.resolve(results)
+            current = results[index]
+            if index in plan.skip or not current or (current[0].get("depth") or 0) >= depth:
+                continue
+            lines = await _limited_search(engine, plan, index, depth, multipv, cache, budget)
+            if lines and (lines[0].get("depth") or 0) > (current[0].get("depth") or 0):
+                results[index] = lines
+                budget.deepened += 1
+    return plan.resolve(results)
@@ -0,0 +1,203 @@
+"""
+Etapa anterior à busca: decide, só com o python-chess, quais posições da partida
+não precisam do motor.
+
+- Posições terminais (mate, afogamento, material insuficiente) têm avaliação conhecida.
+- Uma posição com um único lance legal tem a avaliação da posição seguinte
+  (com o sinal invertido) e esse lance como melhor lance.
+- Posições cercadas por lances de livro só alimentariam lances que já serão
+  classificados como "Livro".
+- Opcionalmente, quando o lance jogado é o primeiro lance da PV anterior, o
+  restante dessa PV responde pela posição seguinte sem nova busca.
+"""
+import chess
+import chess.polyglot
+
+from config import ELIDE_BOOK_SEARCH, ELIDE_REUSE_PV
+from services.evaluation import score_after_move
+from services.plies import CHECKMATE, position_flags
+
+TERMINAL = "terminal"
+FORCED = "forced"
+BOOK = "book"
+REUSED = "reused"
+
+
+def _line(eval_cp, eval_mate, pv, depth):
+    return {"depth": depth, "seldepth": depth, "multipv": 1, "eval_cp": eval_cp, "eval_mate": eval_mate,
+            "bound": None, "pv": pv, "move": pv[0] if pv else None}
+
+
+def terminal_lines(terminal):
+    """
+    Linhas equivalentes às do motor numa posição terminal (`info depth 0 score ...`).
+    """
+    if terminal == CHECKMATE:
+        return [_line(None, 0, [], 0)]
+    return [_line(0, None, [], 0)]
+
+
+def score_before_move(eval_cp, eval_mate):
+    """
+    Inverso de score_after_move: avaliação de quem joga ANTES do lance, a partir da
+    avaliação de quem joga depois dele.
+    """
+    if eval_mate is not None:
+        return None, (-eval_mate + 1 if eval_mate <= 0 else -eval_mate)
+    if eval_cp is not None:
+        return -eval_cp, None
+    return None, None
+
+
+def forced_lines(move, next_lines):
+    """
+    Linhas de uma posição com um único lance legal, derivadas da busca da posição seguinte.
+    """
+    if not next_lines:
+        return []
+    top = next_lines[0]
+    eval_cp, eval_mate = score_before_move(top["eval_cp"], top["eval_mate"])
+    return [_line(eval_cp, eval_mate, [move] + top["pv"], top.get("depth"))]
+
+
+class SearchPlan:
+    def __init__(self, start_fen, plies, in_book=None, multipv=1, elide_book=ELIDE_BOOK_SEARCH, reuse_pv=ELIDE_REUSE_PV, reused=0):
+        """
+        Args:
+            start_fen (str): Posição antes do primeiro lance
+            plies (list): PlyContext de cada lance (FEN, hash e atributos já calculados)
+            in_book (list): Para cada lance, se está na teoria (OpeningWalker.push)
+            multipv (int): Linhas pedidas ao motor (a reutilização da PV só vale com 1)
+            elide_book (bool): Não busca posições cercadas por lances de livro (só numa
+                               partida com lances, e nunca a posição final)
+            reuse_pv (bool): Reutiliza a PV anterior quando o lance jogado é o melhor lance
+            reused (int): Lances iniciais já classificados (prefixo em cache); as posições
+                          antes deles não são buscadas, exceto a inicial
+        """
+        start = chess.Board(start_fen)
+        moves = [ply.uci for ply in plies]
+        self.fens = [start_fen] + [ply.fen for ply in plies]
+        self.keys = [chess.polyglot.zobrist_hash(start)] + [ply.key for ply in plies]
+        # Sem os lances (FEN avulsa), as posições não são ligadas entre si
+        self.moves = moves if all(moves) else None
+        self.in_book = in_book or []
+        self.reuse_pv = reuse_pv and multipv == 1 and self.moves is not None
+        self.skip = {}  # índice da posição -> motivo
+        self.terminal = {}  # índice da posição -> tipo de posição terminal
+        self.pv_reused = 0
+        flags = [position_flags(start)] + [(ply.terminal, ply.forced) for ply in plies]
+        last = len(self.fens) - 1
+        for index, (terminal, forced) in enumerate(flags):
+            if 0 < index < reused:
+                # A posição inicial é sempre buscada: as estatísticas da partida partem dela
+                self.skip[index] = REUSED
+            elif terminal:
+                self.skip[index] = TERMINAL
+                self.terminal[index] = terminal
+            elif elide_book and self.moves is not None and index < last and self._book_position(index):
+                # A posição final sempre é buscada: é a avaliação que a análise devolve por último
+                self.skip[index] = BOOK
+            elif self.moves is not None and index < last and forced:
+                self.skip[index] = FORCED
+
+    def _book_position(self, index):
+        # A posição i fornece a avaliação do lance i e o melhor lance para o lance i+1
+        states = len(self.in_book)
+        if states == 0:
+            return False
+        played_in_book = index == 0 or self.in_book[index - 1]
+        next_in_book = index == states or self.in_book[index]
+        return played_in_book and next_in_book
+
+    def searched_indices(self):
+        """
+        Posições que precisam do motor (ou do cache de avaliações), em ordem.
+        """
+        return [index for index in range(len(self.fens)) if index not in self.skip]
+
+    def _settle(self, index, results):
+        reason = self.skip[index]
+        if reason == TERMINAL:
+            return terminal_lines(self.terminal[index])
+        if reason in (BOOK, REUSED):
+            return []
+        return forced_lines(self.moves[index], results[index + 1])
+
+    def resolve(self, results):
+        """
+        Completa as posições dispensadas a partir das buscadas.
+
+        Args:
+            results (list): Linhas de cada posição buscada (None nas demais)
+
+        Returns:
+            list: Linhas de todas as posições, na ordem da partida
+        """
+        # De trás para frente: um lance forçado depende da posição seguinte
+        for index in range(len(self.fens) - 1, -1, -1):
+            if index in self.skip:
+                results[index] = self._settle(index, results)
+        return results
+
+    def _reused(self, index, prev_lines):
+        if not self.reuse_pv or index == 0 or not prev_lines:
+            return None
+        top = prev_lines[0]
+        if len(top["pv"]) < 2 or top["pv"][0] != self.moves[index - 1] or top["bound"]:
+            return None
+        eval_cp, eval_mate = score_after_move(top["eval_cp"], top["eval_mate"])
+        depth = max((top.get("depth") or 1) - 1, 0)
+        return [_line(eval_cp, eval_mate, top["pv"][1:], depth)]
+
+    async def iter_resolved(self, search):
+        """
+        Percorre a partida em ordem, buscando só o necessário, e entrega as linhas de
+        cada posição assim que estão resolvidas (um lance forçado espera a posição seguinte).
+
+        Args:
+            search (callable): Corrotina search(índice) -> linhas do motor
+        """
+        results = [None] * len(self.fens)
+        waiting = []  # lances forçados à espera da posição seguinte
+        prev_lines = None
+        for index in range(len(self.fens)):
+            reason = self.skip.get(index)
+            if reason == FORCED:
+                waiting.append(index)
+                prev_lines = None
+                continue
+            searched = False
+            if reason is not None:
+                lines = self._settle(index, results)
+            else:
+                lines = self._reused(index, prev_lines)
+                if lines is not None:
+                    self.pv_reused += 1
+                else:
+                    lines = await search(index)
+                    searched = True
+            results[index] = lines
+            for forced in reversed(waiting):
+                results[forced] = self._settle(forced, results)
+            for forced in waiting:
+                yield results[forced]
+            waiting = []
+            yield lines
+            # Só uma PV vinda de busca é reutilizada (sem encadear perdas de profundidade)
+            prev_lines = lines if searched else None
+
+    def stats(self):
+        """
+        Returns:
+            dict: {'searched', 'skipped', 'terminal', 'forced', 'book', 'pv_reused', 'reused'}
+        """
+        reasons = list(self.skip.values())
+        return {
+            "searched": len(self.fens) - len(reasons) - self.pv_reused,
+            "skipped": len(reasons) + self.pv_reused,
+            "terminal": reasons.count(TERMINAL),
+            "forced": reasons.count(FORCED),
+            "book": reasons.count(BOOK),
+            "pv_reused": self.pv_reused,
+            "reused": reasons.count(REUSED),
+        }
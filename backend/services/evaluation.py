@@ -1,12 +1,21 @@
+import asyncio
+import logging
+
 import chess
+from config import GAME_SESSION_REVERSE
 from utils.openings import classify_opening
-from utils.fen_openings import classify_move_by_fen
+from utils.fen_openings import classify_move_by_fen, is_likely_opening_position
 from utils.stockfish import Engine
+from utils.eval_cache import get_eval_cache, position_hash
 from models.game import Move, Summary, AnalyzeResponse
 
+logger = logging.getLogger(__name__)
+
 WIN_CP = 300
 DRAWISH_CP = 50
 INF = 10000
+# Limites de delta_cp entre as classificações de classify_move
+DELTA_THRESHOLDS_CP = (20, 50, 100, 300)
 
 def mover_score_from_eval(eval_cp, eval_mate):
     if eval_mate is not None:
@@ -15,6 +24,18 @@ def mover_score_from_eval(eval_cp, eval_mate):
         return 0
     return -eval_cp
 
+def score_after_move(eval_cp, eval_mate):
+    """
+    Converte a avaliação de uma posição (ponto de vista de quem joga) para a
+    avaliação da posição após o lance principal, vista pelo adversário.
+    Ex.: "mate em 1" vira "mate 0" (adversário levou mate).
+    """
+    if eval_mate is not None:
+        return None, (-(eval_mate - 1) if eval_mate > 0 else -eval_mate)
+    if eval_cp is None:
+        return None, None
+    return -eval_cp, None
+
 def is_missed_win(best_cp, best_mate, played_cp, played_mate):
     best_score   = mover_score_from_eval(best_cp,   best_mate)
     played_score = mover_score_from_eval(played_cp, played_mate)
@@ -35,28 +56,40 @@ def is_sacrifice(board, move):
                 return True
     return False
 
-def classify_move(delta_cp, played_move, best_move, fen, eco_book=None, eval_best=None, eval_played=None, prev_fen=None, eval_mate=None, full_game_moves=None, move_number=None):
-    # Tenta classificar como abertura usando FEN (resolve transposições)
-    opening_label = classify_move_by_fen(fen, move_number)
-    print(f"DEBUG: classify_move_by_fen retornou: {opening_label} para FEN {fen[:20]}... (movimento {move_number})")
-    if opening_label:
-        return opening_label
-    # Classificação normal
+def classify_move(delta_cp, played_move, best_move, fen, eco_book=None, eval_best=None, eval_played=None, prev_fen=None, eval_mate=None, full_game_moves=None, move_number=None, in_book=None, sacrifice=None, piece_count=None):
+    # Mate dado, mate sofrido e erros graves valem mesmo dentro da teoria.
+    # `eval_mate` é da posição após o lance, vista pelo adversário (como em
+    # mover_score_from_eval): > 0 é o adversário dando mate em quem jogou
     if eval_mate is not None and eval_mate == 0:
         return "Melhor"
-    if eval_mate is not None and eval_mate < 0:
+    if eval_mate is not None and eval_mate > 0:
         return "Capivarada"
     delta_abs = abs(delta_cp)
     if delta_abs > 300:
         return "Capivarada"
-    board = chess.Board(prev_fen if prev_fen else chess.STARTING_FEN)
-    try:
-        move_obj = board.parse_san(played_move)
-    except Exception:
-        move_obj = None
+    # Tenta classificar como abertura usando FEN (resolve transposições).
+    # `in_book` já calculado pelo OpeningWalker dispensa a consulta por lance;
+    # `sacrifice`/`piece_count` do contexto do lance dispensam reconstruir o tabuleiro.
+    if in_book is None:
+        opening_label = classify_move_by_fen(fen, move_number)
+    elif in_book or (move_number and move_number <= 10 and is_likely_opening_position(fen, piece_count)):
+        opening_label = "Livro"
+    else:
+        opening_label = None
+    logger.debug("classify_move_by_fen retornou: %s para FEN %.20s... (movimento %s)", opening_label, fen, move_number)
+    if opening_label:
+        return opening_label
+    # Classificação normal
     # Chess.com-style Brilhante: sacrifício correto que mantém avaliação
     if played_move == best_move:
-        if move_obj and is_sacrifice(board, move_obj) and abs(eval_best - eval_played) < 50:
+        if sacrifice is None:
+            board = chess.Board(prev_fen if prev_fen else chess.STARTING_FEN)
+            try:
+                move_obj = board.parse_san(played_move)
+            except Exception:
+                move_obj = None
+            sacrifice = bool(move_obj and is_sacrifice(board, move_obj))
+        if sacrifice and abs(eval_best - eval_played) < 50:
             return "Brilhante"
         return "Melhor"
     if delta_abs == 0 and played_move != best_move and eval_best is not None and abs(eval_best) > 300:
@@ -71,13 +104,167 @@ def classify_move(delta_cp, played_move, best_move, fen, eco_book=None, eval_bes
         return "Erro"
     return "Outro"
 
-def evaluate_positions(fens, depth=15, stockfish_path=None):
-    engine = Engine(stockfish_path) if stockfish_path else Engine()
-    engine.set_depth(depth)
+def evaluate_positions(fens, depth=15, stockfish_path=None, engine=None):
+    # Reutiliza o motor recebido (ex.: emprestado do pool); só cria um processo novo se não houver
     results = []
+    for lines in search_positions(fens, depth=depth, engine=engine, stockfish_path=stockfish_path):
+        top = lines[0] if lines else {"eval_cp": None, "eval_mate": None}
+        results.append({"eval_cp": top["eval_cp"], "eval_mate": top["eval_mate"]})
+    return results
+
+def search_positions(fens, depth=15, multipv=1, engine=None, stockfish_path=None, cache=None, reset_between=False):
+    """
+    Busca cada posição UMA única vez, guardando as linhas principais completas.
+    Posições já avaliadas com profundidade suficiente vêm do cache de avaliações.
+
+    Args:
+        fens (list): Posições na ordem da partida
+        depth (int): Profundidade da busca
+        multipv (int): Número de linhas principais por posição
+        engine (Engine): Motor a reutilizar (ex.: emprestado do pool)
+        cache (EvalCache): Cache a usar (padrão: cache global)
+        reset_between (bool): Limpa o hash antes de cada posição, tornando cada
+                              resultado independente das buscas anteriores
+
+    Returns:
+        list: Para cada FEN, a lista de linhas de Engine.analyse
+    """
+    return list(iter_search_positions(fens, depth, multipv, engine, stockfish_path, cache, reset_between))
+
+def iter_search_positions(fens, depth=15, multipv=1, engine=None, stockfish_path=None, cache=None, reset_between=False):
+    """
+    Versão incremental de search_positions: entrega cada posição assim que é buscada.
+    """
+    cache = cache if cache is not None else get_eval_cache()
     for fen in fens:
-        info = engine.eval_fen(fen)
-        eval_cp = info.get("value") if info["type"] == "cp" else None
-        eval_mate = info.get("value") if info["type"] == "mate" else None
-        results.append({"eval_cp": eval_cp, "eval_mate": eval_mate})
+        key = position_hash(fen)
+        lines = cache.get(key, depth, multipv)
+        if lines is None:
+            if engine is None:
+                engine = Engine(stockfish_path) if stockfish_path else Engine()
+            lines = _search_and_store(engine, fen, key, depth, multipv, cache, reset_between)
+        yield lines
+
+def _search_and_store(engine, fen, key, depth, multipv, cache, reset_between):
+    if reset_between:
+        engine.reset()
+    lines = engine.analyse(fen, depth=depth, multipv=multipv)
+    cache.put(key, depth, multipv, lines)
+    return lines
+
+async def iter_search_positions_async(fens, engine, depth=15, multipv=1, cache=None, reset_between=False, keys=None):
+    """
+    Versão assíncrona de iter_search_positions, para um UciEngine (ex.: emprestado do pool).
+    `keys` (hash Zobrist de cada FEN, se já calculado) evita reconstruir o tabuleiro.
+    """
+    cache = cache if cache is not None else get_eval_cache()
+    for index, fen in enumerate(fens):
+        key = keys[index] if keys is not None else position_hash(fen)
+        lines = cache.get(key, depth, multipv)
+        if lines is None:
+            lines = await _search_and_store_async(engine, fen, key, depth, multipv, cache, reset_between)
+        yield lines
+
+async def search_positions_async(fens, engine, depth=15, multipv=1, cache=None, reset_between=False, keys=None):
+    return [lines async for lines in iter_search_positions_async(fens, engine, depth, multipv, cache, reset_between, keys)]
+
+async def _search_and_store_async(engine, fen, key, depth, multipv, cache, reset_between):
+    if reset_between:
+        await engine.reset()
+    lines = await engine.analyse(fen, depth=depth, multipv=multipv)
+    cache.put(key, depth, multipv, lines)
+    return lines
+
+async def search_position(engine, fens, index, depth=15, multipv=1, cache=None, moves=None, keys=None):
+    """
+    Busca a posição `index` da partida (via cache). Com os lances da partida, envia
+    a posição como parte da sessão (`position <início> moves ...`).
+    """
+    cache = cache if cache is not None else get_eval_cache()
+    key = keys[index] if keys is not None else position_hash(fens[index])
+    lines = cache.get(key, depth, multipv)
+    if lines is None:
+        if moves is not None:
+            lines = await engine.analyse(fens[0], depth=depth, multipv=multipv, moves=moves[:index])
+        else:
+            lines = await engine.analyse(fens[index], depth=depth, multipv=multipv)
+        cache.put(key, depth, multipv, lines)
+    return lines
+
+async def _iter_session(fens, moves, engine, depth, multipv, cache, order, keys):
+    for index in order:
+        yield index, await search_position(engine, fens, index, depth, multipv, cache, moves, keys)
+
+async def search_game_session(fens, moves, engine, depth=15, multipv=1, cache=None, reverse=GAME_SESSION_REVERSE, indices=None, keys=None):
+    """
+    Busca todas as posições de UMA partida no mesmo motor, sem `ucinewgame` entre os
+    lances: cada posição é enviada como `position <início> moves ...`, e o hash da
+    busca anterior (que compartilha quase toda a árvore) continua valendo.
+
+    Args:
+        fens (list): Posição inicial seguida da posição após cada lance
+        moves (list): Lances UCI da partida (len(fens) - 1)
+        engine (UciEngine): Motor da sessão (o pool limpa o hash ao devolvê-lo)
+        reverse (bool): Busca do último lance para o primeiro; as posições finais,
+                        mais simples, deixam no hash resultados que antecipam as anteriores
+        indices (list): Só estas posições (padrão: todas); as demais ficam None
+        keys (list): Hash Zobrist de cada posição, se já calculado
+
+    Returns:
+        list: Para cada FEN, a lista de linhas de UciEngine.analyse (na ordem da partida)
+    """
+    cache = cache if cache is not None else get_eval_cache()
+    order = sorted(range(len(fens)) if indices is None else indices, reverse=reverse)
+    results = [None] * len(fens)
+    async for index, lines in _iter_session(fens, moves, engine, depth, multipv, cache, order, keys):
+        results[index] = lines
+    return results
+
+async def search_positions_parallel(fens, pool, workers, depth=15, multipv=1, cache=None, keys=None):
+    """
+    Divide as posições de UMA partida entre vários motores do pool (work stealing:
+    cada motor pega a próxima posição livre) e devolve os resultados na ordem dos lances.
+
+    O resultado é determinístico: cada posição é buscada com o hash limpo, e os
+    motores usam Threads/Hash fixos, então não importa qual motor buscou qual posição.
+
+    Args:
+        fens (list): Posições na ordem da partida
+        pool (EnginePool): Pool de onde os motores são emprestados
+        workers (int): Máximo de motores a usar; usa menos se o pool estiver ocupado
+        keys (list): Hash Zobrist de cada FEN, se já calculado
+
+    Returns:
+        list: Para cada FEN, a lista de linhas de UciEngine.analyse
+    """
+    cache = cache if cache is not None else get_eval_cache()
+    # O primeiro motor espera na fila normal; os demais só se estiverem livres agora
+    engines = [await pool.checkout()]
+    while len(engines) < min(workers, len(fens)):
+        engine = await pool.try_checkout()
+        if engine is None:
+            break
+        engines.append(engine)
+
+    pending = iter(range(len(fens)))
+    results = [None] * len(fens)
+
+    async def run(engine):
+        # Sem await entre pegar o índice e reservá-lo: o iterador é compartilhado com segurança
+        for index in pending:
+            fen = fens[index]
+            key = keys[index] if keys is not None else position_hash(fen)
+            lines = cache.get(key, depth, multipv)
+            if lines is None:
+                lines = await _search_and_store_async(engine, fen, key, depth, multipv, cache, reset_between=True)
+            results[index] = lines
+
+    try:
+        outcomes = await asyncio.gather(*(run(engine) for engine in engines), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+    finally:
+        # Devolve todos os motores mesmo se a tarefa for cancelada
+        await asyncio.shield(asyncio.gather(*(pool.checkin(engine) for engine in engines)))
     return results
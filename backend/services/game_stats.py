@@ -0,0 +1,214 @@
+"""
+Estatísticas da partida, calculadas de uma vez sobre as avaliações de todos os lances.
+
+As avaliações viram arrays (uma entrada por posição) e tudo sai de operações em
+lote do NumPy: curva de probabilidade de vitória, perda média de centipawns (ACPL)
+e precisão de cada lado, histograma das classificações e momentos críticos.
+compute_stats recebe várias partidas juntas (concatenadas, com o índice da partida
+de cada lance), então um lote de milhares de partidas custa um punhado de operações
+vetorizadas em vez de um laço por lance.
+
+Fórmulas de probabilidade de vitória e precisão: as do Lichess.
+Sem NumPy instalado, game_stats devolve None e o resumo sai sem estatísticas.
+O NumPy só é importado no primeiro uso (ou no aquecimento da aplicação).
+"""
+import math
+
+np = None
+_numpy_missing = False
+
+# Avaliações são limitadas a ±1000 cp (mate conta como o limite)
+EVAL_CLIP_CP = 1000
+# Variação mínima da probabilidade de vitória (pontos percentuais) num momento crítico
+CRITICAL_SWING = 20.0
+# Momentos críticos listados por partida
+CRITICAL_MAX = 5
+
+_WIN_K = 0.00368208
+_ACC_A, _ACC_B, _ACC_C = 103.1668, 0.04354, 3.1669
+
+
+def load_numpy():
+    """
+    Importa o NumPy (dependência opcional) na primeira chamada.
+
+    Returns:
+        module: numpy, ou None se não estiver instalado
+    """
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            _numpy_missing = True
+    return np
+
+
+def available():
+    return load_numpy() is not None
+
+
+def win_percent(cp):
+    """
+    Probabilidade de vitória (0-100) das brancas para avaliações em cp (array).
+    """
+    return 50 + 50 * (2 / (1 + np.exp(-_WIN_K * cp)) - 1)
+
+
+def game_series(start_fen, moves, start_lines=None):
+    """
+    Dados de uma partida no formato de compute_stats.
+
+    Args:
+        start_fen (str): Posição antes do primeiro lance
+        moves (list): Move já classificados
+        start_lines (list): Linhas do motor para start_fen (sem elas, o primeiro lance fica sem avaliação prévia)
+
+    Returns:
+        dict: {'white_first', 'cp', 'mate', 'san', 'classification'}
+    """
+    top = start_lines[0] if start_lines else {}
+    return {
+        "white_first": start_fen.split()[1] == "w",
+        "cp": [top.get("eval_cp")] + [m.eval_cp for m in moves],
+        "mate": [top.get("eval_mate")] + [m.eval_mate for m in moves],
+        "san": [m.san for m in moves],
+        "classification": [m.classification for m in moves],
+    }
+
+
+def _white_cp(series):
+    """
+    Avaliações de todas as posições das partidas, do ponto de vista das brancas (NaN sem avaliação).
+    """
+    cp = np.array([math.nan if v is None else v for s in series for v in s["cp"]], dtype=float)
+    mate = np.array([math.nan if v is None else v for s in series for v in s["mate"]], dtype=float)
+    # Mate > 0: quem joga dá mate; mate <= 0: quem joga leva mate
+    cp = np.where(np.isnan(mate), cp, np.where(mate > 0, EVAL_CLIP_CP, -EVAL_CLIP_CP))
+    cp = np.clip(cp, -EVAL_CLIP_CP, EVAL_CLIP_CP)
+    # Lado a jogar em cada posição: alterna a partir do lado da posição inicial
+    white_to_move = np.concatenate([
+        (np.arange(len(s["cp"])) % 2 == 0) == s["white_first"] for s in series
+    ])
+    return np.where(white_to_move, cp, -cp), white_to_move
+
+
+def compute_stats(series):
+    """
+    Estatísticas de várias partidas de uma vez.
+
+    Args:
+        series (list): Um dict de game_series por partida
+
+    Returns:
+        list: Para cada partida, dict no formato do modelo GameStats
+    """
+    if not series:
+        return []
+    load_numpy()
+    counts = np.array([len(s["san"]) for s in series])
+    games = len(series)
+    cp, white_to_move = _white_cp(series)
+    win = win_percent(cp)
+
+    # Lance j (global) vai da posição before[j] para before[j] + 1
+    pos_offsets = np.concatenate([[0], np.cumsum(counts + 1)[:-1]])
+    game = np.repeat(np.arange(games), counts)
+    ply_offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    ply = np.arange(counts.sum()) - ply_offsets[game]
+    before = pos_offsets[game] + ply
+    after = before + 1
+    white = white_to_move[before]
+    sign = np.where(white, 1.0, -1.0)
+
+    # Probabilidade de vitória de quem jogou, antes e depois do lance
+    win_before = np.where(white, win[before], 100 - win[before])
+    win_after = np.where(white, win[after], 100 - win[after])
+    valid = ~(np.isnan(win_before) | np.isnan(win_after))
+    drop = np.clip(np.nan_to_num(win_before - win_after), 0, None)
+    accuracy = np.clip(_ACC_A * np.exp(-_ACC_B * drop) - _ACC_C, 0, 100)
+    cp_loss = np.clip(np.nan_to_num((cp[before] - cp[after]) * sign), 0, None)
+
+    # Peso de cada lance: volatilidade (desvio padrão) da curva numa janela que termina
+    # no lance, via somas acumuladas; a janela não atravessa o início da partida
+    window = np.clip(counts // 10, 2, 8)[game]
+    filled = np.nan_to_num(win, nan=50.0)
+    sum1 = np.concatenate([[0.0], np.cumsum(filled)])
+    sum2 = np.concatenate([[0.0], np.cumsum(filled * filled)])
+    start = np.maximum(pos_offsets[game], after - window + 1)
+    size = after - start + 1
+    mean = (sum1[after + 1] - sum1[start]) / size
+    variance = (sum2[after + 1] - sum2[start]) / size - mean * mean
+    weight = np.clip(np.sqrt(np.clip(variance, 0, None)), 0.5, 12)
+
+    # Agregação por (partida, lado): segmento 2 * partida + (0 brancas, 1 pretas)
+    segment = 2 * game + np.where(white, 0, 1)
+    size_seg = 2 * games
+    used = valid.astype(float)
+
+    def per_segment(values):
+        return np.bincount(segment, weights=values, minlength=size_seg)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n_valid = per_segment(used)
+        acpl = per_segment(cp_loss * used) / n_valid
+        weighted = per_segment(accuracy * weight * used) / per_segment(weight * used)
+        harmonic = n_valid / per_segment(used / np.maximum(accuracy, 1))
+        side_accuracy = (weighted + harmonic) / 2
+    n_moves = np.bincount(segment, minlength=size_seg)
+
+    # Histograma: códigos das classificações contados por segmento
+    labels, codes = np.unique(np.array([c for s in series for c in s["classification"]], dtype=object).astype(str), return_inverse=True)
+    n_labels = max(len(labels), 1)
+    histogram = np.bincount(segment * n_labels + codes, minlength=size_seg * n_labels).reshape(size_seg, n_labels)
+
+    # Momentos críticos: maiores variações da curva, por partida
+    swing = np.abs(np.nan_to_num(win[after] - win[before]))
+    critical = np.flatnonzero(valid & (swing >= CRITICAL_SWING))
+    critical = critical[np.lexsort((-swing[critical], game[critical]))]
+    critical_bounds = np.searchsorted(game[critical], np.arange(games + 1))
+
+    curve = np.round(win, 1)
+    curve_values = np.where(np.isnan(curve), None, curve).tolist()
+    sans = [san for s in series for san in s["san"]]
+    results = []
+    for g in range(games):
+        sides = {}
+        for side, seg in (("white", 2 * g), ("black", 2 * g + 1)):
+            ok = n_valid[seg] > 0
+            sides[side] = {
+                "moves": int(n_moves[seg]),
+                "acpl": round(float(acpl[seg]), 1) if ok else None,
+                "accuracy": round(float(side_accuracy[seg]), 1) if ok else None,
+                "classifications": {str(labels[k]): int(histogram[seg, k]) for k in np.flatnonzero(histogram[seg])},
+            }
+        moments = [
+            {
+                "ply": int(ply[j]) + 1,
+                "san": sans[j],
+                "win_before": round(float(win[before[j]]), 1),
+                "win_after": round(float(win[after[j]]), 1),
+            }
+            for j in critical[critical_bounds[g]:critical_bounds[g + 1]][:CRITICAL_MAX]
+        ]
+        first = pos_offsets[g]
+        results.append({
+            "white": sides["white"],
+            "black": sides["black"],
+            "win_probability": curve_values[first:first + counts[g] + 1],
+            "critical_moments": moments,
+        })
+    return results
+
+
+def game_stats(start_fen, moves, start_lines=None):
+    """
+    Estatísticas de uma partida.
+
+    Returns:
+        dict: Formato do modelo GameStats, ou None sem NumPy ou sem lances
+    """
+    if not moves or not available():
+        return None
+    return compute_stats([game_series(start_fen, moves, start_lines)])[0]
@@ -0,0 +1,100 @@
+"""
+Contexto de cada lance, calculado uma única vez.
+
+Um único chess.Board é empurrado pela partida; para cada lance ficam guardados
+o lance (objeto e UCI), o SAN, a FEN e o hash Zobrist da posição resultante e os
+atributos derivados usados pelas etapas seguintes (captura, sacrifício, número de
+peças, posição terminal, lance único). Plano de buscas, cache de avaliações,
+classificação e aberturas leem daqui em vez de reconstruir o tabuleiro a partir da FEN.
+"""
+import chess
+import chess.polyglot
+
+from services.evaluation import is_sacrifice
+
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+INSUFFICIENT = "insufficient"
+
+
+def position_flags(board):
+    """
+    Returns:
+        tuple: (motivo terminal ou None, True se só há um lance legal)
+    """
+    legal = 0
+    for _ in board.generate_legal_moves():
+        legal += 1
+        if legal > 1:
+            break
+    if legal == 0:
+        return (CHECKMATE if board.is_check() else STALEMATE), False
+    if board.is_insufficient_material():
+        return INSUFFICIENT, False
+    return None, legal == 1
+
+
+class PlyContext:
+    __slots__ = ("ply", "san", "uci", "move", "from_", "to", "fen", "key",
+                 "is_capture", "is_sacrifice", "piece_count", "terminal", "forced")
+
+    def __init__(self, ply, board, move=None, san="", is_capture=False, sacrifice=False):
+        """
+        Args:
+            ply (int): Número do lance (1 = primeiro lance das brancas)
+            board (chess.Board): Tabuleiro JÁ com o lance empurrado
+            move (chess.Move): Lance jogado (None para uma FEN avulsa)
+            san (str): SAN do lance, calculado antes de empurrá-lo
+        """
+        self.ply = ply
+        self.san = san
+        self.move = move
+        self.uci = move.uci() if move else None
+        self.from_ = chess.square_name(move.from_square) if move else ""
+        self.to = chess.square_name(move.to_square) if move else ""
+        self.fen = board.fen()
+        self.key = chess.polyglot.zobrist_hash(board)
+        self.is_capture = is_capture
+        self.is_sacrifice = sacrifice
+        self.piece_count = chess.popcount(board.occupied)
+        self.terminal, self.forced = position_flags(board)
+
+    def move_fields(self):
+        """
+        Campos do lance no modelo Move.
+        """
+        return {"ply": self.ply, "san": self.san, "from": self.from_, "to": self.to, "uci": self.uci, "fen": self.fen}
+
+
+def build_plies(board, moves):
+    """
+    Empurra os lances num único tabuleiro, calculando o contexto de cada um.
+
+    Args:
+        board (chess.Board): Posição inicial (é modificada)
+        moves (iterable): chess.Move da partida
+
+    Returns:
+        list: PlyContext de cada lance
+    """
+    plies = []
+    for ply, move in enumerate(moves, start=1):
+        san = board.san(move)
+        capture = board.is_capture(move)
+        sacrifice = capture and is_sacrifice(board, move)
+        board.push(move)
+        plies.append(PlyContext(ply, board, move, san, capture, sacrifice))
+    return plies
+
+
+def fen_ply(fen):
+    """
+    Contexto de uma FEN avulsa (análise de posição sem lances).
+
+    Raises:
+        ValueError: FEN malformada ou posição ilegal (o motor não pode analisá-la)
+    """
+    board = chess.Board(fen)
+    if not board.is_valid():
+        raise ValueError(f"posição ilegal: {fen}")
+    return PlyContext(1, board)
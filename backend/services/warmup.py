@@ -0,0 +1,120 @@
+"""
+Aquecimento da aplicação em segundo plano.
+
+Roda numa tarefa criada no lifespan, sem impedir o servidor de aceitar conexões:
+abre o banco de aberturas e o OpeningTrie, importa o NumPy das estatísticas e sobe
+os motores do pool, fazendo uma busca curta em cada um (o Stockfish só carrega a
+rede NNUE na primeira avaliação). /api/ready só responde "ready" quando tudo terminou;
+uma etapa que falha é refeita com intervalo crescente até dar certo.
+"""
+import asyncio
+import logging
+import time
+
+import chess
+
+from config import WARMUP_DEPTH, WARMUP_RETRY_DELAY, WARMUP_RETRY_MAX_DELAY
+from services.game_stats import load_numpy
+from utils.openings import load_lichess_openings
+from utils.opening_db import get_opening_db
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    def __init__(self, retry_delay=WARMUP_RETRY_DELAY, max_retry_delay=WARMUP_RETRY_MAX_DELAY):
+        """
+        Args:
+            retry_delay (float): Espera antes de refazer uma etapa que falhou (segundos)
+            max_retry_delay (float): Limite da espera, que dobra a cada nova falha
+        """
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.steps = {}  # etapa -> {'status', 'ms', 'error', 'attempts'}
+        self.ready = False
+        self.started = None
+        self.finished = None
+
+    async def _step(self, name, run):
+        step = self.steps[name] = {"status": "running", "ms": None, "error": None, "attempts": 0}
+        start = time.perf_counter()
+        delay = self.retry_delay
+        while True:
+            step["attempts"] += 1
+            try:
+                await run()
+                break
+            except Exception as e:
+                # Ex.: motores ocupados ou um processo que não subiu: a etapa é refeita
+                logger.warning("Aquecimento: etapa %s falhou (tentativa %d), nova tentativa em %.1fs: %s",
+                               name, step["attempts"], delay, e)
+                step.update(status="retrying", error=str(e))
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        step.update(status="done", error=None, ms=round((time.perf_counter() - start) * 1000, 1))
+
+    async def run(self, pool):
+        """
+        Executa todas as etapas, refazendo as que falham; enquanto não terminar, a
+        aplicação fica "não pronta" (com o último erro de cada etapa em status()).
+        """
+        self.started = time.time()
+        try:
+            # Leitura/compilação dos TSVs e import do NumPy são síncronos: vão para uma thread
+            await self._step("openings", lambda: asyncio.to_thread(_load_openings))
+            await self._step("stats", lambda: asyncio.to_thread(load_numpy))
+            await self._step("engines", lambda: warm_engines(pool))
+            self.ready = True
+        except Exception as e:
+            logger.error("Aquecimento falhou: %s", e)
+        finally:
+            self.finished = time.time()
+
+    def status(self):
+        return {
+            "status": "ready" if self.ready else ("failed" if self.finished else "warming"),
+            "steps": self.steps,
+        }
+
+
+def _load_openings():
+    get_opening_db()
+    load_lichess_openings()
+
+
+async def warm_engines(pool, depth=WARMUP_DEPTH):
+    """
+    Sobe o pool e faz uma busca curta em cada motor livre. Só os motores livres no
+    momento são emprestados, sem esperar (um motor ocupado por uma requisição já
+    carregou a rede na própria busca), e cada um volta ao pool, com o hash limpo,
+    assim que termina a sua busca.
+    """
+    await pool.start()
+    engines = []
+    while len(engines) < pool.size:
+        engine = await pool.try_checkout()
+        if engine is None:
+            break
+        engines.append(engine)
+
+    async def warm(engine):
+        try:
+            await engine.analyse(chess.STARTING_FEN, depth=depth)
+        finally:
+            await asyncio.shield(pool.checkin(engine))
+
+    outcomes = await asyncio.gather(*(warm(engine) for engine in engines), return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+
+
+# Estado global do aquecimento
+_warmup = None
+
+
+def get_warmup():
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup()
+    return _warmup
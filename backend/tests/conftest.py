@@ -0,0 +1,17 @@
+"""
+Configuração comum dos testes (rodam a partir de backend/: `python -m pytest -q`).
+
+O motor é o falso e determinístico de benchmarks/fake_engine.py, que responde na
+hora; as variáveis de ambiente são definidas antes de qualquer import de `config`.
+"""
+import os
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_ENGINE = os.path.join(BACKEND, "benchmarks", "fake_engine.py")
+
+sys.path.insert(0, BACKEND)
+os.environ["STOCKFISH_PATH"] = FAKE_ENGINE
+os.environ["FAKE_ENGINE_NPS"] = "0"
+os.environ["ENGINE_POOL_SIZE"] = "2"
+os.environ.pop("EVAL_CACHE_DB", None)
@@ -0,0 +1,40 @@
+"""
+classify_move: mate e erros graves têm precedência sobre o rótulo de livro.
+"""
+from services.evaluation import classify_move
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def _classify(delta_cp, eval_mate=None, in_book=True, move_number=1):
+    return classify_move(delta_cp, "e4", "d4", START, eval_best=30, eval_played=30 - delta_cp,
+                         eval_mate=eval_mate, move_number=move_number, in_book=in_book, sacrifice=False, piece_count=32)
+
+
+def test_book_move():
+    assert _classify(10) == "Livro"
+
+
+def test_mate_given_in_book_is_best():
+    assert _classify(0, eval_mate=0) == "Melhor"
+
+
+def test_walking_into_mate_in_book_is_a_blunder():
+    # Mate positivo após o lance: o adversário dá mate em quem jogou
+    assert _classify(0, eval_mate=2) == "Capivarada"
+
+
+def test_forcing_mate_is_not_a_blunder():
+    # Mate negativo após o lance: quem jogou tem mate forçado
+    assert _classify(0, eval_mate=-2) == "Livro"
+    assert _classify(0, eval_mate=-2, in_book=False, move_number=30) != "Capivarada"
+
+
+def test_blunder_in_book_is_a_blunder():
+    assert _classify(400) == "Capivarada"
+    assert _classify(301) == "Capivarada"
+    assert _classify(300) == "Livro"
+
+
+def test_out_of_book():
+    assert _classify(150, in_book=False, move_number=30) == "Erro"
@@ -0,0 +1,30 @@
+"""
+SearchPlan com a dispensa de posições de livro ligada: a posição final e uma FEN
+avulsa sempre são buscadas.
+"""
+import io
+
+import chess
+import chess.pgn
+
+from models.game import AnalyzeRequest
+from services.analysis import game_states, request_states
+from services.elision import BOOK, SearchPlan
+
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+def test_book_game_still_searches_the_final_position():
+    start_fen, states = game_states(chess.pgn.read_game(io.StringIO("1. e4 e5 2. Nf3 Nc6 3. Bb5 a6")))
+    plan = SearchPlan(start_fen, states, in_book=[True] * len(states), elide_book=True)
+    last = len(plan.fens) - 1
+    assert plan.skip.get(last) is None
+    assert last in plan.searched_indices()
+    assert list(plan.skip.values()).count(BOOK) == last
+
+
+def test_fen_request_is_never_elided():
+    start_fen, states = request_states(AnalyzeRequest(fen=AFTER_E4))
+    plan = SearchPlan(start_fen, states, in_book=[True], elide_book=True)
+    assert BOOK not in plan.skip.values()
+    assert len(plan.fens) - 1 in plan.searched_indices()
@@ -0,0 +1,94 @@
+"""
+search_positions_parallel: dividir a partida entre vários motores não muda o resultado,
+divide o tempo de parede pelo número de motores e não usa mais motores que o pool.
+"""
+import asyncio
+import time
+
+import pytest
+
+from services.evaluation import search_positions_async, search_positions_parallel
+from utils.engine_pool import EnginePool
+from utils.eval_cache import EvalCache
+from utils.uci import UciEngine
+from benchmarks.bench_parallel import _game_fens
+from tests.conftest import FAKE_ENGINE
+
+# Nós de uma busca de profundidade SPEEDUP_DEPTH no motor falso (1000 x 1,6^d por iteração);
+# com FAKE_ENGINE_NPS = nós / SEARCH_SECONDS, cada busca leva um tempo fixo
+SPEEDUP_DEPTH = 4
+SEARCH_SECONDS = 0.05
+SEARCH_NODES = sum(int(1000 * 1.6 ** depth) for depth in range(1, SPEEDUP_DEPTH + 1))
+
+# Campos de relógio (time, nps) variam entre execuções; o resto da busca não pode variar
+TIMING_FIELDS = ("time", "nps")
+
+
+def _without_timing(results):
+    return [[{k: v for k, v in line.items() if k not in TIMING_FIELDS} for line in lines] for lines in results]
+
+
+async def _sequential_and_parallel(fens, workers, depth, multipv):
+    pool = EnginePool(size=workers, factory=lambda: UciEngine(FAKE_ENGINE))
+    await pool.start()
+    try:
+        async with pool.acquire() as engine:
+            sequential = await search_positions_async(fens, engine, depth=depth, multipv=multipv,
+                                                      cache=EvalCache(db_path=None), reset_between=True)
+        parallel = await search_positions_parallel(fens, pool, workers, depth=depth, multipv=multipv,
+                                                   cache=EvalCache(db_path=None))
+    finally:
+        await pool.close()
+    return sequential, parallel
+
+
+@pytest.mark.parametrize("workers, multipv", [(1, 1), (3, 1), (4, 3)])
+def test_parallel_matches_sequential(workers, multipv):
+    fens = _game_fens()
+    sequential, parallel = asyncio.run(_sequential_and_parallel(fens, workers, depth=6, multipv=multipv))
+    assert len(parallel) == len(fens)
+    assert _without_timing(parallel) == _without_timing(sequential)
+    assert all(lines and len(lines) <= multipv for lines in parallel)
+
+
+async def _timed_runs(fens, workers):
+    pool = EnginePool(size=workers, factory=lambda: UciEngine(FAKE_ENGINE))
+    in_use, peak, engines = set(), [0], set()
+    checkout, checkin = pool.checkout, pool.checkin
+
+    # try_checkout passa por checkout: contar os dois lados mede os motores emprestados ao mesmo tempo
+    async def counting_checkout(*args, **kwargs):
+        engine = await checkout(*args, **kwargs)
+        in_use.add(engine)
+        engines.add(engine)
+        peak[0] = max(peak[0], len(in_use))
+        return engine
+
+    async def counting_checkin(engine):
+        in_use.discard(engine)
+        await checkin(engine)
+
+    pool.checkout, pool.checkin = counting_checkout, counting_checkin
+    await pool.start()
+    try:
+        elapsed = {}
+        for count in (1, workers):
+            start = time.perf_counter()
+            await search_positions_parallel(fens, pool, count, depth=SPEEDUP_DEPTH, cache=EvalCache(db_path=None))
+            elapsed[count] = time.perf_counter() - start
+    finally:
+        await pool.close()
+    return elapsed[1], elapsed[workers], peak[0], len(engines)
+
+
+def test_parallel_divides_wall_time_by_workers(monkeypatch):
+    # O processo do motor herda o ambiente ao ser iniciado pelo pool
+    monkeypatch.setenv("FAKE_ENGINE_NPS", str(SEARCH_NODES / SEARCH_SECONDS))
+    workers = 4
+    fens = _game_fens()[:16]
+    sequential, parallel, peak, engines = asyncio.run(_timed_runs(fens, workers))
+    assert sequential >= len(fens) * SEARCH_SECONDS
+    # Ideal: sequential / workers; a folga cobre a troca de mensagens e o reset entre posições
+    assert parallel < sequential / workers * 1.6
+    assert peak == workers
+    assert engines <= workers
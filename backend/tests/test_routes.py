@@ -0,0 +1,173 @@
+"""
+Rotas de análise com o motor falso: erros de entrada, mate, ETag/304, reaproveitamento
+de prefixo e formato dos eventos SSE.
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from utils.eval_cache import get_eval_cache
+from utils.game_cache import get_game_cache
+
+SCHOLARS_MATE = "1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7#"
+GAME = "1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3 e5 7. Nb3 Be6 8. f3 Be7 9. Qd2 O-O"
+GAME_PREFIX = "1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6"
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+DEPTH = 6
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    get_game_cache().clear()
+    get_eval_cache().clear()
+
+
+def _sse_events(text):
+    """
+    Separa o corpo SSE em (evento, dados); cada bloco é `event: ...\\ndata: ...` seguido de linha em branco.
+    """
+    assert text.endswith("\n\n")
+    events = []
+    for block in text[:-2].split("\n\n"):
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def _batch_lines(response):
+    return sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+
+
+@pytest.mark.parametrize("path", ["/api/analyze", "/api/analyze/stream"])
+@pytest.mark.parametrize("fen", ["bad", "8/8/8/8/8/8/8/8 w - - 0 1"])
+def test_bad_fen_is_400(client, path, fen):
+    response = client.post(path, json={"fen": fen, "depth": DEPTH})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("FEN inválida")
+
+
+@pytest.mark.parametrize("path", ["/api/analyze", "/api/analyze/stream"])
+@pytest.mark.parametrize("pgn", ["this is not a pgn %%%", "1. e4 e5 2. Ke3 Nf6"])
+def test_garbage_pgn_is_400(client, path, pgn):
+    response = client.post(path, json={"pgn": pgn, "depth": DEPTH})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("PGN inválido")
+
+
+def test_missing_input_is_400(client):
+    assert client.post("/api/analyze", json={"depth": DEPTH}).status_code == 400
+    assert client.post("/api/analyze/stream", json={"depth": DEPTH}).status_code == 400
+    assert client.post("/api/analyze/batch", json={"depth": DEPTH}).status_code == 400
+
+
+def test_batch_reports_bad_games_without_dropping_the_rest(client):
+    response = client.post("/api/analyze/batch", json={
+        "pgn": "garbage",
+        "games": [{"fen": "bad"}, {"pgn": SCHOLARS_MATE}, {"fen": AFTER_E4}],
+        "depth": DEPTH,
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _batch_lines(response)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert [line["status"] for line in lines] == ["error", "error", "ok", "ok"]
+    assert lines[0]["detail"].startswith("PGN inválido")
+    assert lines[1]["detail"].startswith("FEN inválida")
+    assert lines[2]["result"]["moves"][-1]["san"] == "Qxf7#"
+
+
+def test_mate_beats_the_book_label(client):
+    response = client.post("/api/analyze", json={"pgn": SCHOLARS_MATE, "depth": DEPTH})
+    assert response.status_code == 200
+    last = response.json()["moves"][-1]
+    assert last["san"] == "Qxf7#"
+    assert last["eval_mate"] == 0
+    assert last["classification"] == "Melhor"
+
+
+def test_fen_on_a_book_position_is_searched(client):
+    response = client.post("/api/analyze", json={"fen": AFTER_E4, "depth": DEPTH})
+    assert response.status_code == 200
+    move = response.json()["moves"][0]
+    assert move["eval_cp"] is not None or move["eval_mate"] is not None
+    assert move["best_move"]
+    assert response.json()["summary"]["search"]["book"] == 0
+
+
+def test_etag_revalidation(client):
+    body = {"pgn": GAME, "depth": DEPTH}
+    first = client.post("/api/analyze", json=body)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = client.post("/api/analyze", json=body, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    other = client.post("/api/analyze", json=body, headers={"If-None-Match": '"outra"'})
+    assert other.status_code == 200
+    assert other.json() == first.json()
+
+    deeper = client.post("/api/analyze", json={"pgn": GAME, "depth": DEPTH + 1}, headers={"If-None-Match": etag})
+    assert deeper.status_code == 200
+    assert deeper.headers["etag"] != etag
+
+
+def test_prefix_reuse_matches_a_fresh_analysis(client):
+    assert client.post("/api/analyze", json={"pgn": GAME_PREFIX, "depth": DEPTH}).status_code == 200
+    reused = client.post("/api/analyze", json={"pgn": GAME, "depth": DEPTH}).json()
+    assert reused["summary"]["search"]["reused"] > 0
+
+    get_game_cache().clear()
+    get_eval_cache().clear()
+    fresh = client.post("/api/analyze", json={"pgn": GAME, "depth": DEPTH}).json()
+    assert fresh["summary"]["search"]["reused"] == 0
+
+    # Só as contagens de busca mudam; lances, classificações e estatísticas são os mesmos
+    reused["summary"].pop("search")
+    fresh["summary"].pop("search")
+    assert reused == fresh
+
+
+def test_stream_sse_framing_and_order(client):
+    response = client.post("/api/analyze/stream", json={"pgn": SCHOLARS_MATE, "depth": DEPTH})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    events = _sse_events(response.text)
+
+    names = [name for name, _ in events]
+    assert names == ["move"] * 7 + ["summary"]
+    assert [data["move"]["ply"] for _, data in events[:-1]] == list(range(1, 8))
+
+    # Os mesmos lances e o mesmo resumo da análise de uma vez só
+    full = client.post("/api/analyze", json={"pgn": SCHOLARS_MATE, "depth": DEPTH}).json()
+    assert [data["move"] for _, data in events[:-1]] == full["moves"]
+    assert events[-1][1] == {"opening": full["opening"], "summary": full["summary"]}
+
+
+def test_batch_games_use_their_own_depth_and_multipv(client):
+    response = client.post("/api/analyze/batch", json={
+        "games": [{"pgn": SCHOLARS_MATE}, {"pgn": SCHOLARS_MATE, "depth": DEPTH + 2, "multipv": 2}],
+        "depth": DEPTH,
+    })
+    first, second = (line["result"] for line in _batch_lines(response))
+    assert first["summary"]["avg_depth"] == DEPTH
+    assert second["summary"]["avg_depth"] == DEPTH + 2
+    assert first["moves"][1].get("alternatives") is None
+    assert len(second["moves"][1]["alternatives"]) == 2
+
+
+def test_batch_rejects_options_that_do_not_apply_per_game(client):
+    response = client.post("/api/analyze/batch", json={"games": [{"pgn": SCHOLARS_MATE, "budget_ms": 500}]})
+    assert response.status_code == 422
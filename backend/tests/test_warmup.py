@@ -0,0 +1,60 @@
+"""
+Aquecimento: não espera motores ocupados por requisições e refaz etapas que falham.
+"""
+import asyncio
+
+from services.warmup import Warmup, warm_engines
+from utils.engine_pool import EnginePool
+from utils.uci import UciEngine
+from tests.conftest import FAKE_ENGINE
+
+
+def _pool(size):
+    return EnginePool(size=size, factory=lambda: UciEngine(FAKE_ENGINE))
+
+
+def test_warm_engines_skips_busy_engines_without_waiting():
+    async def run():
+        pool = _pool(3)
+        await pool.start()
+        try:
+            busy = await pool.checkout()
+            # Um motor preso numa requisição longa não segura o aquecimento
+            await asyncio.wait_for(warm_engines(pool, depth=2), timeout=5)
+            assert pool.stats()["idle"] == 2
+            await pool.checkin(busy)
+            assert pool.stats()["idle"] == 3
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+class _FlakyPool(EnginePool):
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    async def start(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("motor não subiu")
+        await super().start()
+
+
+def test_failed_step_is_retried_until_ready():
+    async def run():
+        pool = _FlakyPool(2, size=1, factory=lambda: UciEngine(FAKE_ENGINE))
+        warmup = Warmup(retry_delay=0.01, max_retry_delay=0.02)
+        try:
+            await asyncio.wait_for(warmup.run(pool), timeout=30)
+        finally:
+            await pool.close()
+        return warmup
+
+    warmup = asyncio.run(run())
+    status = warmup.status()
+    assert status["status"] == "ready"
+    assert status["steps"]["engines"]["status"] == "done"
+    assert status["steps"]["engines"]["attempts"] == 3
+    assert status["steps"]["engines"]["error"] is None
@@ -0,0 +1,179 @@
+"""
+Pool de processos Stockfish de longa duração, compartilhado entre requisições.
+Os motores são iniciados uma vez (no startup da aplicação) e emprestados por
+requisição, evitando recarregar a rede NNUE e realocar o hash a cada análise.
+
+O pool é assíncrono: esperar por um motor livre não ocupa nenhuma thread.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from config import STOCKFISH_PATH, ENGINE_POOL_SIZE, ENGINE_ACQUIRE_TIMEOUT, ENGINE_THREADS, ENGINE_HASH_MB
+from utils.uci import UciEngine
+
+
+class EnginePoolTimeout(Exception):
+    """Nenhum motor ficou disponível dentro do tempo limite."""
+
+
+class EnginePool:
+    def __init__(self, size=ENGINE_POOL_SIZE, path=STOCKFISH_PATH, factory=None):
+        """
+        Args:
+            size (int): Número de processos mantidos no pool
+            path (str): Caminho do executável do Stockfish
+            factory (callable): Cria um novo UciEngine (ainda não iniciado); padrão usa
+                                Threads/Hash da config
+        """
+        self.size = max(1, size)
+        self.path = path
+        self._factory = factory or (lambda: UciEngine(self.path, parameters={"Threads": ENGINE_THREADS, "Hash": ENGINE_HASH_MB}))
+        self._idle = None
+        self._lock = None
+        self._engines = []
+        self._started = False
+        self.restarts = 0
+
+    async def _new_engine(self):
+        return await self._factory().start()
+
+    async def start(self):
+        """
+        Inicia todos os processos do pool. Chamado no startup da aplicação.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._started:
+                return
+            self._idle = asyncio.LifoQueue()
+            engines = await asyncio.gather(*(self._new_engine() for _ in range(self.size)))
+            for engine in engines:
+                self._engines.append(engine)
+                self._idle.put_nowait(engine)
+            self._started = True
+
+    async def close(self):
+        """
+        Encerra todos os processos do pool.
+        """
+        for engine in self._engines:
+            await engine.close()
+        self._engines = []
+        self._idle = None
+        self._started = False
+
+    async def _replace(self, engine):
+        """
+        Substitui um motor que travou/morreu por um processo novo.
+        """
+        await engine.close()
+        new_engine = await self._new_engine()
+        if engine in self._engines:
+            self._engines.remove(engine)
+        self._engines.append(new_engine)
+        self.restarts += 1
+        return new_engine
+
+    async def _healthy(self, engine):
+        if not engine.is_alive():
+            return False
+        try:
+            await engine.ping(timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def checkout(self, timeout=ENGINE_ACQUIRE_TIMEOUT):
+        """
+        Retira um motor do pool, verificando se ele está saudável.
+
+        Raises:
+            EnginePoolTimeout: se nenhum motor ficar livre dentro de `timeout` segundos
+        """
+        if not self._started:
+            await self.start()
+        try:
+            if timeout:
+                engine = await asyncio.wait_for(self._idle.get(), timeout)
+            else:
+                engine = self._idle.get_nowait()
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            raise EnginePoolTimeout(f"Nenhum motor disponível após {timeout}s")
+        if not await self._healthy(engine):
+            try:
+                engine = await self._replace(engine)
+            except Exception:
+                # Devolve a vaga para não encolher o pool permanentemente
+                self._idle.put_nowait(engine)
+                raise
+        return engine
+
+    async def try_checkout(self):
+        """
+        Retira um motor apenas se houver um livre agora; senão retorna None.
+        """
+        try:
+            return await self.checkout(timeout=0)
+        except EnginePoolTimeout:
+            return None
+
+    async def checkin(self, engine):
+        """
+        Devolve um motor ao pool, limpando o estado da partida anterior
+        (inclusive interrompendo uma busca cancelada). Motores que morreram
+        durante o uso são reiniciados.
+        """
+        try:
+            await engine.reset()
+        except Exception:
+            pass
+        if not await self._healthy(engine):
+            try:
+                engine = await self._replace(engine)
+            except Exception:
+                pass
+        if self._idle is not None:
+            self._idle.put_nowait(engine)
+
+    @asynccontextmanager
+    async def acquire(self, timeout=ENGINE_ACQUIRE_TIMEOUT):
+        """
+        Uso:
+            async with pool.acquire() as engine:
+                await engine.eval_fen(fen)
+        """
+        engine = await self.checkout(timeout)
+        try:
+            yield engine
+        finally:
+            # Mesmo se a tarefa foi cancelada, o motor precisa voltar ao pool
+            await asyncio.shield(self.checkin(engine))
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "restarts": self.restarts,
+        }
+
+
+# Pool global da aplicação
+_engine_pool = None
+
+
+def get_engine_pool():
+    """
+    Retorna o pool global, criando-o se necessário.
+    """
+    global _engine_pool
+    if _engine_pool is None:
+        _engine_pool = EnginePool()
+    return _engine_pool
+
+
+async def shutdown_engine_pool():
+    global _engine_pool
+    if _engine_pool is not None:
+        await _engine_pool.close()
+        _engine_pool = None
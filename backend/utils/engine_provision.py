@@ -0,0 +1,171 @@
+"""
+Provisionamento do Stockfish a partir do código-fonte em backend/stockfish/src.
+
+Compila o motor para a CPU do servidor (ARCH detectada por
+scripts/get_native_properties.sh, build guiado por perfil quando possível),
+instala o binário em data/engine/ e roda `stockfish bench` para medir nós/segundo.
+A calibração (data/engine/calibration.json) guarda a medição e as configurações
+recomendadas do pool (motores, Threads, Hash), lidas pelo config.py no startup.
+
+Uso (a partir de backend/):
+    python -m utils.engine_provision build [--arch ARCH] [--comp gcc|clang] [--no-pgo]
+    python -m utils.engine_provision calibrate [--engine CAMINHO]
+    python -m utils.engine_provision show
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+from config import ENGINE_DIR, ENGINE_CALIBRATION_PATH, STOCKFISH_SOURCE_DIR
+
+ENGINE_BINARY = os.path.join(ENGINE_DIR, "stockfish.exe" if os.name == "nt" else "stockfish")
+
+# Nós buscados por posição que o hash deve comportar (~1s de busca) e bytes por nó na TT
+_HASH_SECONDS = 1.0
+_BYTES_PER_NODE = 10
+# Fração da memória da máquina reservada para o hash de todos os motores
+_HASH_MEMORY_FRACTION = 0.25
+
+
+def native_arch(source_dir=STOCKFISH_SOURCE_DIR):
+    """
+    Melhor ARCH do Makefile para a CPU atual (primeiro campo de get_native_properties.sh).
+    """
+    script = os.path.join(source_dir, "scripts", "get_native_properties.sh")
+    output = subprocess.run(["sh", script], capture_output=True, text=True, check=True).stdout
+    return output.split()[0]
+
+
+def build(arch=None, comp="gcc", pgo=True, jobs=None, source_dir=STOCKFISH_SOURCE_DIR):
+    """
+    Compila o motor e instala o binário em data/engine/.
+
+    Returns:
+        str: Caminho do binário instalado
+    """
+    src = os.path.join(source_dir, "src")
+    arch = arch or native_arch(source_dir)
+    jobs = jobs or os.cpu_count() or 1
+    targets = ["profile-build", "build"] if pgo else ["build"]
+    for target in targets:
+        print(f"Compilando ({target}, ARCH={arch}, COMP={comp})...")
+        result = subprocess.run(["make", f"-j{jobs}", target, f"ARCH={arch}", f"COMP={comp}"], cwd=src)
+        if result.returncode == 0:
+            break
+        # O build com perfil depende do compilador (gcov/llvm-profdata); sem ele, build normal
+        print(f"{target} falhou (código {result.returncode})")
+    else:
+        raise RuntimeError("Não foi possível compilar o Stockfish")
+    os.makedirs(ENGINE_DIR, exist_ok=True)
+    binary = os.path.join(src, os.path.basename(ENGINE_BINARY))
+    shutil.copy2(binary, ENGINE_BINARY)
+    subprocess.run(["make", "clean"], cwd=src, capture_output=True)
+    return ENGINE_BINARY
+
+
+def run_bench(engine, hash_mb=16, threads=1, depth=13):
+    """
+    Roda `stockfish bench` e lê o resultado (o Stockfish escreve o resumo no stderr).
+
+    Returns:
+        dict: {'nodes', 'time_ms', 'nps'}
+    """
+    result = subprocess.run([engine, "bench", str(hash_mb), str(threads), str(depth)], capture_output=True, text=True, check=True)
+    output = result.stdout + result.stderr
+    values = {}
+    for label, key in (("Total time \\(ms\\)", "time_ms"), ("Nodes searched", "nodes"), ("Nodes/second", "nps")):
+        match = re.search(label + r"\s*:\s*(\d+)", output)
+        if not match:
+            raise RuntimeError(f"Saída inesperada do bench: {output[-500:]}")
+        values[key] = int(match.group(1))
+    return values
+
+
+def total_memory_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def recommend_settings(cpus, nps, memory_mb=None):
+    """
+    Configuração do pool a partir da máquina e da velocidade medida.
+
+    Um núcleo fica para o servidor web; cada um dos demais vira um motor de 1 thread.
+    Threads fica sempre em 1: é o que torna a busca de cada posição determinística
+    (a análise paralela e a sequencial dão o mesmo resultado), então núcleos extras
+    viram mais motores no pool, nunca mais threads por motor.
+    O hash de cada motor comporta ~_HASH_SECONDS de busca, limitado a uma fração da memória.
+
+    Returns:
+        dict: {'pool_size', 'threads', 'hash_mb'}
+    """
+    pool_size = max(cpus - 1, 1)
+    threads = 1
+    wanted_mb = nps * threads * _HASH_SECONDS * _BYTES_PER_NODE / (1024 * 1024)
+    hash_mb = 16
+    while hash_mb * 2 <= wanted_mb:
+        hash_mb *= 2
+    if memory_mb:
+        limit = memory_mb * _HASH_MEMORY_FRACTION / pool_size
+        while hash_mb > 1 and hash_mb > limit:
+            hash_mb //= 2
+    return {"pool_size": pool_size, "threads": threads, "hash_mb": int(hash_mb)}
+
+
+def calibrate(engine=ENGINE_BINARY, arch=None):
+    """
+    Mede o motor e grava data/engine/calibration.json.
+    """
+    cpus = os.cpu_count() or 1
+    single = run_bench(engine)
+    memory_mb = total_memory_mb()
+    calibration = {
+        "engine": os.path.abspath(engine),
+        "arch": arch,
+        "cpus": cpus,
+        "memory_mb": memory_mb,
+        "bench": single,
+        "measured_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "recommended": recommend_settings(cpus, single["nps"], memory_mb),
+    }
+    os.makedirs(os.path.dirname(ENGINE_CALIBRATION_PATH), exist_ok=True)
+    with open(ENGINE_CALIBRATION_PATH, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    return calibration
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "calibrate", "show"])
+    parser.add_argument("--arch", help="ARCH do Makefile (padrão: detectada)")
+    parser.add_argument("--comp", default="gcc")
+    parser.add_argument("--no-pgo", action="store_true", help="Compila sem build guiado por perfil")
+    parser.add_argument("--jobs", type=int)
+    parser.add_argument("--engine", default=ENGINE_BINARY, help="Binário a calibrar")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        if not os.path.exists(ENGINE_CALIBRATION_PATH):
+            print(f"{ENGINE_CALIBRATION_PATH}: não encontrado")
+            return 1
+        print(open(ENGINE_CALIBRATION_PATH, encoding="utf-8").read())
+        return 0
+    engine, arch = args.engine, args.arch
+    if args.command == "build":
+        arch = arch or native_arch()
+        engine = build(arch=arch, comp=args.comp, pgo=not args.no_pgo, jobs=args.jobs)
+    calibration = calibrate(engine, arch=arch)
+    print(f"{calibration['engine']}: {calibration['bench']['nps']} nós/s em 1 thread; "
+          f"recomendado {calibration['recommended']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Cache de avaliações do motor, indexado pelo hash Zobrist da posição.
+Uma busca pedida com profundidade d é atendida por qualquer resultado guardado
+com profundidade >= d (e pelo menos o mesmo número de linhas MultiPV).
+
+Dois níveis:
+  - memória: LRU limitado por número de posições
+  - disco (opcional): SQLite, sobrevive a reinícios do servidor; as gravações são
+    acumuladas e gravadas em lote (flush), sem um commit por posição
+"""
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+from config import EVAL_CACHE_SIZE, EVAL_CACHE_DB, EVAL_CACHE_DB_BATCH
+
+
+def position_hash(fen):
+    """
+    Hash Zobrist (Polyglot) da posição; ignora os contadores de lances.
+    """
+    return chess.polyglot.zobrist_hash(chess.Board(fen))
+
+
+class EvalCache:
+    def __init__(self, max_size=EVAL_CACHE_SIZE, db_path=EVAL_CACHE_DB, db_batch=EVAL_CACHE_DB_BATCH):
+        """
+        Args:
+            max_size (int): Número máximo de posições no nível em memória
+            db_path (str): Caminho do SQLite do nível em disco (None desativa)
+            db_batch (int): Gravações acumuladas antes de gravar no SQLite
+        """
+        self.max_size = max_size
+        self.db_batch = max(1, db_batch)
+        self._entries = OrderedDict()  # hash -> (depth, multipv, lines)
+        self._pending = {}  # hash -> (depth, multipv, lines) ainda não gravado no SQLite
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS evals ("
+                "key INTEGER PRIMARY KEY, depth INTEGER, multipv INTEGER, lines TEXT)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _satisfies(entry, depth, multipv):
+        entry_depth, entry_multipv, lines = entry
+        # Posições sem lances legais (mate/afogamento) têm resultado exato
+        terminal = len(lines) == 1 and not lines[0]["pv"]
+        return terminal or (entry_depth >= depth and (entry_multipv >= multipv or len(lines) < entry_multipv))
+
+    @staticmethod
+    def _replaces(entry, current):
+        # Mesma regra nos dois níveis (e no UPSERT do SQLite): (profundidade, MultiPV) maior ou igual
+        return current is None or (entry[0], entry[1]) >= (current[0], current[1])
+
+    def get(self, key, depth, multipv=1):
+        """
+        Retorna as linhas guardadas para a posição, ou None se não houver
+        resultado com profundidade e MultiPV suficientes.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._satisfies(entry, depth, multipv):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2][:multipv]
+            entry = self._pending.get(key)
+            if entry is not None and self._satisfies(entry, depth, multipv):
+                self._store_memory(key, entry)
+                self.disk_hits += 1
+                return entry[2][:multipv]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT depth, multipv, lines FROM evals WHERE key = ?", (self._db_key(key),)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1], json.loads(row[2]))
+                    if self._satisfies(entry, depth, multipv):
+                        self._store_memory(key, entry)
+                        self.disk_hits += 1
+                        return entry[2][:multipv]
+            self.misses += 1
+            return None
+
+    def put(self, key, depth, multipv, lines):
+        """
+        Guarda o resultado de uma busca; nunca substitui um resultado mais profundo
+        (ou de mesma profundidade com menos linhas MultiPV). No disco, a gravação
+        fica pendente até completar um lote ou até flush().
+        """
+        entry = (depth, multipv, lines)
+        with self._lock:
+            if not self._replaces(entry, self._entries.get(key)):
+                return
+            self._store_memory(key, entry)
+            if self._db is not None:
+                if self._replaces(entry, self._pending.get(key)):
+                    self._pending[key] = entry
+                if len(self._pending) >= self.db_batch:
+                    self._flush_pending()
+
+    def flush(self):
+        """
+        Grava no SQLite os resultados pendentes (um único commit).
+        """
+        with self._lock:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if self._db is None or not self._pending:
+            return
+        rows = [(self._db_key(key), depth, multipv, json.dumps(lines))
+                for key, (depth, multipv, lines) in self._pending.items()]
+        self._pending.clear()
+        self._db.executemany(
+            "INSERT INTO evals (key, depth, multipv, lines) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET depth = excluded.depth, multipv = excluded.multipv, "
+            "lines = excluded.lines WHERE (excluded.depth, excluded.multipv) >= (evals.depth, evals.multipv)",
+            rows,
+        )
+        self._db.commit()
+
+    def _store_memory(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _db_key(key):
+        # SQLite só guarda inteiros com sinal de 64 bits
+        return key - (1 << 64) if key >= (1 << 63) else key
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM evals")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self._db is not None,
+            "disk_pending": len(self._pending),
+        }
+
+
+# Cache global da aplicação
+_eval_cache = None
+
+
+def get_eval_cache():
+    global _eval_cache
+    if _eval_cache is None:
+        _eval_cache = EvalCache()
+    return _eval_cache
@@ -1,8 +1,12 @@
 import os
 import csv
+import logging
 import chess
 import chess.pgn
 from io import StringIO
+from utils.opening_db import get_opening_db
+
+logger = logging.getLogger(__name__)
 
 # Cache global para o mapeamento FEN → Abertura
 _fen_to_opening = None
@@ -17,7 +21,7 @@ def load_fen_openings():
     if _fen_to_opening is not None:
         return _fen_to_opening
     
-    print("DEBUG: Carregando mapeamento FEN → Abertura...")
+    logger.debug("Carregando mapeamento FEN → Abertura...")
     _fen_to_opening = {}
     total_loaded = 0
     
@@ -41,10 +45,10 @@ def load_fen_openings():
                                 total_loaded += 1
                                 
             except Exception as e:
-                print(f"DEBUG: Erro ao carregar {file_name}: {e}")
+                logger.warning("Erro ao carregar %s: %s", file_name, e)
                 continue
     
-    print(f"DEBUG: FEN mapping carregado - {total_loaded} posições")
+    logger.debug("FEN mapping carregado - %d posições", total_loaded)
     return _fen_to_opening
 
 def moves_to_fen(moves_string):
@@ -73,7 +77,7 @@ def moves_to_fen(moves_string):
         return board.fen()
         
     except Exception as e:
-        print(f"DEBUG: Erro ao converter movimentos '{moves_string}' para FEN: {e}")
+        logger.debug("Erro ao converter movimentos '%s' para FEN: %s", moves_string, e)
         return None
 
 def normalize_fen(fen):
@@ -97,19 +101,9 @@ def get_opening_by_fen(fen):
     Returns:
         tuple: (eco_code, opening_name) ou None se não encontrar
     """
-    fen_map = load_fen_openings()
-    
-    # Primeiro tenta busca exata
-    if fen in fen_map:
-        return fen_map[fen]
-    
-    # Se não encontrar, tenta busca normalizada (ignorando contadores)
-    normalized_fen = normalize_fen(fen)
-    for stored_fen, opening in fen_map.items():
-        if normalize_fen(stored_fen) == normalized_fen:
-            return opening
-    
-    return None
+    # Busca exata e, se não encontrar, normalizada (ignorando contadores),
+    # ambas por chave no banco compilado (ver utils/opening_db.py)
+    return get_opening_db().lookup_fen(fen)
 
 def classify_move_by_fen(current_fen, move_number=None):
     """
@@ -136,26 +130,26 @@ def classify_move_by_fen(current_fen, move_number=None):
     
     return None
 
-def is_likely_opening_position(fen):
+def is_likely_opening_position(fen, piece_count=None):
     """
     Verifica se uma posição FEN parece ser de abertura baseado em heurísticas simples.
     
     Args:
         fen (str): FEN da posição
+        piece_count (int): Número de peças, se já conhecido (dispensa montar o tabuleiro)
         
     Returns:
         bool: True se parece posição de abertura
     """
     try:
-        import chess
-        board = chess.Board(fen)
-        
         # Heurísticas para identificar posição de abertura:
         # 1. Poucas peças foram movidas
         # 2. Reis ainda não fizeram roque
         # 3. Maioria das peças ainda na posição inicial
         
-        piece_count = len(board.piece_map())
+        if piece_count is None:
+            import chess
+            piece_count = len(chess.Board(fen).piece_map())
         
         # Se ainda temos quase todas as peças (32 ou próximo), provavelmente é abertura
         if piece_count >= 30:
@@ -172,13 +166,13 @@ def detect_opening_info_by_fen(final_fen, all_fens=None):
     Se não encontrar pela posição final, tenta pelas posições anteriores.
     Retorna dict com eco, name, ou None se não encontrar.
     """
-    print(f"DEBUG: detect_opening_info_by_fen chamada com FEN completo: '{final_fen}'")
+    logger.debug("detect_opening_info_by_fen chamada com FEN completo: '%s'", final_fen)
     
     # Primeiro tenta pela posição final
     opening = get_opening_by_fen(final_fen)
     if opening:
         eco_code, opening_name = opening
-        print(f"DEBUG: Abertura encontrada por FEN final - {eco_code}: {opening_name}")
+        logger.debug("Abertura encontrada por FEN final - %s: %s", eco_code, opening_name)
         return {
             'eco': eco_code,
             'name': opening_name
@@ -186,16 +180,16 @@ def detect_opening_info_by_fen(final_fen, all_fens=None):
     
     # Se não encontrou e temos todas as posições, tenta pelas anteriores (da mais recente para a mais antiga)
     if all_fens:
-        print(f"DEBUG: Tentando detectar abertura pelas {len(all_fens)} posições anteriores...")
+        logger.debug("Tentando detectar abertura pelas %d posições anteriores...", len(all_fens))
         for i, fen in enumerate(reversed(all_fens[:-1])):  # Exclui a última (que já testamos)
             opening = get_opening_by_fen(fen)
             if opening:
                 eco_code, opening_name = opening
-                print(f"DEBUG: Abertura encontrada pela posição {len(all_fens)-i-1} - {eco_code}: {opening_name}")
+                logger.debug("Abertura encontrada pela posição %d - %s: %s", len(all_fens) - i - 1, eco_code, opening_name)
                 return {
                     'eco': eco_code,
                     'name': opening_name
                 }
     
-    print(f"DEBUG: Nenhuma abertura encontrada para nenhuma posição")
+    logger.debug("Nenhuma abertura encontrada para nenhuma posição")
     return None
@@ -0,0 +1,113 @@
+"""
+Cache de análises completas, endereçado pelo conteúdo da partida.
+
+A chave é um hash encadeado: parte da posição inicial, profundidade e MultiPV e
+incorpora um lance de cada vez. Assim, a chave de cada prefixo da partida sai
+de graça, e uma partida que estende outra já analisada encontra a análise do
+prefixo procurando a chave mais longa guardada.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import GAME_CACHE_SIZE
+
+
+def game_keys(start_fen, tokens, depth, multipv):
+    """
+    Chaves de todos os prefixos da partida.
+
+    Args:
+        start_fen (str): Posição inicial
+        tokens (list): Lances UCI (ou, para uma FEN avulsa, as FENs analisadas)
+        depth (int): Profundidade da análise
+        multipv (int): Alternativas por lance
+
+    Returns:
+        list: keys[i] é a chave dos i primeiros lances (keys[-1] é a partida inteira)
+    """
+    digest = hashlib.blake2b(f"{start_fen}|{depth}|{multipv}".encode(), digest_size=16).digest()
+    keys = [digest.hex()]
+    for token in tokens:
+        digest = hashlib.blake2b(digest + token.encode(), digest_size=16).digest()
+        keys.append(digest.hex())
+    return keys
+
+
+class GameCache:
+    def __init__(self, max_size=GAME_CACHE_SIZE):
+        """
+        Args:
+            max_size (int): Número máximo de análises guardadas (LRU)
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()  # chave -> AnalyzeResponse
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def longest_prefix(self, keys):
+        """
+        Análise guardada do prefixo mais longo.
+
+        Args:
+            keys (list): Chaves dos prefixos (game_keys), keys[i] com i lances
+
+        Returns:
+            tuple: (número de lances do prefixo, AnalyzeResponse) ou (0, None)
+        """
+        with self._lock:
+            for length in range(len(keys) - 1, 0, -1):
+                response = self._entries.get(keys[length])
+                if response is not None:
+                    self._entries.move_to_end(keys[length])
+                    self.prefix_hits += 1
+                    return length, response
+            return 0, None
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Cache global da aplicação
+_game_cache = None
+
+
+def get_game_cache():
+    global _game_cache
+    if _game_cache is None:
+        _game_cache = GameCache()
+    return _game_cache
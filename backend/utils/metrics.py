@@ -0,0 +1,223 @@
+"""
+Instrumentação da análise: tempos por etapa, estatísticas do motor e métricas agregadas.
+
+Cada requisição ganha um RequestTimings (numa contextvar, visível também nas tarefas
+criadas por ela). `stage("search")` mede um trecho, soma o tempo à requisição e
+alimenta o histograma da etapa; record_search registra cada busca do motor
+(profundidade, nós, nps, hashfull). O ServerTimingMiddleware devolve os totais da
+requisição no cabeçalho Server-Timing, e render() gera o texto no formato do
+Prometheus para /api/metrics.
+
+Os detalhes por busca e por requisição vão para o logging em nível DEBUG/INFO
+(LOG_LEVEL), sem custo quando o nível está desligado.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label=None):
+        """
+        Args:
+            name (str): Nome da métrica no Prometheus
+            help_text (str): Descrição (# HELP)
+            buckets (tuple): Limites superiores dos buckets, em ordem crescente
+            label (str): Nome do rótulo (ex.: "stage"), se a métrica tiver um
+        """
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}  # valor do rótulo -> [contagens por bucket, soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, (counts, total, count) in sorted(self._series.items(), key=lambda item: str(item[0])):
+                label = f'{self.label}="{label_value}",' if self.label else ""
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(f'{self.name}_bucket{{{label}le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{label}le="+Inf"}} {count}')
+                suffix = f"{{{label.rstrip(',')}}}" if label else ""
+                lines.append(f"{self.name}_sum{suffix} {total}")
+                lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("chessify_stage_seconds", "Tempo por etapa da análise", _TIME_BUCKETS, label="stage")
+REQUEST_SECONDS = Histogram("chessify_request_seconds", "Tempo total das requisições", _TIME_BUCKETS, label="path")
+SEARCH_SECONDS = Histogram("chessify_engine_search_seconds", "Tempo de cada busca do motor", _TIME_BUCKETS)
+SEARCH_DEPTH = Histogram("chessify_engine_depth", "Profundidade alcançada por busca", (1, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 25, 30, 40))
+SEARCH_NODES = Histogram("chessify_engine_nodes", "Nós por busca", (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7, 1e8))
+SEARCH_NPS = Histogram("chessify_engine_nps", "Nós por segundo de cada busca", (1e4, 1e5, 3e5, 1e6, 2e6, 5e6, 1e7, 3e7))
+SEARCH_HASHFULL = Histogram("chessify_engine_hashfull", "Ocupação do hash ao fim da busca (por mil)", (10, 50, 100, 250, 500, 750, 900, 1000))
+
+HISTOGRAMS = (STAGE_SECONDS, REQUEST_SECONDS, SEARCH_SECONDS, SEARCH_DEPTH, SEARCH_NODES, SEARCH_NPS, SEARCH_HASHFULL)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}  # etapa -> segundos (somados se a etapa se repete)
+        self.searches = 0
+        self.nodes = 0
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self):
+        """
+        Valor do cabeçalho Server-Timing (durações em ms).
+        """
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        if self.searches:
+            # Cabeçalhos HTTP são ASCII
+            parts.append(f'engine;desc="searches={self.searches} nodes={self.nodes}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """
+    Mede um trecho da análise como a etapa `name`.
+
+    Uso:
+        with stage("search"):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def record_search(lines, seconds):
+    """
+    Registra uma busca do motor a partir das linhas de UciEngine.analyse.
+    """
+    SEARCH_SECONDS.observe(seconds)
+    top = lines[0] if lines else {}
+    depth, nodes, nps, hashfull = top.get("depth"), top.get("nodes"), top.get("nps"), top.get("hashfull")
+    if depth is not None:
+        SEARCH_DEPTH.observe(depth)
+    if nodes is not None:
+        SEARCH_NODES.observe(nodes)
+    if nps is not None:
+        SEARCH_NPS.observe(nps)
+    if hashfull is not None:
+        SEARCH_HASHFULL.observe(hashfull)
+    timings = _current.get()
+    if timings is not None:
+        timings.searches += 1
+        timings.nodes += nodes or 0
+    logger.debug("search depth=%s nodes=%s nps=%s hashfull=%s ms=%.1f", depth, nodes, nps, hashfull, seconds * 1000)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI: abre um RequestTimings por requisição HTTP e escreve os totais
+    no cabeçalho Server-Timing quando a resposta começa.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - timings.started
+            # Caminhos inexistentes ficam de fora (não criam séries novas)
+            if status is not None and status != 404:
+                REQUEST_SECONDS.observe(elapsed, scope["path"])
+            if logger.isEnabledFor(logging.INFO):
+                stages = {name: round(seconds * 1000, 1) for name, seconds in timings.stages.items()}
+                logger.info("request path=%s status=%s ms=%.1f stages=%s searches=%d nodes=%d", scope["path"], status,
+                            elapsed * 1000, stages, timings.searches, timings.nodes)
+
+
+def render_stats(prefix, stats, help_text, counters=()):
+    """
+    Valores numéricos de um dict de estatísticas (ex.: pool.stats()).
+
+    Args:
+        counters (iterable): Chaves que só crescem (acertos, reinícios...): saem como
+                             counter com sufixo _total; as demais são gauges (valor do momento)
+    """
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in counters:
+            name, kind = f"{prefix}_{key}_total", "counter"
+        else:
+            name, kind = f"{prefix}_{key}", "gauge"
+        lines += [f"# HELP {name} {help_text}: {key}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return lines
+
+
+def render(stats=()):
+    """
+    Texto no formato de exposição do Prometheus.
+
+    Args:
+        stats (iterable): (prefixo, dict de estatísticas, descrição, chaves que são counters)
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    for prefix, values, help_text, counters in stats:
+        lines += render_stats(prefix, values, help_text, counters)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,471 @@
+"""
+Banco de aberturas pré-compilado em formato binário, aberto com mmap.
+
+Os TSVs em backend/tsv/ continuam sendo a fonte da verdade; este módulo os
+compila num artefato compacto (chaves de posição ordenadas, tabela de
+strings ECO/nome e a árvore de sequências de lances) que é usado em tempo de
+execução sem nenhum parsing. Como o arquivo é mapeado somente-leitura, as
+páginas são compartilhadas entre os workers do uvicorn.
+
+O cabeçalho guarda o SHA-256 dos TSVs; se eles mudarem, o artefato é
+reconstruído automaticamente na próxima abertura.
+
+Uso (a partir de backend/):
+    python -m utils.opening_db build     # (re)compila o artefato
+    python -m utils.opening_db check     # verifica se está atualizado
+"""
+import bisect
+import csv
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+import chess
+
+from config import OPENING_DB_PATH
+from utils.trie import OpeningTrie, normalize_moves
+
+logger = logging.getLogger(__name__)
+
+TSV_FOLDER = os.path.join(os.path.dirname(__file__), "..", "tsv")
+TSV_FILES = ["a.tsv", "b.tsv", "c.tsv", "d.tsv", "e.tsv"]
+
+MAGIC = b"CSZOPEN1"
+VERSION = 1
+# magic, versão, sha256 dos TSVs e o tamanho de cada seção (em elementos)
+_HEADER = struct.Struct("<8sI32s9I")
+_SECTION_ALIGN = 8
+
+
+def position_key(fen):
+    """
+    Chave de 64 bits da posição normalizada (sem contadores de lances).
+    """
+    normalized = " ".join(fen.split()[:4])
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), "little")
+
+
+def fen_key(fen):
+    """
+    Chave de 64 bits do FEN completo (busca exata).
+    """
+    return int.from_bytes(hashlib.blake2b(fen.encode(), digest_size=8).digest(), "little")
+
+
+def tsv_digest():
+    """
+    SHA-256 do conteúdo de todos os TSVs, na ordem de carregamento.
+    """
+    digest = hashlib.sha256()
+    for file_name in TSV_FILES:
+        file_path = os.path.join(TSV_FOLDER, file_name)
+        if os.path.exists(file_path):
+            digest.update(file_name.encode())
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+    return digest.digest()
+
+
+def _read_tsv_rows():
+    for file_name in TSV_FILES:
+        file_path = os.path.join(TSV_FOLDER, file_name)
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r", encoding="utf-8") as f:
+            for row in csv.reader(f, delimiter="\t"):
+                # A primeira linha de cada TSV é o cabeçalho (eco, name, pgn)
+                if len(row) >= 3 and row[0] != "eco":
+                    yield row[0], row[1], row[2]
+
+
+def _final_fen(moves):
+    board = chess.Board()
+    try:
+        for san in moves:
+            board.push_san(san)
+    except ValueError:
+        return None
+    return board.fen()
+
+
+def _pack_section(fmt, values):
+    data = struct.pack(f"<{len(values)}{fmt}", *values)
+    return data + b"\0" * (-len(data) % _SECTION_ALIGN)
+
+
+def build_database():
+    """
+    Compila os TSVs no formato binário.
+
+    Returns:
+        bytes: Conteúdo do artefato
+    """
+    strings = bytearray()
+    string_offsets = {}
+
+    def intern(text):
+        if text not in string_offsets:
+            encoded = text.encode("utf-8")
+            string_offsets[text] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return string_offsets[text]
+
+    openings = []
+    opening_ids = {}
+    fen_map = {}
+    trie = OpeningTrie()
+    for eco_code, opening_name, moves_string in _read_tsv_rows():
+        opening = (eco_code, opening_name)
+        if opening not in opening_ids:
+            opening_ids[opening] = len(openings)
+            openings.append(opening)
+        trie.insert(moves_string, eco_code, opening_name)
+        fen = _final_fen(normalize_moves(moves_string))
+        if fen:
+            fen_map[fen] = opening_ids[opening]
+
+    # Mesma semântica do mapeamento em memória: FEN exato (última entrada vence)
+    # e posição normalizada (primeira entrada vence)
+    exact = {fen_key(fen): opening_id for fen, opening_id in fen_map.items()}
+    normalized = {}
+    for fen, opening_id in fen_map.items():
+        normalized.setdefault(position_key(fen), opening_id)
+    exact_keys = sorted(exact)
+    normalized_keys = sorted(normalized)
+
+    # Árvore em largura: os filhos de cada nó ficam contíguos na tabela de arestas
+    move_ids = {}
+    node_first_edge, node_edge_count, node_opening = [], [], []
+    edge_move, edge_child = [], []
+    queue = [trie]
+    head = 0
+    while head < len(queue):
+        node = queue[head]
+        head += 1
+        node_first_edge.append(len(edge_move))
+        node_edge_count.append(len(node.children))
+        node_opening.append(opening_ids[node.opening_data] if node.opening_data else -1)
+        for move, child in node.children.items():
+            edge_move.append(move_ids.setdefault(move, len(move_ids)))
+            edge_child.append(len(queue))
+            queue.append(child)
+
+    opening_table = []
+    for eco_code, opening_name in openings:
+        opening_table.extend(intern(eco_code))
+        opening_table.extend(intern(opening_name))
+    move_table = []
+    for move in move_ids:
+        move_table.extend(intern(move))
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, tsv_digest(),
+        len(exact_keys), len(normalized_keys), len(openings), len(queue),
+        len(edge_move), len(move_ids), len(strings), 0, 0,
+    )
+    sections = [
+        header + b"\0" * (-len(header) % _SECTION_ALIGN),
+        _pack_section("Q", exact_keys),
+        _pack_section("I", [exact[k] for k in exact_keys]),
+        _pack_section("Q", normalized_keys),
+        _pack_section("I", [normalized[k] for k in normalized_keys]),
+        _pack_section("I", opening_table),
+        _pack_section("I", node_first_edge),
+        _pack_section("I", node_edge_count),
+        _pack_section("i", node_opening),
+        _pack_section("I", edge_move),
+        _pack_section("I", edge_child),
+        _pack_section("I", move_table),
+        bytes(strings),
+    ]
+    return b"".join(sections)
+
+
+def write_database(path=OPENING_DB_PATH):
+    """
+    Compila e grava o artefato de forma atômica (vários workers podem tentar ao mesmo tempo).
+    """
+    data = build_database()
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(data)
+
+
+class OpeningDatabase:
+    """
+    Visão somente-leitura sobre o artefato (mmap ou bytes em memória).
+    """
+
+    def __init__(self, buffer, mapping=None):
+        self._mapping = mapping
+        view = memoryview(buffer)
+        (magic, version, digest, n_exact, n_normalized, n_openings, n_nodes,
+         n_edges, n_moves, n_strings, _, _) = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Artefato de aberturas inválido ou de versão incompatível")
+        self.digest = digest
+        offset = _HEADER.size + (-_HEADER.size % _SECTION_ALIGN)
+
+        def section(fmt, count):
+            nonlocal offset
+            size = struct.calcsize(fmt) * count
+            data = view[offset:offset + size].cast(fmt)
+            offset += size + (-size % _SECTION_ALIGN)
+            return data
+
+        self._exact_keys = section("Q", n_exact)
+        self._exact_openings = section("I", n_exact)
+        self._position_keys = section("Q", n_normalized)
+        self._position_openings = section("I", n_normalized)
+        self._openings = section("I", n_openings * 4)
+        self._node_first_edge = section("I", n_nodes)
+        self._node_edge_count = section("I", n_nodes)
+        self._node_opening = section("i", n_nodes)
+        self._edge_move = section("I", n_edges)
+        self._edge_child = section("I", n_edges)
+        move_table = section("I", n_moves * 2)
+        self._strings = view[offset:offset + n_strings]
+        self.position_count = n_normalized
+        self.node_count = n_nodes
+        self.opening_count = n_openings
+        # Tabela SAN → id (poucas centenas de lances distintos)
+        self._move_names = [self._string(move_table[2 * i], move_table[2 * i + 1]) for i in range(n_moves)]
+        self._move_ids = {move: i for i, move in enumerate(self._move_names)}
+
+    def _string(self, offset, length):
+        return bytes(self._strings[offset:offset + length]).decode("utf-8")
+
+    def opening(self, opening_id):
+        """
+        Returns:
+            tuple: (eco_code, opening_name)
+        """
+        base = opening_id * 4
+        table = self._openings
+        return (self._string(table[base], table[base + 1]), self._string(table[base + 2], table[base + 3]))
+
+    @staticmethod
+    def _probe(keys, values, key):
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return values[i]
+        return None
+
+    def lookup_fen(self, fen):
+        """
+        Busca pelo FEN exato e, se não achar, pela posição normalizada.
+
+        Returns:
+            tuple: (eco_code, opening_name) ou None
+        """
+        opening_id = self._probe(self._exact_keys, self._exact_openings, fen_key(fen))
+        if opening_id is None:
+            opening_id = self.lookup_position_key(position_key(fen))
+        return self.opening(opening_id) if opening_id is not None else None
+
+    def lookup_position_key(self, key):
+        """
+        Returns:
+            int: id da abertura para a chave de posição, ou None
+        """
+        return self._probe(self._position_keys, self._position_openings, key)
+
+    # --- Árvore de sequências de lances ---
+
+    def root(self):
+        return 0
+
+    def child(self, node, move):
+        """
+        Returns:
+            int: nó filho pelo lance SAN, ou None se não existir
+        """
+        move_id = self._move_ids.get(move)
+        if move_id is None:
+            return None
+        first = self._node_first_edge[node]
+        for edge in range(first, first + self._node_edge_count[node]):
+            if self._edge_move[edge] == move_id:
+                return self._edge_child[edge]
+        return None
+
+    def children(self, node):
+        """
+        Itera (lance SAN, nó filho) na ordem de inserção.
+        """
+        moves = self._move_names
+        first = self._node_first_edge[node]
+        for edge in range(first, first + self._node_edge_count[node]):
+            yield moves[self._edge_move[edge]], self._edge_child[edge]
+
+    def child_count(self, node):
+        return self._node_edge_count[node]
+
+    def node_opening(self, node):
+        opening_id = self._node_opening[node]
+        return self.opening(opening_id) if opening_id >= 0 else None
+
+    def close(self):
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+
+class _MappedChildren:
+    """
+    Mapeamento lance → nó, compatível com `OpeningTrie.children`.
+    """
+    __slots__ = ("_db", "_node")
+
+    def __init__(self, db, node):
+        self._db = db
+        self._node = node
+
+    def __contains__(self, move):
+        return self._db.child(self._node, move) is not None
+
+    def __getitem__(self, move):
+        child = self._db.child(self._node, move)
+        if child is None:
+            raise KeyError(move)
+        return MappedOpeningTrie(self._db, child)
+
+    def __len__(self):
+        return self._db.child_count(self._node)
+
+    def __iter__(self):
+        return (move for move, _ in self._db.children(self._node))
+
+    def values(self):
+        return (MappedOpeningTrie(self._db, child) for _, child in self._db.children(self._node))
+
+    def items(self):
+        return ((move, MappedOpeningTrie(self._db, child)) for move, child in self._db.children(self._node))
+
+
+class MappedOpeningTrie:
+    """
+    Nó da árvore de aberturas sobre o artefato mapeado; mesma interface de OpeningTrie
+    (search, search_exact, has_continuation, children, opening_data, get_stats).
+    """
+    __slots__ = ("_db", "_node")
+
+    def __init__(self, db, node=0):
+        self._db = db
+        self._node = node
+
+    @property
+    def children(self):
+        return _MappedChildren(self._db, self._node)
+
+    @property
+    def opening_data(self):
+        return self._db.node_opening(self._node)
+
+    def search(self, moves_sequence):
+        node = self._node
+        last_found = None
+        for move in moves_sequence:
+            node = self._db.child(node, move)
+            if node is None:
+                break
+            opening = self._db.node_opening(node)
+            if opening:
+                last_found = opening
+        return last_found
+
+    def search_exact(self, moves_sequence):
+        node = self._node
+        for move in moves_sequence:
+            node = self._db.child(node, move)
+            if node is None:
+                return None
+        return self._db.node_opening(node)
+
+    def has_continuation(self, moves_sequence):
+        node = self._node
+        for move in moves_sequence:
+            node = self._db.child(node, move)
+            if node is None:
+                return False
+        return self._db.child_count(node) > 0
+
+    def get_stats(self):
+        db = self._db
+        return {
+            "total_nodes": db.node_count,
+            "total_openings": sum(1 for node in range(db.node_count) if db._node_opening[node] >= 0),
+            "root_children": db.child_count(0),
+        }
+
+
+def _read_header_digest(path):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        magic, version, digest = _HEADER.unpack(header)[:3]
+    except (OSError, struct.error):
+        return None
+    return digest if magic == MAGIC and version == VERSION else None
+
+
+def open_database(path=OPENING_DB_PATH):
+    """
+    Abre o artefato com mmap, reconstruindo-o antes se estiver ausente ou desatualizado.
+    Se não for possível gravar no disco, compila em memória.
+    """
+    if _read_header_digest(path) != tsv_digest():
+        try:
+            write_database(path)
+        except OSError as e:
+            logger.warning("Não foi possível gravar %s (%s); usando banco em memória", path, e)
+            return OpeningDatabase(build_database())
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return OpeningDatabase(mapping, mapping=mapping)
+
+
+# Banco global do processo
+_opening_db = None
+
+
+def get_opening_db():
+    global _opening_db
+    if _opening_db is None:
+        _opening_db = open_database()
+    return _opening_db
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "build"
+    path = argv[1] if len(argv) > 1 else OPENING_DB_PATH
+    if command == "build":
+        size = write_database(path)
+        db = OpeningDatabase(open(path, "rb").read())
+        print(f"{path}: {size} bytes, {db.position_count} posições, {db.opening_count} aberturas, {db.node_count} nós")
+    elif command == "check":
+        up_to_date = _read_header_digest(path) == tsv_digest()
+        print(f"{path}: {'atualizado' if up_to_date else 'desatualizado'}")
+        return 0 if up_to_date else 1
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Caminhada incremental pela teoria de aberturas durante a análise de uma partida.
+
+Um único cursor avança pela árvore de sequências de lances e consulta o índice
+de posições (que resolve transposições) a cada lance empurrado. A partida toda
+custa uma passada: O(lances), e nada mais é consultado depois que ela sai da
+teoria.
+"""
+import chess
+
+from utils.opening_db import get_opening_db
+
+
+class OpeningWalker:
+    def __init__(self, start_fen=chess.STARTING_FEN, db=None):
+        """
+        Args:
+            start_fen (str): Posição inicial da partida; a árvore de lances só vale
+                             a partir da posição inicial padrão
+            db (OpeningDatabase): Banco de aberturas (padrão: banco global)
+        """
+        self._db = db or get_opening_db()
+        standard_start = start_fen.split()[:4] == chess.STARTING_FEN.split()[:4]
+        self._node = self._db.root() if standard_start else None
+        self.in_theory = True
+        self.opening = None  # (eco_code, opening_name) mais profunda encontrada
+        self.book_plies = 0
+
+    def push(self, san, fen):
+        """
+        Avança um lance.
+
+        Args:
+            san (str): Lance jogado em SAN
+            fen (str): FEN da posição após o lance
+
+        Returns:
+            bool: True se o lance está na teoria (posição conhecida ou prefixo de uma linha)
+        """
+        if not self.in_theory:
+            return False
+        node = self._db.child(self._node, san) if self._node is not None else None
+        self._node = node
+        position = self._db.lookup_fen(fen)
+        if position:
+            self.opening = position
+        in_book = position is not None or (
+            node is not None and (self._db.node_opening(node) is not None or self._db.child_count(node) > 0)
+        )
+        if in_book:
+            self.book_plies += 1
+        else:
+            self.in_theory = False
+        return in_book
+
+    def opening_info(self):
+        """
+        Returns:
+            dict: {'eco': ..., 'name': ...} da abertura mais profunda, ou None
+        """
+        if not self.opening:
+            return None
+        eco_code, opening_name = self.opening
+        return {'eco': eco_code, 'name': opening_name}
@@ -0,0 +1,201 @@
+"""
+Livros de abertura Polyglot (.bin) abertos uma vez por processo, com mmap.
+
+Um livro Polyglot é uma sequência de entradas de 16 bytes ordenadas pela chave
+Zobrist da posição (big-endian): chave (8), lance (2), peso (2), learn (4). A
+consulta faz busca binária direto no arquivo mapeado e compara os lances na
+forma codificada do Polyglot, sem gerar SAN nem ler o livro inteiro.
+
+O BookService consulta vários livros em ordem de prioridade (o primeiro que
+conhece a posição responde) e guarda as consultas recentes num LRU. Os mapas
+dos arquivos são compartilhados entre todos os serviços e requisições.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+from config import POLYGLOT_BOOKS, POLYGLOT_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_ENTRY = struct.Struct(">QHHI")
+_KEY = struct.Struct(">Q")
+_PROMOTIONS = {chess.KNIGHT: 1, chess.BISHOP: 2, chess.ROOK: 3, chess.QUEEN: 4}
+
+
+def encode_move(board, move):
+    """
+    Lance no formato do Polyglot (16 bits): destino, origem e promoção.
+    O roque é codificado como "rei captura a própria torre" (e1h1, e1a1).
+    """
+    to_square = move.to_square
+    if board.is_castling(move) and board.piece_type_at(move.to_square) != chess.ROOK:
+        to_square = chess.square(7 if board.is_kingside_castling(move) else 0, chess.square_rank(move.from_square))
+    return to_square | (move.from_square << 6) | (_PROMOTIONS.get(move.promotion, 0) << 12)
+
+
+class PolyglotBook:
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Caminho do livro .bin
+
+        Raises:
+            OSError: se o arquivo não puder ser aberto
+            ValueError: se o tamanho não for múltiplo de 16 bytes (ou o livro estiver vazio)
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size % _ENTRY.size:
+                raise ValueError(f"Livro Polyglot inválido ({size} bytes): {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entries = size // _ENTRY.size
+
+    def _key_at(self, index):
+        return _KEY.unpack_from(self._map, index * _ENTRY.size)[0]
+
+    def find(self, key):
+        """
+        Entradas da posição.
+
+        Returns:
+            tuple: ((lance codificado, peso), ...) na ordem do livro
+        """
+        low, high = 0, self.entries
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        index = low
+        while index < self.entries:
+            entry_key, raw_move, weight, _ = _ENTRY.unpack_from(self._map, index * _ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((raw_move, weight))
+            index += 1
+        return tuple(found)
+
+    def close(self):
+        self._map.close()
+
+
+# Livros já abertos (caminho absoluto -> PolyglotBook, ou None se não puder ser aberto)
+_books = {}
+_books_lock = threading.Lock()
+
+
+def open_book(path):
+    """
+    Livro compartilhado do processo: cada arquivo é mapeado uma única vez.
+
+    Returns:
+        PolyglotBook: ou None se o arquivo não existir ou for inválido
+    """
+    path = os.path.abspath(path)
+    with _books_lock:
+        if path not in _books:
+            try:
+                _books[path] = PolyglotBook(path)
+            except (OSError, ValueError) as e:
+                logger.debug("Livro Polyglot indisponível: %s", e)
+                _books[path] = None
+        return _books[path]
+
+
+class BookService:
+    def __init__(self, paths=POLYGLOT_BOOKS, cache_size=POLYGLOT_CACHE_SIZE):
+        """
+        Args:
+            paths (list): Livros em ordem de prioridade (os ausentes são ignorados)
+            cache_size (int): Número de posições no LRU de consultas
+        """
+        self.books = [book for book in (open_book(path) for path in paths) if book is not None]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # chave Zobrist -> entradas
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def probe_key(self, key):
+        """
+        Entradas da posição no primeiro livro (por prioridade) que a conhece.
+
+        Returns:
+            tuple: ((lance codificado, peso), ...); vazia se nenhum livro tem a posição
+        """
+        with self._lock:
+            entries = self._cache.get(key)
+            if entries is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entries
+            self.misses += 1
+        entries = ()
+        for book in self.books:
+            entries = book.find(key)
+            if entries:
+                break
+        with self._lock:
+            self._cache[key] = entries
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entries
+
+    def probe(self, board):
+        return self.probe_key(chess.polyglot.zobrist_hash(board))
+
+    def contains(self, board, move):
+        """
+        Se o lance está no livro para a posição do tabuleiro.
+        """
+        if not self.books:
+            return False
+        raw_move = encode_move(board, move)
+        return any(entry[0] == raw_move for entry in self.probe(board))
+
+    def moves(self, board):
+        """
+        Lances de livro da posição como chess.Move, em ordem decrescente de peso.
+        """
+        encoded = {}
+        for raw_move, weight in self.probe(board):
+            encoded[raw_move] = max(weight, encoded.get(raw_move, 0))
+        legal = [(encoded[raw], move) for move in board.legal_moves if (raw := encode_move(board, move)) in encoded]
+        return [move for _, move in sorted(legal, key=lambda item: -item[0])]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "books": [book.path for book in self.books],
+            "entries": sum(book.entries for book in self.books),
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Serviços do processo, por lista de livros
+_services = {}
+
+
+def get_book_service(paths=None):
+    """
+    Retorna o serviço dos livros `paths` (padrão: POLYGLOT_BOOKS), criando-o se necessário.
+    """
+    paths = tuple(POLYGLOT_BOOKS if paths is None else paths)
+    service = _services.get(paths)
+    if service is None:
+        service = _services[paths] = BookService(paths)
+    return service
@@ -0,0 +1,233 @@
+"""
+Controle de admissão das análises, na frente do pool de motores.
+
+Cada análise entra numa fila com o custo estimado (lances x profundidade) e uma
+prioridade: partidas interativas (/analyze, /analyze/stream) passam na frente das
+partidas de lote. Dentro de uma prioridade, os clientes são atendidos em rodízio
+(uma análise de cada cliente por vez), então um lote grande não monopoliza os motores.
+Há tantas análises em andamento quanto motores no pool.
+
+A fila é limitada em número de análises e em custo total; cheia, a análise é
+recusada com SchedulerSaturated, que traz uma estimativa de quando tentar de novo
+(a rota responde 429 com Retry-After).
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from config import SCHEDULER_MAX_QUEUE, SCHEDULER_MAX_QUEUE_COST
+from utils.engine_pool import get_engine_pool
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Custo por segundo de uma análise até haver medições (≈ 1 lance em profundidade 15 a cada 0,15s)
+_DEFAULT_RATE = 100.0
+# Peso de cada análise concluída na média móvel da vazão
+_RATE_SMOOTHING = 0.2
+_MAX_RETRY_AFTER = 600
+
+
+class SchedulerSaturated(Exception):
+    """A fila de análises está cheia."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Fila de análises cheia; tente novamente em {retry_after}s")
+        self.retry_after = retry_after
+
+
+def game_cost(plies, depth):
+    return max(plies, 1) * max(depth, 1)
+
+
+class Ticket:
+    """
+    Vaga de uma análise. Entra na fila ao abrir o `async with`, espera a vez e
+    libera a vaga ao sair (inclusive quando a tarefa é cancelada).
+    """
+
+    def __init__(self, scheduler, client, cost, priority, reject):
+        self.scheduler = scheduler
+        self.client = client
+        self.cost = cost
+        self.priority = priority
+        self.reject = reject
+        self.granted = None
+        self.queued_at = None
+        self.started_at = None
+
+    async def __aenter__(self):
+        scheduler = self.scheduler
+        scheduler._enqueue(self)
+        try:
+            await self.granted
+        except asyncio.CancelledError:
+            scheduler._abandon(self)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler._release(self, cancelled=exc_type is asyncio.CancelledError)
+
+
+class AdmissionScheduler:
+    def __init__(self, slots=None, max_queue=SCHEDULER_MAX_QUEUE, max_queue_cost=SCHEDULER_MAX_QUEUE_COST):
+        """
+        Args:
+            slots (int): Análises simultâneas (padrão: tamanho do pool de motores)
+            max_queue (int): Análises esperando na fila
+            max_queue_cost (int): Custo total (lances x profundidade) esperando na fila
+        """
+        self._slots = slots
+        self.max_queue = max_queue
+        self.max_queue_cost = max_queue_cost
+        # prioridade -> cliente -> fila de tickets; a ordem dos clientes é o rodízio
+        self._queues = {INTERACTIVE: OrderedDict(), BATCH: OrderedDict()}
+        self.queued = 0
+        self.queued_cost = 0
+        self.running = 0
+        self.running_cost = 0
+        self.rate = _DEFAULT_RATE
+        self.admitted = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def slots(self):
+        return self._slots if self._slots is not None else get_engine_pool().size
+
+    def admit(self, client, cost, priority=INTERACTIVE, reject=True):
+        """
+        Uso:
+            async with scheduler.admit(cliente, game_cost(lances, profundidade)):
+                ...  # análise
+
+        Args:
+            client (str): Identificação do cliente (rodízio entre clientes)
+            cost (int): Custo estimado (game_cost)
+            priority (int): INTERACTIVE ou BATCH
+            reject (bool): Recusa com SchedulerSaturated se a fila estiver cheia;
+                           com False, espera (partidas de um lote já aceito)
+        """
+        return Ticket(self, client, cost, priority, reject)
+
+    def saturated(self, cost=0):
+        # Com a fila vazia a análise sempre entra, por maior que seja
+        if self.queued == 0:
+            return False
+        return self.queued >= self.max_queue or self.queued_cost + cost > self.max_queue_cost
+
+    def retry_after(self, cost=0):
+        """
+        Segundos estimados até a fila andar o bastante para uma análise de custo `cost`.
+        """
+        pending = self.queued_cost + self.running_cost / 2 + cost
+        seconds = pending / (self.rate * max(self.slots, 1))
+        return min(max(math.ceil(seconds), 1), _MAX_RETRY_AFTER)
+
+    def check(self, cost):
+        """
+        Raises:
+            SchedulerSaturated: se uma análise de custo `cost` não caberia na fila agora
+        """
+        if self.saturated(cost):
+            self.rejected += 1
+            raise SchedulerSaturated(self.retry_after(cost))
+
+    def _enqueue(self, ticket):
+        if ticket.reject:
+            self.check(ticket.cost)
+        ticket.granted = asyncio.get_running_loop().create_future()
+        ticket.queued_at = time.perf_counter()
+        self._queues[ticket.priority].setdefault(ticket.client, deque()).append(ticket)
+        self.queued += 1
+        self.queued_cost += ticket.cost
+        self._dispatch()
+
+    def _next(self):
+        for priority in (INTERACTIVE, BATCH):
+            clients = self._queues[priority]
+            if clients:
+                client, tickets = next(iter(clients.items()))
+                ticket = tickets.popleft()
+                # O cliente vai para o fim do rodízio (ou sai, se não tem mais nada na fila)
+                del clients[client]
+                if tickets:
+                    clients[client] = tickets
+                return ticket
+        return None
+
+    def _dispatch(self):
+        while self.running < self.slots:
+            ticket = self._next()
+            if ticket is None:
+                return
+            self.queued -= 1
+            self.queued_cost -= ticket.cost
+            self.running += 1
+            self.running_cost += ticket.cost
+            self.admitted += 1
+            ticket.started_at = time.perf_counter()
+            waited = ticket.started_at - ticket.queued_at
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            ticket.granted.set_result(True)
+
+    def _abandon(self, ticket):
+        # Cancelada na fila (cliente desconectou): sai da fila; se já tinha a vaga, a devolve
+        if ticket.started_at is not None:
+            self._release(ticket, cancelled=True)
+            return
+        self.cancelled += 1
+        tickets = self._queues[ticket.priority].get(ticket.client)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self._queues[ticket.priority][ticket.client]
+            self.queued -= 1
+            self.queued_cost -= ticket.cost
+
+    def _release(self, ticket, cancelled=False):
+        self.running -= 1
+        self.running_cost -= ticket.cost
+        if cancelled:
+            self.cancelled += 1
+        else:
+            elapsed = time.perf_counter() - ticket.started_at
+            if elapsed > 0:
+                # Uma análise servida pelo cache não deve inflar a vazão de uma vez
+                sample = min(ticket.cost / elapsed, self.rate * 10)
+                self.rate += _RATE_SMOOTHING * (sample - self.rate)
+        self._dispatch()
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "running": self.running,
+            "queued": self.queued,
+            "queued_interactive": sum(len(t) for t in self._queues[INTERACTIVE].values()),
+            "queued_batch": sum(len(t) for t in self._queues[BATCH].values()),
+            "queued_cost": self.queued_cost,
+            "max_queue": self.max_queue,
+            "max_queue_cost": self.max_queue_cost,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "wait_ms_avg": round(self.wait_total / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 1),
+            "cost_per_second": round(self.rate, 1),
+        }
+
+
+# Escalonador global da aplicação
+_scheduler = None
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AdmissionScheduler()
+    return _scheduler
@@ -1,22 +1,62 @@
-from stockfish import Stockfish
+import asyncio
+
 from config import STOCKFISH_PATH
+from utils.uci import UciEngine, parse_info_line  # noqa: F401 (parse_info_line reexportado)
 
 class Engine:
-    def __init__(self, path=STOCKFISH_PATH):
-        self.sf = Stockfish(path)
+    """
+    Fachada síncrona sobre o cliente UCI assíncrono (utils/uci.py), para scripts
+    e código que não roda dentro de um event loop. Cada motor tem seu próprio loop.
+    """
+    def __init__(self, path=STOCKFISH_PATH, parameters=None):
+        self.path = path
+        self._loop = asyncio.new_event_loop()
+        self.uci = UciEngine(path, parameters=parameters)
+        self._run(self.uci.start())
+
+    def _run(self, coroutine):
+        return self._loop.run_until_complete(coroutine)
 
     def set_depth(self, depth):
-        self.sf.set_depth(depth)
+        self.uci.set_depth(depth)
 
     def eval_fen(self, fen, depth=None):
-        if depth:
-            self.sf.set_depth(depth)
-        self.sf.set_fen_position(fen)
-        return self.sf.get_evaluation()
+        return self._run(self.uci.eval_fen(fen, depth=depth))
 
     def best_move(self, fen):
-        self.sf.set_fen_position(fen)
-        return self.sf.get_best_move()
+        return self._run(self.uci.best_move(fen))
 
     def make_moves(self, moves):
-        self.sf.make_moves_from_current_position(moves)
+        self._run(self.uci.make_moves(moves))
+
+    def analyse(self, fen, depth=None, multipv=1, moves=None):
+        """
+        Faz UMA busca na posição e devolve as `multipv` melhores linhas (ver UciEngine.analyse).
+        """
+        return self._run(self.uci.analyse(fen, depth=depth, multipv=multipv, moves=moves))
+
+    def reset(self):
+        """
+        Limpa o estado do motor entre partidas (hash e histórico via `ucinewgame`).
+        """
+        self._run(self.uci.reset())
+
+    def is_alive(self):
+        """
+        Verifica se o processo do Stockfish ainda está rodando e respondendo.
+        """
+        if not self.uci.is_alive():
+            return False
+        try:
+            self._run(self.uci.ping(timeout=5))
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self.uci.close())
+        finally:
+            self._loop.close()
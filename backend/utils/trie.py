@@ -1,116 +1,165 @@
 """
 Trie (Árvore de Prefixos) para busca rápida de aberturas de xadrez.
 Complexidade: O(k) onde k = número de movimentos na sequência.
+
+Cada nó é um objeto com `__slots__` (sem `__dict__` por instância), os lances são
+internados (um único objeto str por SAN distinto em toda a árvore) e as folhas
+compartilham um mesmo mapeamento vazio, somente leitura, em vez de um dict cada.
+A construção, as buscas e get_stats são iterativas.
+
+Com `with_uci=True`, insert também registra cada lance em UCI ("e2e4") num
+mapeamento à parte (`aliases`), e as buscas aceitam SAN, UCI ou uma mistura dos
+dois; `children` continua só com os lances SAN, na ordem de inserção.
+
+Em tempo de execução a aplicação não usa esta classe: utils.opening_db a monta só
+para compilar o artefato binário, e as buscas por lance vão para MappedOpeningTrie
+(mesma interface, somente SAN). Ela continua sendo a árvore em memória dos benchmarks.
 """
+import sys
+from types import MappingProxyType
+
+import chess
+
+# Filhos de uma folha: compartilhado e imutável (insert troca por um dict próprio)
+_NO_CHILDREN = MappingProxyType({})
+
+
+def normalize_moves(moves_sequence):
+    """
+    Normaliza a sequência de movimentos removendo números.
+
+    Args:
+        moves_sequence (str): "1. e4 e6 2. d4 d5 3. Nc3"
+
+    Returns:
+        list: ["e4", "e6", "d4", "d5", "Nc3"]
+    """
+    # Pula números dos movimentos (ex: "1.", "2.", etc.)
+    return [part for part in moves_sequence.split() if not part.endswith('.') and not part.isdigit()]
+
 
 class OpeningTrie:
-    def __init__(self):
-        self.children = {}
+    __slots__ = ("children", "opening_data", "aliases")
+
+    def __init__(self, with_uci=False):
+        """
+        Args:
+            with_uci (bool): Registra também os lances em UCI (as buscas aceitam SAN ou UCI)
+        """
+        self.children = _NO_CHILDREN
         self.opening_data = None  # (eco_code, opening_name)
-    
+        self.aliases = {} if with_uci else None  # UCI -> nó filho
+
     def insert(self, moves_sequence, eco_code, opening_name):
         """
         Insere uma abertura no Trie.
-        
+
         Args:
             moves_sequence (str): Sequência de movimentos (ex: "1. e4 e6 2. d4 d5")
             eco_code (str): Código ECO (ex: "C11")
             opening_name (str): Nome da abertura
         """
-        # Remove números dos movimentos e normaliza
-        moves = self._normalize_moves(moves_sequence)
-        
+        board = chess.Board() if self.aliases is not None else None
+
         node = self
-        for move in moves:
-            if move not in node.children:
-                node.children[move] = OpeningTrie()
-            node = node.children[move]
-        
+        for move in normalize_moves(moves_sequence):
+            child = node.children.get(move)
+            if child is None:
+                child = OpeningTrie()
+                if node.children is _NO_CHILDREN:
+                    node.children = {}
+                node.children[sys.intern(move)] = child
+            if board is not None:
+                try:
+                    uci = board.push_san(move).uci()
+                except ValueError:
+                    # Lance ilegal na linha: o resto dela fica só em SAN
+                    board = None
+                else:
+                    if node.aliases is None:
+                        node.aliases = {}
+                    node.aliases[uci] = child
+            node = child
+
         # Armazena os dados da abertura no nó final
         node.opening_data = (eco_code, opening_name)
-    
+
     def search(self, moves_sequence):
         """
         Busca a abertura mais longa que corresponde à sequência.
-        
+
         Args:
-            moves_sequence (list): Lista de movimentos SAN (ex: ["e4", "e6", "d4"])
-        
+            moves_sequence (list): Lista de movimentos SAN ou UCI (ex: ["e4", "e6", "d4"])
+
         Returns:
             tuple: (eco_code, opening_name) ou None se não encontrar
         """
         node = self
         last_found = None
-        
+
         for move in moves_sequence:
-            if move not in node.children:
-                break
-            node = node.children[move]
-            
+            child = node.children.get(move)
+            if child is None:
+                if not node.aliases:
+                    break
+                child = node.aliases.get(move)
+                if child is None:
+                    break
+            node = child
             # Se encontrou uma abertura, armazena (pode haver uma mais longa)
             if node.opening_data:
                 last_found = node.opening_data
-        
+
         return last_found
-    
+
     def search_exact(self, moves_sequence):
         """
         Busca uma sequência EXATA de movimentos.
         Só retorna resultado se a sequência completa existir como abertura.
-        
+
         Args:
-            moves_sequence (list): Lista de movimentos SAN (ex: ["e4", "e6", "d4"])
-        
+            moves_sequence (list): Lista de movimentos SAN ou UCI (ex: ["e4", "e6", "d4"])
+
         Returns:
             tuple: (eco_code, opening_name) ou None se a sequência exata não for uma abertura
         """
-        node = self
-        
-        for move in moves_sequence:
-            if move not in node.children:
-                return None
-            node = node.children[move]
-        
+        node = self._walk(moves_sequence)
         # Só retorna se esta sequência EXATA tem dados de abertura
-        return node.opening_data
-    
-    def _normalize_moves(self, moves_sequence):
+        return node.opening_data if node is not None else None
+
+    def has_continuation(self, moves_sequence):
         """
-        Normaliza a sequência de movimentos removendo números.
-        
-        Args:
-            moves_sequence (str): "1. e4 e6 2. d4 d5 3. Nc3"
-        
-        Returns:
-            list: ["e4", "e6", "d4", "d5", "Nc3"]
+        Se a sequência existe na árvore e alguma abertura mais longa começa com ela.
         """
-        moves = []
-        parts = moves_sequence.split()
-        
-        for part in parts:
-            # Pula números dos movimentos (ex: "1.", "2.", etc.)
-            if not part.endswith('.') and not part.isdigit():
-                moves.append(part)
-        
-        return moves
-    
+        node = self._walk(moves_sequence)
+        return node is not None and bool(node.children)
+
+    def _walk(self, moves_sequence):
+        node = self
+        for move in moves_sequence:
+            child = node.children.get(move)
+            if child is None and node.aliases:
+                child = node.aliases.get(move)
+            if child is None:
+                return None
+            node = child
+        return node
+
     def get_stats(self):
         """
         Retorna estatísticas do Trie para debug.
-        
+
         Returns:
             dict: Estatísticas (nodes, openings, etc.)
         """
-        def count_nodes(node):
-            count = 1
-            openings = 1 if node.opening_data else 0
-            for child in node.children.values():
-                child_count, child_openings = count_nodes(child)
-                count += child_count
-                openings += child_openings
-            return count, openings
-        
-        total_nodes, total_openings = count_nodes(self)
+        total_nodes = total_openings = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            total_nodes += 1
+            if node.opening_data:
+                total_openings += 1
+            stack.extend(node.children.values())
         return {
             "total_nodes": total_nodes,
             "total_openings": total_openings,
@@ -0,0 +1,284 @@
+"""
+Cliente UCI assíncrono (asyncio) para o Stockfish.
+
+Conversa com o motor por pipes não bloqueantes de subprocesso e interpreta as
+linhas `info`/`bestmove` como um fluxo. Uma análise em andamento não ocupa
+nenhuma thread: enquanto o motor pensa, o event loop atende outras requisições.
+Se a tarefa for cancelada no meio de uma busca, o motor recebe `stop` e a saída
+é drenada até o `bestmove`, deixando-o pronto para a próxima busca.
+
+Mantém a API de utils/stockfish.Engine (eval_fen, best_move, make_moves,
+set_depth, analyse, reset), mas com corrotinas.
+"""
+import asyncio
+import time
+
+import chess
+
+from config import STOCKFISH_PATH, DEFAULT_DEPTH
+from utils.metrics import record_search
+
+# Campos numéricos de uma linha `info` do protocolo UCI
+_INFO_INT_FIELDS = ("depth", "seldepth", "multipv", "nodes", "nps", "hashfull", "time", "tbhits")
+
+
+# Avaliação equivalente a um mate, para comparar linhas com cp e com mate
+MATE_SCORE = 10000
+
+
+def _comparable_score(info):
+    if info["eval_mate"] is not None:
+        return MATE_SCORE if info["eval_mate"] > 0 else -MATE_SCORE
+    return info["eval_cp"] or 0
+
+
+class EngineError(Exception):
+    """O processo do motor morreu ou respondeu fora do protocolo."""
+
+
+def parse_info_line(line):
+    """
+    Interpreta uma linha `info` do UCI.
+
+    Args:
+        line (str): ex: "info depth 20 seldepth 28 multipv 1 score cp 31 nodes 1234 nps 5678 hashfull 12 time 200 pv e2e4 e7e5"
+
+    Returns:
+        dict: {'depth', 'seldepth', 'multipv', 'nodes', 'nps', 'hashfull', 'time',
+               'eval_cp', 'eval_mate', 'bound', 'pv'} ou None se não for uma linha de avaliação.
+               A avaliação é do ponto de vista de quem joga na posição.
+    """
+    tokens = line.split()
+    if not tokens or tokens[0] != "info" or "score" not in tokens:
+        return None
+    info = {"eval_cp": None, "eval_mate": None, "bound": None, "pv": []}
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token in _INFO_INT_FIELDS and i + 1 < len(tokens):
+            info[token] = int(tokens[i + 1])
+            i += 2
+        elif token == "score" and i + 2 < len(tokens):
+            kind, value = tokens[i + 1], int(tokens[i + 2])
+            info["eval_cp" if kind == "cp" else "eval_mate"] = value
+            i += 3
+            if i < len(tokens) and tokens[i] in ("lowerbound", "upperbound"):
+                info["bound"] = tokens[i]
+                i += 1
+        elif token == "pv":
+            info["pv"] = tokens[i + 1:]
+            break
+        else:
+            i += 1
+    info.setdefault("multipv", 1)
+    return info
+
+
+class UciEngine:
+    def __init__(self, path=STOCKFISH_PATH, parameters=None):
+        """
+        Args:
+            path (str): Caminho do executável do motor
+            parameters (dict): Opções UCI aplicadas no start (ex: {"Threads": 1, "Hash": 16})
+        """
+        self.path = path
+        self.parameters = dict(parameters or {})
+        self.depth = DEFAULT_DEPTH
+        self._process = None
+        self._multipv = 1
+        self._position = None  # (fen, [lances uci]) da posição atual
+        self._searching = False
+
+    async def start(self):
+        self._process = await asyncio.create_subprocess_exec(
+            self.path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        await self._send("uci")
+        while await self._read_line() != "uciok":
+            pass
+        for name, value in self.parameters.items():
+            await self.set_option(name, value)
+        await self.ping()
+        return self
+
+    async def _send(self, command):
+        if not self.is_alive():
+            raise EngineError("O processo do motor não está rodando")
+        self._process.stdin.write(f"{command}\n".encode())
+        await self._process.stdin.drain()
+
+    async def _read_line(self):
+        line = await self._process.stdout.readline()
+        if not line:
+            raise EngineError("O motor encerrou a saída inesperadamente")
+        return line.decode().strip()
+
+    async def ping(self, timeout=None):
+        """
+        Envia `isready` e espera `readyok`.
+        """
+        await self._send("isready")
+        await asyncio.wait_for(self._wait_for("readyok"), timeout)
+
+    async def _wait_for(self, expected):
+        while await self._read_line() != expected:
+            pass
+
+    async def set_option(self, name, value):
+        if isinstance(value, bool):
+            value = str(value).lower()
+        await self._send(f"setoption name {name} value {value}")
+        if name == "MultiPV":
+            self._multipv = int(value)
+
+    def set_depth(self, depth):
+        self.depth = depth
+
+    async def _set_multipv(self, multipv):
+        if multipv != self._multipv:
+            await self.set_option("MultiPV", multipv)
+
+    async def search(self, fen, depth=None, multipv=1, moves=None, movetime=None, nodes=None):
+        """
+        Busca a posição e entrega cada linha `info` interpretada assim que chega.
+        A última entrega é {'bestmove': uci ou None}.
+
+        Args:
+            fen (str): Posição inicial
+            depth (int): Profundidade (padrão: set_depth)
+            multipv (int): Número de linhas principais
+            moves (list): Lances UCI a partir de `fen` (`position fen ... moves ...`); com o
+                          histórico o motor enxerga repetições e reaproveita o hash da partida
+            movetime (int): Limite de tempo em ms (a busca para no que vier primeiro)
+            nodes (int): Limite de nós
+        """
+        await self._set_multipv(multipv)
+        position = "position startpos" if fen == chess.STARTING_FEN else f"position fen {fen}"
+        if moves:
+            position += " moves " + " ".join(moves)
+        await self._send(position)
+        self._position = (fen, list(moves or []))
+        go = f"go depth {depth or self.depth}"
+        if movetime:
+            go += f" movetime {int(movetime)}"
+        if nodes:
+            go += f" nodes {int(nodes)}"
+        await self._send(go)
+        self._searching = True
+        try:
+            while True:
+                line = await self._read_line()
+                if line.startswith("bestmove"):
+                    self._searching = False
+                    tokens = line.split()
+                    best = tokens[1] if len(tokens) > 1 and tokens[1] != "(none)" else None
+                    yield {"bestmove": best}
+                    return
+                info = parse_info_line(line)
+                if info is not None:
+                    yield info
+        finally:
+            # Cancelamento/abandono no meio da busca: para o motor e drena até o bestmove
+            if self._searching:
+                await self.stop()
+
+    async def stop(self):
+        """
+        Interrompe a busca em andamento e descarta a saída até o `bestmove`.
+        """
+        if not self._searching:
+            return
+        try:
+            await self._send("stop")
+            await asyncio.shield(self._wait_for_bestmove())
+        finally:
+            self._searching = False
+
+    async def _wait_for_bestmove(self):
+        while not (await self._read_line()).startswith("bestmove"):
+            pass
+
+    async def analyse(self, fen, depth=None, multipv=1, moves=None, movetime=None, nodes=None):
+        """
+        Faz UMA busca na posição e devolve as `multipv` melhores linhas da última iteração.
+
+        Returns:
+            list: dicts de parse_info_line ordenados por multipv, cada um com 'move' (UCI ou None).
+                  A linha principal traz também 'swing': variação da avaliação entre as duas
+                  últimas iterações (instabilidade da busca).
+                  Posições sem lances legais retornam uma única linha com pv vazia.
+        """
+        lines = {}
+        swing = 0
+        started = time.perf_counter()
+        async for info in self.search(fen, depth=depth, multipv=multipv, moves=moves, movetime=movetime, nodes=nodes):
+            # Linhas com bound são resultados parciais de aspiration window
+            if "bestmove" in info or info["bound"]:
+                continue
+            previous = lines.get(info["multipv"])
+            if info["multipv"] == 1 and previous is not None and previous.get("depth", 0) < info.get("depth", 0):
+                swing = min(abs(_comparable_score(info) - _comparable_score(previous)), MATE_SCORE)
+            lines[info["multipv"]] = info
+        result = [lines[k] for k in sorted(lines)]
+        if result:
+            result[0]["swing"] = swing
+        for info in result:
+            info["move"] = info["pv"][0] if info["pv"] else None
+        record_search(result, time.perf_counter() - started)
+        return result
+
+    async def eval_fen(self, fen, depth=None):
+        """
+        Returns:
+            dict: {'type': 'cp' | 'mate', 'value': int}, do ponto de vista de quem joga
+        """
+        if depth:
+            self.set_depth(depth)
+        lines = await self.analyse(fen, multipv=1)
+        top = lines[0] if lines else {"eval_cp": 0, "eval_mate": None}
+        if top["eval_mate"] is not None:
+            return {"type": "mate", "value": top["eval_mate"]}
+        return {"type": "cp", "value": top["eval_cp"]}
+
+    async def best_move(self, fen):
+        lines = await self.analyse(fen, multipv=1)
+        return lines[0]["move"] if lines else None
+
+    async def make_moves(self, moves):
+        """
+        Avança a posição atual com lances UCI (a próxima busca sem FEN usa essa posição).
+        """
+        fen, played = self._position or ("startpos", [])
+        self._position = (fen, played + list(moves))
+        command = "position startpos" if fen == "startpos" else f"position fen {fen}"
+        await self._send(f"{command} moves {' '.join(self._position[1])}")
+
+    async def reset(self):
+        """
+        Limpa o estado do motor entre partidas (hash e histórico via `ucinewgame`).
+        """
+        await self.stop()
+        await self._send("ucinewgame")
+        await self._set_multipv(1)
+        await self.ping()
+        self._position = None
+
+    def is_alive(self):
+        return self._process is not None and self._process.returncode is None
+
+    async def close(self):
+        if self._process is None:
+            return
+        try:
+            if self.is_alive():
+                self._process.stdin.write(b"quit\n")
+                await self._process.stdin.drain()
+                await asyncio.wait_for(self._process.wait(), 2)
+        except Exception:
+            if self.is_alive():
+                self._process.kill()
+                await self._process.wait()
+        self._process = None